@@ -1,11 +1,455 @@
-"""AI-powered analyzer for redlines based on legal playbook."""
+"""AI-powered analyzer for redlines based on legal playbook.
 
-from typing import List, Dict, Optional
+Analysis time is dominated by network round-trips to the AI provider; the local
+work is string formatting and JSON decoding. Numeric JIT compilers such as Numba
+or Cython would not help here (string operations fall back to object mode), so
+optimization effort belongs in request batching, concurrency and caching.
+"""
+
+from typing import List, Dict, Optional, Tuple, Iterator, AsyncIterator, Callable
+import asyncio
+import concurrent.futures
+import contextlib
+import dbm
+import functools
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
 import os
-from openai import OpenAI
-from anthropic import Anthropic
+import queue
+import random
+import re
+import shelve
+import threading
+import time
 from playbook_loader import PlaybookLoader
 
+logger = logging.getLogger(__name__)
+
+# Use orjson for faster response parsing when it is installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Use tiktoken to bound the document excerpt by tokens when it is installed
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+
+# A response wrapped in a markdown code block (```json ... ```)
+_CODE_FENCE_RE = re.compile(r'^\s*```[\w-]*[ \t]*\n?(.*?)\n?```\s*$', re.DOTALL)
+# Characters that matter when scanning for a balanced JSON object
+_JSON_SCAN_RE = re.compile(r'[{}"\\]')
+# ...and, in a streamed reply, for the end of the analyses array
+_STREAM_SCAN_RE = re.compile(r'[{}"\\\]]')
+# Opening of the analyses array in a streamed reply
+_ANALYSES_ARRAY_RE = re.compile(r'"analyses"\s*:\s*\[')
+
+# Size of the document excerpt sent with every prompt
+DOC_HEAD_TOKENS = 500
+DOC_HEAD_CHARS = 2000
+# Characters of the surrounding paragraph shown on each side of a redline
+REDLINE_CONTEXT_CHARS = 300
+
+# Schema of the AI's reply. Enforced server-side through OpenAI structured outputs
+# or an Anthropic tool call where available; the field descriptions double as the
+# per-field instructions.
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "analyses": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "redline_number": {
+                        "type": "integer",
+                        "description": "Number of the redline as listed in REDLINES TO ANALYZE"
+                    },
+                    "playbook_principle": {
+                        "type": "string",
+                        "description": "Exact text of the playbook principle that applies to this redline"
+                    },
+                    "assessment": {
+                        "type": "string",
+                        "description": "Detailed assessment of how the change aligns with the playbook"
+                    },
+                    "auto_redline_action": {
+                        "type": "string",
+                        "enum": ["accept", "reject_restore", "reject_replace", "comment_only"]
+                    },
+                    "auto_redline_text": {
+                        "type": "string",
+                        "description": "ONLY the specific text to insert (matches the scope of what was changed - not the full sentence)"
+                    },
+                    "response": {
+                        "type": "string",
+                        "description": "Recommended actions based on the playbook principle - be specific about what should be done"
+                    },
+                    "fallbacks": {
+                        "type": "string",
+                        "description": "Recommended fallback positions or alternative approaches if the primary recommendation cannot be accepted."
+                    },
+                    "risk_level": {
+                        "type": "string",
+                        "enum": ["Low", "Medium", "High"]
+                    },
+                    "comment_text": {
+                        "type": "string",
+                        "description": "Inline comment explaining the auto-redline action and reasoning (clear, actionable guidance for the reviewer)"
+                    }
+                },
+                "required": [
+                    "redline_number", "playbook_principle", "assessment", "auto_redline_action",
+                    "auto_redline_text", "response", "fallbacks", "risk_level", "comment_text"
+                ],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["analyses"],
+    "additionalProperties": False
+}
+
+# Name of the Anthropic tool whose input carries the analyses
+ANALYSIS_TOOL_NAME = "emit_analyses"
+
+# OpenAI model families that accept a json_schema response_format
+_STRUCTURED_OUTPUT_MODEL_PREFIXES = ('gpt-4o', 'gpt-4.1', 'gpt-5', 'o1', 'o3', 'o4')
+# Snapshots in those families released before structured outputs; they take json_object
+_PRE_STRUCTURED_OUTPUT_MODELS = {'gpt-4o-2024-05-13'}
+# OpenAI reasoning models: they reject a non-default temperature and take their
+# instructions as a developer message rather than a system message
+_REASONING_MODEL_PREFIXES = ('gpt-5', 'o1', 'o3', 'o4')
+# Early o1 releases accept neither json_schema nor system/developer messages
+_EARLY_REASONING_MODEL_PREFIXES = ('o1-mini', 'o1-preview')
+# Older OpenAI models that accept only the json_object response_format; the
+# original gpt-4 snapshots accept neither and rely on the prompt's instructions
+_JSON_MODE_MODEL_PREFIXES = (
+    'gpt-4-turbo', 'gpt-4-1106', 'gpt-4-0125',
+    'gpt-3.5-turbo-1106', 'gpt-3.5-turbo-0125'
+)
+_JSON_MODE_MODELS = {'gpt-3.5-turbo'} | _PRE_STRUCTURED_OUTPUT_MODELS
+
+# Output format spelled out in the prompt when the schema is not enforced by the API
+_JSON_FORMAT_INSTRUCTIONS = """Format your response as JSON with this structure:
+{
+  "analyses": [
+    {
+      "redline_number": 1,
+      "playbook_principle": "Exact text of the playbook principle that applies to this redline",
+      "assessment": "Detailed assessment of how the change aligns with the playbook",
+      "auto_redline_action": "accept|reject_restore|reject_replace|comment_only",
+      "auto_redline_text": "ONLY the specific text to insert (matches the scope of what was changed - not the full sentence)",
+      "response": "Recommended actions based on the playbook principle - be specific about what should be done",
+      "fallbacks": "Recommended fallback positions or alternative approaches if the primary recommendation cannot be accepted.",
+      "risk_level": "Low|Medium|High",
+      "comment_text": "Inline comment explaining the auto-redline action and reasoning (clear, actionable guidance for the reviewer)"
+    }
+  ]
+}"""
+# ...and the short reminder used when the API enforces ANALYSIS_SCHEMA itself
+_STRUCTURED_FORMAT_INSTRUCTIONS = 'Report one entry in "analyses" for each redline, using its number from REDLINES TO ANALYZE.'
+
+_SYSTEM_PROMPT = "You are a legal technology assistant specializing in contract review and redline analysis."
+
+# Analysis prompt, split so the shared prefix can be served from provider prompt
+# caches; only the suffix differs between requests in a run
+_ANALYSIS_PROMPT_PREFIX = """You are a legal technology assistant reviewing redlines (tracked changes) in a legal document against the legal playbook below. Decide for each redline whether to accept it, reject it with a counter-redline, or only comment.
+
+For each redline:
+1. Cite the playbook FIRST: put the EXACT quoted playbook text, with its clause number/name (e.g. "CLAUSE 6: TERM AND TERMINATION - Standard Position: 3-year term..."), in "playbook_principle". If no clause applies, write "No specific playbook guidance found for this change". Every assessment and action MUST be justified by the cited principle.
+2. Assess whether the change aligns with or violates the playbook.
+3. Choose "auto_redline_action":
+   - "accept": acceptable per the playbook, including changes within a playbook fallback range (e.g. "1 to 5 years acceptable")
+   - "reject_restore": restore the original text (the deleted text, or a replacement's old text)
+   - "reject_replace": insert specific alternative text from the playbook; to reject an insertion, use an empty auto_redline_text (the insertion will be struck through)
+   - "comment_only": only when the playbook gives no specific language and the exact replacement text cannot be determined
+4. For reject actions, "auto_redline_text" is ONLY the specific text being changed - never the entire sentence or clause, and never other existing document text:
+   - deletion: exactly the deleted text, nothing more, nothing less
+   - replacement: exactly the old text (reject_restore) or only the replacement portion (reject_replace)
+5. Set "risk_level" (Low/Medium/High) and write a clear, actionable "comment_text" explaining the reasoning.
+
+{format_instructions}
+
+{examples}LEGAL PLAYBOOK:
+{playbook_text}
+
+DOCUMENT CONTEXT:
+{doc_head}...
+
+Additional context: {context}
+"""
+
+# Worked auto_redline_text examples; optional since the rules above cover them
+_PROMPT_EXAMPLES = """EXAMPLES (auto_redline_text):
+- "three (3) years" changed to "5 years" → "three (3) years" (just the changed portion)
+- "including AI training restrictions" deleted → "including AI training restrictions" (exactly what was deleted)
+- "the State of California" changed to "Japan" → "the State of California" (NOT the full governing law sentence)
+- New indemnification clause inserted → "" (the insertion will be struck through)
+
+"""
+
+# Heading placed before the redlines; the suffix is this plus the summary and a newline
+_ANALYSIS_PROMPT_SUFFIX_HEAD = "\nREDLINES TO ANALYZE:\n"
+
+# Upper bound, in seconds, on the wait before retrying a failed AI request
+MAX_RETRY_DELAY = 60.0
+
+# Decode responses in a process pool once a run has at least this many
+PARSE_POOL_MIN_RESPONSES = 50
+
+# Process pool shared by every analyzer in the process (see _get_parse_pool)
+_parse_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def _get_parse_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """Return the process pool used to decode responses, starting it on first use.
+    
+    The pool lives for the whole process so workers are started once, and uses the
+    spawn start method since forking a process that runs threads (Flask request
+    handlers, the streaming worker) is unsafe.
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = concurrent.futures.ProcessPoolExecutor(
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _parse_pool
+
+
+def _json_loads(text: str):
+    """Decode JSON text, using orjson when available.
+    
+    orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers only
+    need to catch the stdlib exception.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(text.encode('utf-8') if isinstance(text, str) else text)
+    return json.loads(text)
+
+
+def _extract_json_object(text: str) -> Optional[str]:
+    """Return the first balanced {...} span in text, or None.
+    
+    Braces inside JSON string literals are skipped. This is a single linear
+    scan, so unlike a greedy regex it cannot run on past the object into
+    unrelated braces in trailing prose.
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    skip_to = start
+    for match in _JSON_SCAN_RE.finditer(text, start):
+        pos = match.start()
+        if pos < skip_to:
+            # Character escaped by a preceding backslash
+            continue
+        char = match.group()
+        if in_string:
+            if char == '\\':
+                skip_to = pos + 2
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:pos + 1]
+    return None
+
+
+def _recover_json_text(response_text: str) -> str:
+    """Strip the wrapping around JSON in a response that is not plain JSON."""
+    # Handle cases where AI wraps JSON in markdown code blocks
+    fence_match = _CODE_FENCE_RE.match(response_text)
+    if fence_match:
+        response_text = fence_match.group(1)
+    
+    # Try to find JSON object in the response
+    return _extract_json_object(response_text) or response_text
+
+
+class _StreamingAnalysesParser:
+    """Incrementally pull complete analysis objects out of a streamed reply.
+    
+    Fed the response text piece by piece, it finds the "analyses" array and
+    returns each element as soon as its closing brace has arrived. Anything it
+    cannot decode is left for the full-response parse once streaming ends.
+    """
+    
+    def __init__(self):
+        self._buffer = ''
+        self._pos: Optional[int] = None  # scan position; None until the array is found
+        self._skip_to = 0
+        self._depth = 0
+        self._in_string = False
+        self._item_start = 0
+        self._done = False
+    
+    def feed(self, text: str) -> List[Dict]:
+        """Add streamed text and return the analysis objects completed by it."""
+        self._buffer += text
+        if self._done:
+            return []
+        if self._pos is None:
+            match = _ANALYSES_ARRAY_RE.search(self._buffer)
+            if not match:
+                return []
+            self._pos = self._skip_to = match.end()
+        
+        items = []
+        buffer = self._buffer
+        for match in _STREAM_SCAN_RE.finditer(buffer, self._pos):
+            pos = match.start()
+            if pos < self._skip_to:
+                # Character escaped by a preceding backslash
+                continue
+            char = match.group()
+            if self._in_string:
+                if char == '\\':
+                    self._skip_to = pos + 2
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._item_start = pos
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        item = _json_loads(buffer[self._item_start:pos + 1])
+                    except json.JSONDecodeError:
+                        item = None
+                    if isinstance(item, dict):
+                        items.append(item)
+            elif char == ']' and self._depth == 0:
+                self._done = True
+                break
+        self._pos = len(buffer)
+        return items
+
+
+def _decode_ai_response(ai_response: str) -> List[Dict]:
+    """Decode an AI response into its list of analysis objects.
+    
+    Kept at module level and free of analyzer state so it can run in a
+    process pool. Raises json.JSONDecodeError when no JSON can be recovered.
+    """
+    response_text = ai_response.strip()
+    
+    # Fast path: JSON-mode responses are plain JSON
+    try:
+        data = _json_loads(response_text)
+    except json.JSONDecodeError:
+        data = _json_loads(_recover_json_text(response_text))
+    
+    # Handle both array format and single object format
+    analyses = []
+    if 'analyses' in data:
+        analyses = data.get('analyses', [])
+    elif isinstance(data, list):
+        analyses = data
+    elif isinstance(data, dict) and 'redline_number' in data:
+        # Single analysis object
+        analyses = [data]
+    elif isinstance(data, dict):
+        # Try to treat the whole object as a single analysis
+        analyses = [data]
+    return analyses
+
+
+def _decode_ai_response_in_worker(ai_response: str) -> Optional[Tuple[Optional[List[Dict]], Optional[str]]]:
+    """Process-pool entry point for _decode_ai_response.
+    
+    A JSONDecodeError cannot be unpickled in the parent process, so it is
+    returned as a message instead of raised. Any other error returns None, which
+    leaves that response to be decoded (and its error reported) inline, without
+    failing the rest of the batch.
+    """
+    try:
+        return _decode_ai_response(ai_response), None
+    except json.JSONDecodeError as e:
+        return None, str(e)
+    except Exception:
+        return None
+
+
+def _context_excerpt(context: str, anchor: str, offset: Optional[int] = None) -> str:
+    """Cut a redline's paragraph context down to a window around the changed text.
+    
+    `anchor` is text known to appear in the original paragraph (the deleted or
+    replaced text) and `offset` is where the change sits in it, as recorded by the
+    extractor. The deleted text is used when it is found (at `offset` if it is there);
+    an insertion has no text in the original paragraph, so its window is centred on
+    `offset`. Without either the window starts at the paragraph's beginning.
+    """
+    limit = REDLINE_CONTEXT_CHARS
+    if len(context) <= 2 * limit + len(anchor):
+        return context
+    pos = -1
+    if anchor:
+        pos = offset if offset is not None and context.startswith(anchor, offset) else context.find(anchor)
+    if pos < 0:
+        if offset is None:
+            return context[:2 * limit] + '...'
+        pos, anchor = min(offset, len(context)), ''
+    start = max(0, pos - limit)
+    end = min(len(context), pos + len(anchor) + limit)
+    return ('...' if start > 0 else '') + context[start:end] + ('...' if end < len(context) else '')
+
+
+@functools.lru_cache(maxsize=512)
+def _format_redline_block(
+    redline_type: str,
+    old_text: str,
+    new_text: str,
+    text: str,
+    author: str,
+    date: str,
+    number: int,
+    context: str = ''
+) -> str:
+    """Format one redline as a numbered prompt block.
+    
+    Takes the redline's fields rather than the (unhashable) redline dict so that
+    repeated identical edits in a document are formatted once.
+    """
+    # Handle replacements properly - show both old and new text
+    if redline_type == 'replacement':
+        text_info = f"  Old Text (deleted): {old_text}\n  New Text (inserted): {new_text}"
+    else:
+        text_info = f"  Text: {text}"
+    if context:
+        text_info += f"\n  Context (original paragraph): {context}"
+    
+    # Trailing '' keeps the newline that ends each block
+    return '\n'.join((
+        f"Redline #{number}:",
+        f"  Type: {redline_type}",
+        text_info,
+        f"  Author: {author}",
+        f"  Date: {date}",
+        ''
+    ))
+
 
 class AIAnalyzer:
     """Analyzes redlines using AI models against a legal playbook."""
@@ -14,25 +458,85 @@ class AIAnalyzer:
         self,
         playbook: PlaybookLoader,
         provider: str = "openai",
-        model: str = "gpt-4"
+        model: str = "gpt-4",
+        max_concurrency: int = 20,
+        redlines_per_request: int = 5,
+        include_examples: bool = True,
+        dedupe_redlines: bool = True,
+        max_retries: int = 5,
+        cache_dir: Optional[str] = None,
+        verbose: bool = False
     ):
-        """Initialize analyzer with playbook and AI configuration."""
+        """Initialize analyzer with playbook and AI configuration.
+        
+        Args:
+            playbook: Loaded legal playbook
+            provider: AI provider ('openai' or 'anthropic')
+            model: Model name for the provider
+            max_concurrency: Maximum number of AI requests in flight at once
+            redlines_per_request: Number of redlines packed into a single AI request
+                so the playbook/document preamble is sent once per group
+            include_examples: Include worked auto-redline examples in the prompt
+            dedupe_redlines: Analyze identical changes (same type, text and paragraph
+                context) once and share the result; disable to analyze every
+                occurrence separately
+            max_retries: Attempts per AI request on transient errors (429/5xx/timeouts)
+            cache_dir: Directory for an on-disk cache of AI responses keyed by prompt,
+                so identical requests are not sent again (disabled when None)
+            verbose: Log per-redline progress and parse tracebacks at INFO level
+                (otherwise they are logged at DEBUG)
+        """
         self.playbook = playbook
         self.provider = provider.lower()
         self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.redlines_per_request = max(1, redlines_per_request)
+        self.include_examples = include_examples
+        self.dedupe_redlines = dedupe_redlines
+        self.max_retries = max(1, max_retries)
+        self.cache_dir = cache_dir
+        self._prefix_digest = None
+        # Deterministic playbook rules (RULE MATCH lines) settle redlines without an AI call
+        self._rules = playbook.compile_rules()
+        # Per-redline progress is logged at INFO for a verbose analyzer and DEBUG otherwise,
+        # so one verbose instance leaves the shared module logger untouched
+        self.verbose = verbose
+        self._detail_level = logging.INFO if verbose else logging.DEBUG
         
         if self.provider == "openai":
             api_key = os.getenv('OPENAI_API_KEY')
             if not api_key:
                 raise ValueError("OPENAI_API_KEY not found in environment variables")
-            self.client = OpenAI(api_key=api_key)
+            # Provider SDKs are imported on demand so only the one in use is loaded
+            import openai
+            self._sdk = openai
+            self.client = openai.OpenAI(api_key=api_key)
         elif self.provider == "anthropic":
             api_key = os.getenv('ANTHROPIC_API_KEY')
             if not api_key:
                 raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
-            self.client = Anthropic(api_key=api_key)
+            import anthropic
+            self._sdk = anthropic
+            self.client = anthropic.Anthropic(api_key=api_key)
         else:
             raise ValueError(f"Unsupported provider: {provider}. Use 'openai' or 'anthropic'")
+        
+        # Transient provider failures (rate limits, timeouts, dropped connections, 5xx)
+        # that are worth retrying before a redline falls back to manual review
+        self._retryable_errors = (
+            self._sdk.RateLimitError,
+            self._sdk.APITimeoutError,
+            self._sdk.APIConnectionError,
+            self._sdk.InternalServerError,
+        )
+        # Anthropic reports overload as its own 529 status error
+        overloaded_error = getattr(self._sdk, 'OverloadedError', None)
+        if overloaded_error is not None:
+            self._retryable_errors += (overloaded_error,)
+    
+    def _log_detail(self, msg: str, *args, **kwargs) -> None:
+        """Log per-redline progress at this analyzer's detail level."""
+        logger.log(self._detail_level, msg, *args, **kwargs)
     
     def analyze_redlines(
         self,
@@ -40,348 +544,1078 @@ class AIAnalyzer:
         document_text: str,
         context: Optional[str] = None
     ) -> List[Dict]:
-        """Analyze EACH redline individually against the playbook using AI.
+        """Analyze EACH redline against the playbook using AI.
+        
+        CRITICAL: Every redline gets its own analysis entry with specific guidance.
+        Redlines are grouped `redlines_per_request` at a time so the shared
+        playbook/document preamble is sent once per group, and the groups are
+        dispatched concurrently (see analyze_redlines_async).
+        """
+        if not redlines:
+            return []
+        
+        return asyncio.run(self.analyze_redlines_async(redlines, document_text, context))
+    
+    async def analyze_redlines_async(
+        self,
+        redlines: List[Dict],
+        document_text: str,
+        context: Optional[str] = None
+    ) -> List[Dict]:
+        """Analyze redlines in groups, running the AI requests concurrently.
         
-        CRITICAL: Each redline is analyzed separately to ensure individual attention
-        and to provide specific guidance for each tracked change.
+        At most `max_concurrency` requests are in flight at once to stay within
+        provider rate limits. Results are returned in the same order as `redlines`.
         """
         if not redlines:
             return []
         
-        print(f"Analyzing {len(redlines)} redline(s) individually...")
-        all_analyses = []
+        unique, rep_of = self._dedupe_redlines(redlines)
+        ruled, remaining = self._apply_playbook_rules(unique)
+        if not remaining:
+            return self._expand_analyses(redlines, ruled, rep_of)
         
-        # Analyze EACH redline individually
-        for idx, redline in enumerate(redlines, 1):
-            redline_type = redline.get('type', 'Unknown')
-            if redline_type == 'replacement':
-                old_text = redline.get('old_text', '')
-                new_text = redline.get('new_text', '')
-                print(f"  Analyzing redline {idx} of {len(redlines)}: {redline_type} - '{old_text}' → '{new_text}'")
-            else:
-                print(f"  Analyzing redline {idx} of {len(redlines)}: {redline_type} - {redline.get('text', '')[:50]}...")
-            
-            # Format this single redline for analysis
-            redlines_summary = self._format_single_redline_for_analysis(redline, idx)
-            playbook_text = self.playbook.get_playbook_text()
+        groups = self._group_redlines(remaining)
+        logger.info("Analyzing %d redline(s) in %d request(s) (%d concurrent)...",
+                    len(redlines), len(groups), self.max_concurrency)
+        prompts = self._build_redline_prompts(groups, document_text, context)
+        
+        with self._open_cache() as cache:
+            responses, pending = self._lookup_cached_responses(cache, prompts)
+            if pending:
+                fresh = await self._run_concurrent([prompts[idx] for idx in pending])
+                self._store_responses(cache, prompts, pending, fresh, responses)
+        
+        # Decoding a large run is CPU-bound, so keep it off the event loop
+        decoded = await asyncio.get_running_loop().run_in_executor(None, self._decode_responses_in_pool, responses)
+        analyses = self._merge_rule_analyses(ruled, self._collect_analyses(groups, responses, decoded))
+        return self._expand_analyses(redlines, analyses, rep_of)
+    
+    async def _run_concurrent(self, prompts: List[Tuple[str, str]]) -> List:
+        """Send prompts concurrently, returning responses (or exceptions) in order."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async with self._create_async_client() as client:
+            async def call_with_limit(prompt: Tuple[str, str]) -> str:
+                async with semaphore:
+                    return await self._call_ai_async(client, prompt)
             
-            # Build prompt for this individual redline
-            prompt = self._build_analysis_prompt(
-                playbook_text,
-                redlines_summary,
-                document_text,
-                context
+            return await asyncio.gather(
+                *(call_with_limit(prompt) for prompt in prompts),
+                return_exceptions=True
             )
+    
+    async def analyze_redlines_aiter(
+        self,
+        redlines: List[Dict],
+        document_text: str,
+        context: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        """Yield each redline's analysis as soon as its AI request completes.
+        
+        Lets callers start working on early results while the remaining requests
+        are still in flight. Responses are parsed while they stream, so each
+        analysis in a multi-redline request is yielded as soon as its JSON object is
+        complete. Analyses arrive in completion order, not input order; each
+        carries its redline under the 'redline' key.
+        
+        Only analyses streamed by a request's latest attempt are yielded. If an
+        attempt fails after some of its analyses were yielded and the retry answers
+        those redlines differently, the retry's analysis is yielded again once the
+        request finishes and supersedes the earlier one.
+        """
+        if not redlines:
+            return
+        
+        unique, rep_of = self._dedupe_redlines(redlines)
+        # Every occurrence of a duplicated redline is yielded with its representative
+        occurrences = {}
+        for redline, rep in zip(redlines, rep_of):
+            occurrences.setdefault(id(unique[rep]), []).append(redline)
+        
+        ruled, remaining = self._apply_playbook_rules(unique)
+        for analysis in ruled:
+            if analysis is not None:
+                for redline in occurrences[id(analysis['redline'])]:
+                    yield analysis if redline is analysis['redline'] else dict(analysis, redline=redline)
+        if not remaining:
+            return
+        
+        groups = self._group_redlines(remaining)
+        logger.info("Analyzing %d redline(s) in %d request(s) (%d concurrent)...",
+                    len(redlines), len(groups), self.max_concurrency)
+        prompts = self._build_redline_prompts(groups, document_text, context)
+        
+        with self._open_cache() as cache:
+            responses, pending = self._lookup_cached_responses(cache, prompts)
+            pending_set = set(pending)
+            for idx, response in enumerate(responses):
+                if idx not in pending_set:
+                    for analysis in self._group_analyses(idx + 1, groups[idx], response):
+                        for redline in occurrences[id(analysis['redline'])]:
+                            yield analysis if redline is analysis['redline'] else dict(analysis, redline=redline)
+            if not pending:
+                return
+            
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            # Requests report ('analysis', idx, attempt, entry) for each analysis parsed
+            # while streaming and ('done', idx, attempt, response or exception) when they finish
+            events = asyncio.Queue()
+            # Latest attempt number of each request; analyses from earlier attempts are stale
+            attempts = [0] * len(prompts)
             
-            # Get AI response for this redline
+            async with self._create_async_client() as client:
+                async def stream_request(idx: int):
+                    def on_attempt():
+                        attempts[idx] += 1
+                        attempt = attempts[idx]
+                        parser = _StreamingAnalysesParser()
+                        
+                        def on_text(text: str):
+                            for item in parser.feed(text):
+                                entry = self._match_analysis(item, groups[idx], strict=True)
+                                if entry is not None:
+                                    events.put_nowait(('analysis', idx, attempt, entry))
+                        return on_text
+                    
+                    async with semaphore:
+                        try:
+                            response = await self._call_ai_async(client, prompts[idx], on_attempt)
+                        except Exception as e:
+                            response = e
+                    events.put_nowait(('done', idx, attempts[idx], response))
+                
+                tasks = [asyncio.ensure_future(stream_request(idx)) for idx in pending]
+                # Attempt each redline's yielded analysis came from, by redline identity
+                yielded_from = {}
+                try:
+                    unfinished = len(tasks)
+                    while unfinished:
+                        kind, idx, attempt, payload = await events.get()
+                        if kind == 'analysis':
+                            if attempt != attempts[idx] or id(payload['redline']) in yielded_from:
+                                continue
+                            analyses = [payload]
+                        else:
+                            unfinished -= 1
+                            self._store_responses(cache, prompts, [idx], [payload], responses)
+                            analyses = []
+                            for analysis in self._group_analyses(idx + 1, groups[idx], payload):
+                                earlier = yielded_from.get(id(analysis['redline']))
+                                # Redlines already yielded by this attempt are not repeated; ones
+                                # yielded by an abandoned attempt are superseded by this answer
+                                # unless the request failed outright
+                                if earlier is None or (earlier != attempt and not isinstance(payload, Exception)):
+                                    analyses.append(analysis)
+                        for analysis in analyses:
+                            yielded_from[id(analysis['redline'])] = attempt
+                            for redline in occurrences[id(analysis['redline'])]:
+                                yield analysis if redline is analysis['redline'] else dict(analysis, redline=redline)
+                finally:
+                    # The caller may stop iterating early
+                    for task in tasks:
+                        task.cancel()
+    
+    def analyze_redlines_iter(
+        self,
+        redlines: List[Dict],
+        document_text: str,
+        context: Optional[str] = None
+    ) -> Iterator[Dict]:
+        """Synchronous counterpart of analyze_redlines_aiter.
+        
+        The requests run on an event loop in a background thread, so they keep
+        progressing while the caller handles the analyses already yielded. If the
+        caller stops early, the requests already started finish in the background.
+        """
+        results = queue.Queue()
+        finished = object()
+        
+        async def produce():
+            async for analysis in self.analyze_redlines_aiter(redlines, document_text, context):
+                results.put(analysis)
+        
+        def run():
             try:
-                analysis = self._call_ai(prompt)
-                print(f"    AI response received ({len(analysis)} chars)")
+                asyncio.run(produce())
             except Exception as e:
-                print(f"    ✗ ERROR calling AI: {type(e).__name__}: {e}")
-                all_analyses.append({
-                    'redline': redline,
-                    'playbook_principle': '',
-                    'assessment': f'AI analysis failed: {str(e)}',
-                    'response': 'Please review this change manually',
-                    'fallbacks': '',
-                    'risk_level': 'Medium',
-                    'comment_text': 'Please review this change against the legal playbook.',
-                    'auto_redline_action': 'comment_only',
-                    'auto_redline_text': ''
-                })
+                results.put(e)
+            finally:
+                results.put(finished)
+        
+        worker = threading.Thread(target=run, name="redline-analysis", daemon=True)
+        worker.start()
+        while True:
+            item = results.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        worker.join()
+    
+    def analyze_redlines_batch(
+        self,
+        redlines: List[Dict],
+        document_text: str,
+        context: Optional[str] = None,
+        poll_interval: float = 10.0,
+        max_poll_interval: float = 300.0,
+        timeout: float = 24 * 60 * 60
+    ) -> List[Dict]:
+        """Analyze redlines through the provider's asynchronous Batch API.
+        
+        Intended for offline bulk runs where latency does not matter: the batch
+        endpoints are billed at roughly half the real-time price and are not subject
+        to the interactive per-minute rate limits. Blocks until the batch finishes.
+        
+        Args:
+            redlines: Redlines to analyze (grouped `redlines_per_request` per request)
+            document_text: Full document text used as context
+            context: Optional additional context for the AI
+            poll_interval: Initial delay in seconds between status checks
+            max_poll_interval: Upper bound for the exponential polling backoff
+            timeout: Give up waiting after this many seconds
+        """
+        if not redlines:
+            return []
+        return self.analyze_documents_batch(
+            [(redlines, document_text, context)],
+            poll_interval=poll_interval,
+            max_poll_interval=max_poll_interval,
+            timeout=timeout
+        )[0]
+    
+    def analyze_documents_batch(
+        self,
+        documents: List[Tuple[List[Dict], str, Optional[str]]],
+        poll_interval: float = 10.0,
+        max_poll_interval: float = 300.0,
+        timeout: float = 24 * 60 * 60
+    ) -> List[List[Dict]]:
+        """Analyze the redlines of several documents in a single Batch API job.
+        
+        Args:
+            documents: (redlines, document_text, context) for each document
+            poll_interval, max_poll_interval, timeout: As for analyze_redlines_batch
+        
+        Returns:
+            One list of analyses per document, in the order given
+        """
+        doc_groups = []
+        doc_reps = []
+        doc_ruled = []
+        spans = []
+        prompts = []
+        for redlines, document_text, context in documents:
+            unique, rep_of = self._dedupe_redlines(redlines)
+            ruled, remaining = self._apply_playbook_rules(unique)
+            groups = self._group_redlines(remaining)
+            doc_groups.append(groups)
+            doc_reps.append(rep_of)
+            doc_ruled.append(ruled)
+            spans.append((len(prompts), len(groups)))
+            if groups:
+                prompts.extend(self._build_redline_prompts(groups, document_text, context))
+        if not prompts:
+            return [
+                self._expand_analyses(redlines, ruled, rep_of)
+                for (redlines, _, _), ruled, rep_of in zip(documents, doc_ruled, doc_reps)
+            ]
+        
+        logger.info("Submitting %d document(s) in %d request(s) to the %s Batch API...",
+                    len(documents), len(prompts), self.provider)
+        
+        with self._open_cache() as cache:
+            responses, pending = self._lookup_cached_responses(cache, prompts)
+            if pending:
+                fresh = self._run_batch(
+                    [prompts[idx] for idx in pending],
+                    poll_interval, max_poll_interval, timeout
+                )
+                self._store_responses(cache, prompts, pending, fresh, responses)
+        
+        return [
+            self._expand_analyses(
+                redlines,
+                self._merge_rule_analyses(
+                    ruled,
+                    self._collect_analyses(groups, responses[start:start + count]) if groups else []
+                ),
+                rep_of
+            )
+            for (redlines, _, _), groups, ruled, rep_of, (start, count)
+            in zip(documents, doc_groups, doc_ruled, doc_reps, spans)
+        ]
+    
+    def _run_batch(
+        self,
+        prompts: List[Tuple[str, str]],
+        poll_interval: float,
+        max_poll_interval: float,
+        timeout: float
+    ) -> List:
+        """Submit prompts as one batch job, wait for it and return its responses in order."""
+        if self.provider == "openai":
+            batch_id = self._submit_openai_batch(prompts)
+        else:
+            batch_id = self._submit_anthropic_batch(prompts)
+        logger.info("  Batch submitted: %s", batch_id)
+        
+        deadline = time.monotonic() + timeout
+        delay = poll_interval
+        while True:
+            if self.provider == "openai":
+                batch = self.client.batches.retrieve(batch_id)
+                status = batch.status
+                if status == 'completed':
+                    return self._download_openai_batch_results(batch, len(prompts))
+                if status in ('failed', 'expired', 'cancelled'):
+                    raise RuntimeError(f"Batch {batch_id} ended with status '{status}'")
+            else:
+                batch = self.client.messages.batches.retrieve(batch_id)
+                status = batch.processing_status
+                if status == 'ended':
+                    return self._download_anthropic_batch_results(batch_id, len(prompts))
+        
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Batch {batch_id} did not finish within {timeout} seconds (status: {status})")
+            logger.info("  Batch %s status: %s - checking again in %.0fs", batch_id, status, delay)
+            time.sleep(delay)
+            delay = min(delay * 2, max_poll_interval)
+    
+    def _submit_openai_batch(self, prompts: List[Tuple[str, str]]) -> str:
+        """Upload prompts as a JSONL batch file and start an OpenAI batch job."""
+        lines = []
+        for idx, prompt in enumerate(prompts):
+            lines.append(json.dumps({
+                'custom_id': f'redline-{idx}',
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': {k: v for k, v in self._request_kwargs(prompt).items() if v is not None}
+            }))
+        
+        batch_file = io.BytesIO('\n'.join(lines).encode('utf-8'))
+        batch_file.name = 'redline_batch.jsonl'
+        uploaded = self.client.files.create(file=batch_file, purpose='batch')
+        
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h'
+        )
+        return batch.id
+    
+    def _submit_anthropic_batch(self, prompts: List[Tuple[str, str]]) -> str:
+        """Start an Anthropic Message Batch with one request per prompt."""
+        batch = self.client.messages.batches.create(
+            requests=[
+                {'custom_id': f'redline-{idx}', 'params': self._request_kwargs(prompt)}
+                for idx, prompt in enumerate(prompts)
+            ]
+        )
+        return batch.id
+    
+    def _download_openai_batch_results(self, batch, count: int) -> List:
+        """Download an OpenAI batch output file and order responses by custom_id."""
+        responses: List = [RuntimeError('No result returned by batch')] * count
+        if not batch.output_file_id:
+            return responses
+        
+        output = self.client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
                 continue
-            
-            # Parse AI response and add the redline reference
+            item = json.loads(line)
+            idx = int(item['custom_id'].rsplit('-', 1)[1])
+            if item.get('error'):
+                responses[idx] = RuntimeError(str(item['error']))
+                continue
+            body = item['response']['body']
+            responses[idx] = body['choices'][0]['message']['content']
+        return responses
+    
+    def _download_anthropic_batch_results(self, batch_id: str, count: int) -> List:
+        """Stream Anthropic batch results and order responses by custom_id."""
+        responses: List = [RuntimeError('No result returned by batch')] * count
+        for entry in self.client.messages.batches.results(batch_id):
+            idx = int(entry.custom_id.rsplit('-', 1)[1])
+            if entry.result.type == 'succeeded':
+                responses[idx] = self._anthropic_message_text(entry.result.message)
+            else:
+                responses[idx] = RuntimeError(f"Batch request {entry.result.type}")
+        return responses
+    
+    def _dedupe_redlines(self, redlines: List[Dict]) -> Tuple[List[Dict], List[int]]:
+        """Collapse redlines with identical content so each is analyzed once.
+        
+        The paragraph context is part of the key: the same edit made in different
+        clauses can call for different assessments, so only repeats of a change
+        in identical surrounding text share an analysis.
+        
+        Returns the unique redlines and, for every input redline, the index of the
+        unique redline that represents it.
+        """
+        if not self.dedupe_redlines:
+            return redlines, list(range(len(redlines)))
+        
+        unique = []
+        first_by_key = {}
+        rep_of = []
+        for redline in redlines:
+            key = (
+                redline.get('type'),
+                redline.get('old_text', ''),
+                redline.get('new_text', ''),
+                redline.get('text', ''),
+                redline.get('context', '')
+            )
+            rep = first_by_key.get(key)
+            if rep is None:
+                rep = first_by_key[key] = len(unique)
+                unique.append(redline)
+            rep_of.append(rep)
+        
+        if len(unique) < len(redlines):
+            logger.info("  %d duplicate redline(s) will reuse the analysis of an identical change",
+                        len(redlines) - len(unique))
+        return unique, rep_of
+    
+    def _apply_playbook_rules(self, redlines: List[Dict]) -> Tuple[List[Optional[Dict]], List[Dict]]:
+        """Settle redlines matched by a deterministic playbook rule without the AI.
+        
+        Returns, per redline, its rule analysis or None, plus the redlines that
+        still need an AI request. The first matching rule wins.
+        """
+        if not self._rules:
+            return [None] * len(redlines), redlines
+        
+        ruled = []
+        remaining = []
+        for redline in redlines:
+            analysis = None
+            for matcher, action in self._rules:
+                term = matcher(redline)
+                if term is not None:
+                    analysis = self._rule_analysis(redline, action, term)
+                    break
+            ruled.append(analysis)
+            if analysis is None:
+                remaining.append(redline)
+        
+        if len(remaining) < len(redlines):
+            logger.info("  %d redline(s) settled by playbook rules without an AI request",
+                        len(redlines) - len(remaining))
+        return ruled, remaining
+    
+    def _rule_analysis(self, redline: Dict, action: Dict, term: str) -> Dict:
+        """Build the analysis for a redline matched by a playbook rule."""
+        response = action['response'] or action['playbook_principle']
+        return {
+            'redline': redline,
+            'playbook_principle': action['playbook_principle'],
+            'assessment': f"The change contains '{term}', which the playbook rule for this principle "
+                          f"settles as {action['auto_redline_action']}.",
+            'response': response,
+            'fallbacks': '',
+            'risk_level': action['risk_level'],
+            'comment_text': response,
+            'auto_redline_action': action['auto_redline_action'],
+            'auto_redline_text': ''
+        }
+    
+    def _merge_rule_analyses(self, ruled: List[Optional[Dict]], analyses: List[Dict]) -> List[Dict]:
+        """Fill the redlines no rule settled with the AI analyses, keeping input order."""
+        if not analyses:
+            return ruled
+        ai_analyses = iter(analyses)
+        return [analysis if analysis is not None else next(ai_analyses) for analysis in ruled]
+    
+    def _expand_analyses(self, redlines: List[Dict], analyses: List[Dict], rep_of: List[int]) -> List[Dict]:
+        """Give every input redline its own copy of its representative's analysis."""
+        if len(analyses) == len(redlines):
+            return analyses
+        return [
+            analyses[rep] if analyses[rep]['redline'] is redline else dict(analyses[rep], redline=redline)
+            for redline, rep in zip(redlines, rep_of)
+        ]
+    
+    def _group_redlines(self, redlines: List[Dict]) -> List[List[Dict]]:
+        """Split redlines into consecutive groups of `redlines_per_request`."""
+        size = self.redlines_per_request
+        return [redlines[i:i + size] for i in range(0, len(redlines), size)]
+    
+    def _document_head(self, document_text: str) -> str:
+        """Return the opening excerpt of the document used as context in every prompt.
+        
+        With tiktoken the excerpt is cut at DOC_HEAD_TOKENS tokens, so documents with
+        dense or non-Latin text do not send more tokens than intended; otherwise it
+        falls back to the first DOC_HEAD_CHARS characters.
+        """
+        if not TIKTOKEN_AVAILABLE:
+            return document_text[:DOC_HEAD_CHARS]
+        try:
             try:
-                parsed = self._parse_ai_response(analysis, [redline], redline_number=1)
-                if parsed and len(parsed) > 0:
-                    # Ensure the redline is included in the analysis
-                    parsed[0]['redline'] = redline
-                    all_analyses.extend(parsed)
-                    print(f"    ✓ Analysis parsed successfully")
+                encoding = tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                # Non-OpenAI models: cl100k_base is a close enough approximation
+                encoding = tiktoken.get_encoding("cl100k_base")
+            # Only the opening of the document can end up in the excerpt, so avoid
+            # tokenizing all of it
+            tokens = encoding.encode(document_text[:DOC_HEAD_TOKENS * 16], disallowed_special=())
+            return encoding.decode(tokens[:DOC_HEAD_TOKENS])
+        except Exception as e:
+            # tiktoken downloads its BPE files on first use, which fails on offline hosts
+            logger.warning("  Token-bounded document excerpt unavailable (%s), using the first %d characters",
+                           e, DOC_HEAD_CHARS)
+            return document_text[:DOC_HEAD_CHARS]
+    
+    def _build_redline_prompts(
+        self,
+        groups: List[List[Dict]],
+        document_text: str,
+        context: Optional[str]
+    ) -> List[Tuple[str, str]]:
+        """Build one analysis prompt per group of redlines."""
+        # The playbook, document excerpt and context are identical for every request,
+        # so the prompt prefix is built once and shared
+        prefix = self._build_prompt_prefix(
+            self.playbook.get_playbook_text(),
+            self._document_head(document_text),
+            context
+        )
+        total = sum(len(group) for group in groups)
+        
+        debug = logger.isEnabledFor(self._detail_level)
+        
+        prompts = []
+        idx = 0
+        for group in groups:
+            for redline in group:
+                idx += 1
+                if not debug:
+                    continue
+                redline_type = redline.get('type', 'Unknown')
+                if redline_type == 'replacement':
+                    self._log_detail("  Queueing redline %d of %d: %s - '%s' → '%s'", idx, total, redline_type,
+                                     redline.get('old_text', ''), redline.get('new_text', ''))
                 else:
-                    print(f"    ⚠ Parsing returned empty result, creating fallback analysis")
-                    # If parsing failed, create a basic analysis entry
-                    all_analyses.append({
-                        'redline': redline,
-                        'playbook_principle': '',
-                        'assessment': 'Analysis parsing failed - AI response format may be incorrect',
-                        'response': 'Please review this change manually',
-                        'fallbacks': '',
-                        'risk_level': 'Medium',
-                        'comment_text': 'Please review this change against the legal playbook.',
-                        'auto_redline_action': 'comment_only',
-                        'auto_redline_text': ''
-                    })
-            except Exception as e:
-                print(f"    ✗ ERROR parsing AI response: {type(e).__name__}: {e}")
-                import traceback
-                print(f"    Traceback: {traceback.format_exc()}")
-                # If parsing failed, create a basic analysis entry
-                all_analyses.append({
-                    'redline': redline,
-                    'playbook_principle': '',
-                    'assessment': f'Analysis parsing error: {str(e)}',
-                    'response': 'Please review this change manually',
-                    'fallbacks': '',
-                    'risk_level': 'Medium',
-                    'comment_text': 'Please review this change against the legal playbook.',
-                    'auto_redline_action': 'comment_only',
-                    'auto_redline_text': ''
-                })
-        
-        print(f"✓ Completed analysis of {len(all_analyses)} redline(s)")
+                    self._log_detail("  Queueing redline %d of %d: %s - %s...", idx, total, redline_type,
+                                     redline.get('text', '')[:50])
+            
+            # Redlines in a group are numbered from 1 so the AI's redline_number
+            # maps straight back to the position within the group, and an identical
+            # redline gets an identical prompt (and cache key) wherever it appears
+            redlines_summary = self._format_redlines_for_analysis(group)
+            
+            prompts.append((prefix, self._build_prompt_suffix(redlines_summary)))
+        return prompts
+    
+    def _open_cache(self):
+        """Open the on-disk response cache, or a no-op context when caching is off.
+        
+        If the cache cannot be opened (e.g. it is locked by another process), the
+        run continues uncached rather than failing.
+        """
+        if not self.cache_dir:
+            return contextlib.nullcontext()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            return shelve.open(os.path.join(self.cache_dir, "ai_cache"))
+        except (OSError, *dbm.error) as e:
+            logger.warning("  AI response cache unavailable (%s), continuing without it", e)
+            return contextlib.nullcontext()
+    
+    def _cache_key(self, prompt: Tuple[str, str]) -> str:
+        """Content-addressed cache key for a prompt sent to this provider/model.
+        
+        Prompts in a run share one prefix string, so its digest is computed once
+        and extended with each suffix.
+        """
+        prefix, suffix = prompt
+        cached = self._prefix_digest
+        if cached is None or cached[0] is not prefix:
+            base = hashlib.blake2b(f"{self.provider}|{self.model}|".encode('utf-8'), digest_size=16)
+            base.update(prefix.encode('utf-8'))
+            base.update(b'\0')
+            cached = self._prefix_digest = (prefix, base)
+        digest = cached[1].copy()
+        digest.update(suffix.encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _lookup_cached_responses(self, cache, prompts: List[Tuple[str, str]]) -> Tuple[List, List[int]]:
+        """Fill in cached responses and return the indices of prompts still to be sent."""
+        responses = [None] * len(prompts)
+        if cache is None:
+            return responses, list(range(len(prompts)))
+        pending = []
+        for idx, prompt in enumerate(prompts):
+            responses[idx] = cache.get(self._cache_key(prompt))
+            if responses[idx] is None:
+                pending.append(idx)
+        if len(pending) < len(prompts):
+            logger.info("  Reusing %d cached AI response(s)", len(prompts) - len(pending))
+        return responses, pending
+    
+    def _store_responses(self, cache, prompts: List[Tuple[str, str]], pending: List[int], fresh: List, responses: List):
+        """Place fresh responses at their prompt positions and cache the successful ones."""
+        for idx, response in zip(pending, fresh):
+            responses[idx] = response
+            if cache is not None and isinstance(response, str):
+                cache[self._cache_key(prompts[idx])] = response
+    
+    def _collect_analyses(self, groups: List[List[Dict]], responses: List, decoded: Optional[List] = None) -> List[Dict]:
+        """Parse raw AI responses (or exceptions) into exactly one analysis per redline.
+        
+        Each redline owns a preallocated slot at its original position, so the
+        result order never depends on the order responses were produced in.
+        `decoded` is the result of _decode_responses_in_pool when the caller has
+        already run it.
+        """
+        if decoded is None:
+            decoded = self._decode_responses_in_pool(responses)
+        all_analyses: List[Optional[Dict]] = [None] * sum(len(group) for group in groups)
+        start = 0
+        for request_idx, (group, analysis) in enumerate(zip(groups, responses), 1):
+            all_analyses[start:start + len(group)] = self._group_analyses(
+                request_idx, group, analysis, decoded[request_idx - 1]
+            )
+            start += len(group)
+        
+        logger.info("✓ Completed analysis of %d redline(s)", len(all_analyses))
         return all_analyses
     
-    def _format_single_redline_for_analysis(self, redline: Dict, number: int) -> str:
-        """Format a single redline for AI analysis."""
-        redline_type = redline.get('type', 'Unknown')
-        text_info = ""
+    def _group_analyses(self, request_idx: int, group: List[Dict], analysis, decoded=None) -> List[Dict]:
+        """Turn one request's response (or exception) into one analysis per redline, in group order."""
+        if isinstance(analysis, Exception):
+            logger.error("    ✗ ERROR calling AI for request %d: %s: %s",
+                         request_idx, type(analysis).__name__, analysis)
+            return [self._fallback_analysis(redline, f'AI analysis failed: {str(analysis)}') for redline in group]
         
-        # Handle replacements properly - show both old and new text
-        if redline_type == 'replacement':
-            old_text = redline.get('old_text', '')
-            new_text = redline.get('new_text', '')
-            text_info = f"  Old Text (deleted): {old_text}\n  New Text (inserted): {new_text}"
-        else:
-            text_info = f"  Text: {redline.get('text', '')}"
-        
-        return (
-            f"Redline #{number}:\n"
-            f"  Type: {redline_type}\n"
-            f"{text_info}\n"
-            f"  Author: {redline.get('author', 'Unknown')}\n"
-            f"  Date: {redline.get('date', 'Unknown')}\n"
+        self._log_detail("    Request %d: AI response received (%d chars)", request_idx, len(analysis))
+        
+        # Parse AI response and match each analysis back to its redline
+        try:
+            parsed = self._parse_ai_response(analysis, group, redline_number=1, decoded=decoded)
+        except Exception as e:
+            # Only materialize the traceback when it will actually be emitted
+            logger.error("    ✗ ERROR parsing AI response: %s: %s", type(e).__name__, e,
+                         exc_info=logger.isEnabledFor(self._detail_level))
+            # If parsing failed, create a basic analysis entry
+            return [self._fallback_analysis(redline, f'Analysis parsing error: {str(e)}') for redline in group]
+        
+        # Redlines are dicts, so match them back by identity
+        results: List[Optional[Dict]] = [None] * len(group)
+        slot_of = {id(redline): slot for slot, redline in enumerate(group)}
+        for item in parsed or []:
+            slot = slot_of.get(id(item['redline']))
+            if slot is not None and results[slot] is None:
+                results[slot] = item
+        
+        filled = 0
+        for slot, redline in enumerate(group):
+            if results[slot] is not None:
+                filled += 1
+            else:
+                logger.warning("    ⚠ No analysis returned for a redline, creating fallback analysis")
+                # If parsing failed, create a basic analysis entry
+                results[slot] = self._fallback_analysis(
+                    redline,
+                    'Analysis parsing failed - AI response format may be incorrect'
+                )
+        self._log_detail("    ✓ Analysis parsed for %d of %d redline(s)", filled, len(group))
+        return results
+    
+    def _decode_responses_in_pool(self, responses: List) -> List:
+        """Decode large sets of responses across CPU cores.
+        
+        Returns one _decode_ai_response_in_worker result per response, or None where
+        the response is left to be decoded inline. Small runs skip the pool since
+        starting worker processes costs more than the decoding itself.
+        """
+        decoded = [None] * len(responses)
+        texts = [(idx, response) for idx, response in enumerate(responses) if isinstance(response, str)]
+        if len(texts) < PARSE_POOL_MIN_RESPONSES:
+            return decoded
+        
+        try:
+            results = _get_parse_pool().map(
+                _decode_ai_response_in_worker,
+                [response for _, response in texts],
+                chunksize=8
+            )
+            for (idx, _), result in zip(texts, results):
+                decoded[idx] = result
+        except Exception as e:
+            # e.g. no multiprocessing support on serverless hosts
+            logger.warning("  Parallel response parsing unavailable (%s), parsing inline", e)
+            return [None] * len(responses)
+        return decoded
+    
+    def _fallback_analysis(self, redline: Dict, assessment: str) -> Dict:
+        """Build the placeholder analysis used when a redline could not be analyzed."""
+        return {
+            'redline': redline,
+            'playbook_principle': '',
+            'assessment': assessment,
+            'response': 'Please review this change manually',
+            'fallbacks': '',
+            'risk_level': 'Medium',
+            'comment_text': 'Please review this change against the legal playbook.',
+            'auto_redline_action': 'comment_only',
+            'auto_redline_text': ''
+        }
+    
+    def _redline_block(self, redline: Dict, number: int) -> str:
+        """Format one redline as a numbered block for the AI prompt."""
+        get = redline.get
+        old_text = get('old_text', '')
+        return _format_redline_block(
+            get('type', 'Unknown'),
+            old_text,
+            get('new_text', ''),
+            get('text', ''),
+            get('author', 'Unknown'),
+            get('date', 'Unknown'),
+            number,
+            _context_excerpt(get('context', ''), old_text, get('context_offset'))
         )
     
     def _format_redlines_for_analysis(self, redlines: List[Dict]) -> str:
         """Format redlines for AI analysis."""
-        formatted = []
-        for idx, redline in enumerate(redlines, 1):
-            redline_type = redline.get('type', 'Unknown')
-            text_info = ""
-            
-            if redline_type == 'replacement':
-                old_text = redline.get('old_text', '')
-                new_text = redline.get('new_text', '')
-                text_info = f"  Old Text (deleted): {old_text}\n  New Text (inserted): {new_text}"
+        redline_block = self._redline_block
+        return '\n'.join([redline_block(redline, idx) for idx, redline in enumerate(redlines, 1)])
+    
+    def _build_prompt_prefix(self, playbook_text: str, doc_head: str, context: Optional[str]) -> str:
+        """Fill in the shared part of the analysis prompt.
+        
+        The instructions, playbook, document excerpt and context are byte-identical
+        for every request in a run, so providers can serve them from their prompt
+        cache; only the suffix (the redlines themselves) varies between requests.
+        """
+        return _ANALYSIS_PROMPT_PREFIX.format_map({
+            'format_instructions': (
+                _STRUCTURED_FORMAT_INSTRUCTIONS if self._uses_structured_output() else _JSON_FORMAT_INSTRUCTIONS
+            ),
+            'examples': _PROMPT_EXAMPLES if self.include_examples else '',
+            'playbook_text': playbook_text,
+            'doc_head': doc_head,
+            'context': context or 'None provided'
+        })
+    
+    def _build_prompt_suffix(self, redlines_summary: str) -> str:
+        """Fill in the per-request part of the analysis prompt."""
+        return _ANALYSIS_PROMPT_SUFFIX_HEAD + redlines_summary + '\n'
+    
+    def _uses_structured_output(self) -> bool:
+        """Whether the API enforces ANALYSIS_SCHEMA for the configured model."""
+        if self.provider == "anthropic":
+            return True
+        model = self.model.lower()
+        return (model.startswith(_STRUCTURED_OUTPUT_MODEL_PREFIXES)
+                and not model.startswith(_EARLY_REASONING_MODEL_PREFIXES)
+                and model not in _PRE_STRUCTURED_OUTPUT_MODELS)
+    
+    def _supports_json_mode(self) -> bool:
+        """Whether the configured OpenAI model accepts the json_object response_format."""
+        model = self.model.lower()
+        return model in _JSON_MODE_MODELS or model.startswith(_JSON_MODE_MODEL_PREFIXES)
+    
+    def _request_kwargs(self, prompt: Tuple[str, str]) -> Dict:
+        """Build the provider-specific request arguments for a (prefix, suffix) prompt."""
+        prefix, suffix = prompt
+        if self.provider == "openai":
+            if self._uses_structured_output():
+                response_format = {
+                    "type": "json_schema",
+                    "json_schema": {"name": "redline_analyses", "schema": ANALYSIS_SCHEMA, "strict": True}
+                }
+            elif self._supports_json_mode():
+                response_format = {"type": "json_object"}
             else:
-                text_info = f"  Text: {redline.get('text', '')}"
-            
-            formatted.append(
-                f"Redline #{idx}:\n"
-                f"  Type: {redline_type}\n"
-                f"{text_info}\n"
-                f"  Author: {redline.get('author', 'Unknown')}\n"
-                f"  Date: {redline.get('date', 'Unknown')}\n"
+                response_format = None
+            model = self.model.lower()
+            # OpenAI caches identical prompt prefixes automatically
+            if model.startswith(_EARLY_REASONING_MODEL_PREFIXES):
+                messages = [{"role": "user", "content": _SYSTEM_PROMPT + "\n\n" + prefix + suffix}]
+            else:
+                instructions_role = "developer" if model.startswith(_REASONING_MODEL_PREFIXES) else "system"
+                messages = [
+                    {"role": instructions_role, "content": _SYSTEM_PROMPT},
+                    {"role": "user", "content": prefix + suffix}
+                ]
+            kwargs = {
+                'model': self.model,
+                'messages': messages,
+                'response_format': response_format
+            }
+            if not model.startswith(_REASONING_MODEL_PREFIXES):
+                kwargs['temperature'] = 0.3
+            return kwargs
+        # Forcing the tool call makes Anthropic return the analyses as schema-checked tool input
+        return {
+            'model': self.model,
+            'max_tokens': 4000,
+            'system': _SYSTEM_PROMPT + " Always respond with valid JSON.",
+            'messages': [
+                {"role": "user", "content": [
+                    # Mark the shared prefix as cacheable so only the redlines are re-processed
+                    {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+                    {"type": "text", "text": suffix}
+                ]}
+            ],
+            'tools': [{
+                "name": ANALYSIS_TOOL_NAME,
+                "description": "Record the analysis of every redline.",
+                "input_schema": ANALYSIS_SCHEMA
+            }],
+            'tool_choice': {"type": "tool", "name": ANALYSIS_TOOL_NAME}
+        }
+    
+    def _anthropic_message_text(self, message) -> str:
+        """Return the analyses JSON from an Anthropic message.
+        
+        The forced tool call carries the analyses as already-decoded input; it is
+        serialized back to text so every provider path yields a JSON string.
+        """
+        for block in message.content:
+            if block.type == 'tool_use' and block.name == ANALYSIS_TOOL_NAME:
+                return json.dumps(block.input)
+        return ''.join(block.text for block in message.content if block.type == 'text')
+    
+    def _log_prompt_cache_usage(self, usage) -> None:
+        """Log how much of a prompt was served from the provider's prompt cache."""
+        if not logger.isEnabledFor(self._detail_level):
+            return
+        if self.provider == "anthropic":
+            self._log_detail("    Prompt cache: %d token(s) read, %d written",
+                             usage.cache_read_input_tokens or 0, usage.cache_creation_input_tokens or 0)
+        else:
+            details = getattr(usage, 'prompt_tokens_details', None)
+            cached = getattr(details, 'cached_tokens', None) or 0
+            self._log_detail("    Prompt cache: %d of %d prompt token(s) cached", cached, usage.prompt_tokens)
+    
+    def _retry_delay(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """Delay before retry number attempt+1.
+        
+        Honors the provider's Retry-After header when the error carries one,
+        otherwise uses randomized exponential backoff (1s up to 60s).
+        """
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None)
+        if headers is not None:
+            try:
+                if headers.get('retry-after-ms'):
+                    return min(MAX_RETRY_DELAY, float(headers['retry-after-ms']) / 1000.0)
+                if headers.get('retry-after'):
+                    return min(MAX_RETRY_DELAY, float(headers['retry-after']))
+            except ValueError:
+                # An HTTP-date Retry-After falls back to backoff
+                pass
+        return random.uniform(1.0, min(MAX_RETRY_DELAY, 2.0 ** (attempt + 1)))
+    
+    def _create_async_client(self):
+        """Create an async client for the configured provider.
+        
+        A fresh client is created per analysis run so its connection pool is bound
+        to the event loop that uses it; it is shared by all concurrent requests.
+        The pool keeps one keep-alive connection per concurrent request so TCP/TLS
+        setup is paid once per connection rather than once per call.
+        """
+        import httpx
+        
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency
+        )
+        if self.provider == "openai":
+            return self._sdk.AsyncOpenAI(
+                api_key=self.client.api_key,
+                max_retries=0,
+                http_client=self._sdk.DefaultAsyncHttpxClient(limits=limits)
             )
-        return '\n'.join(formatted)
+        return self._sdk.AsyncAnthropic(
+            api_key=self.client.api_key,
+            max_retries=0,
+            http_client=self._sdk.DefaultAsyncHttpxClient(limits=limits)
+        )
     
-    def _build_analysis_prompt(
+    async def _call_ai_async(
         self,
-        playbook_text: str,
-        redlines_summary: str,
-        document_text: str,
-        context: Optional[str]
+        client,
+        prompt: Tuple[str, str],
+        on_attempt: Optional[Callable[[], Callable[[str], None]]] = None
     ) -> str:
-        """Build the prompt for AI analysis."""
-        prompt = f"""You are a legal technology assistant analyzing redlines (tracked changes) in a legal document against a legal playbook.
-
-LEGAL PLAYBOOK:
-{playbook_text}
-
-DOCUMENT CONTEXT:
-{document_text[:2000]}...
-
-REDLINES TO ANALYZE:
-{redlines_summary}
-
-TASK:
-Analyze each redline and determine if it should be accepted, rejected with a counter-redline, or just commented on. For each redline:
-
-1. FIRST: Find the specific playbook clause/principle that applies to this redline
-2. QUOTE the exact playbook text in "playbook_principle" - this is REQUIRED
-3. THEN assess whether the change aligns with or violates the playbook
-4. Determine the appropriate AUTO-REDLINE ACTION:
-   - "accept": The change is acceptable per the playbook (no counter-redline needed)
-   - "reject_restore": Reject the change and restore the original text (for deletions: restore deleted text; for replacements: restore old text)
-   - "reject_replace": Reject the change and insert specific alternative text from the playbook
-   - "comment_only": The playbook doesn't specify exact replacement text, so only add a comment
-5. If action is "reject_restore" or "reject_replace", provide the EXACT text to insert as "auto_redline_text"
-6. Determine the risk level (Low/Medium/High)
-7. Create a clear, actionable comment explaining the reasoning
-
-CRITICAL - PLAYBOOK REFERENCE REQUIRED:
-- You MUST cite the specific playbook clause FIRST before making any recommendation
-- The "playbook_principle" field MUST contain the EXACT quoted text from the playbook above
-- Include the clause number/name (e.g., "CLAUSE 6: TERM AND TERMINATION - Standard Position: 3-year term...")
-- If no specific playbook clause applies, state "No specific playbook guidance found for this change"
-- All assessments and actions MUST be justified by the cited playbook principle
-
-CRITICAL FOR AUTO-REDLINING:
-- auto_redline_text must contain ONLY the specific text being changed - NOT the entire sentence or clause
-- Match the scope exactly: if "California" was changed to "Japan", auto_redline_text should be just "the State of California" (the deleted portion), NOT the whole governing law sentence
-- For DELETIONS: If rejecting, set action to "reject_restore" and auto_redline_text to EXACTLY the deleted text (nothing more, nothing less)
-- For INSERTIONS: If rejecting, set action to "reject_replace" with empty auto_redline_text (the insertion will be struck through)
-- For REPLACEMENTS: If rejecting, set action to "reject_restore" to restore the old_text exactly, or "reject_replace" with ONLY the replacement portion
-- If the playbook has fallback ranges (e.g., "1 to 5 years acceptable"), and the change falls within that range, use "accept"
-- Only use "comment_only" when the playbook doesn't provide specific language and you cannot determine exact replacement text
-
-IMPORTANT: Do NOT repeat existing document text. Only provide the SPECIFIC portion that needs to be inserted.
-
-Format your response as JSON with this structure:
-{{
-  "analyses": [
-    {{
-      "redline_number": 1,
-      "playbook_principle": "Exact text of the playbook principle that applies to this redline",
-      "assessment": "Detailed assessment of how the change aligns with the playbook",
-      "auto_redline_action": "accept|reject_restore|reject_replace|comment_only",
-      "auto_redline_text": "ONLY the specific text to insert (matches the scope of what was changed - not the full sentence)",
-      "response": "Recommended actions based on the playbook principle - be specific about what should be done",
-      "fallbacks": "Recommended fallback positions or alternative approaches if the primary recommendation cannot be accepted.",
-      "risk_level": "Low|Medium|High",
-      "comment_text": "Inline comment explaining the auto-redline action and reasoning (clear, actionable guidance for the reviewer)"
-    }}
-  ]
-}}
-
-EXAMPLES:
-- Counterparty changes "three (3) years" to "5 years": auto_redline_text = "three (3) years" (just the changed portion)
-- Counterparty deletes "including AI training restrictions": auto_redline_text = "including AI training restrictions" (exactly what was deleted)
-- Counterparty changes "the State of California" to "Japan": auto_redline_text = "the State of California" (just the replaced text, NOT the full sentence)
-- Counterparty adds new indemnification clause: auto_redline_text = "" (empty - the insertion will be struck through)
-
-Additional context: {context or 'None provided'}
-"""
-        return prompt
+        """Call the AI API and return the response, retrying transient errors with backoff.
+        
+        Each attempt is one _call_ai_once_async call; up to max_retries attempts are
+        made and the last error is re-raised. The delay before a retry honors the
+        provider's Retry-After header (see _retry_delay) and sleeps only the failing
+        request; other requests keep running.
+        
+        `on_attempt`, if given, is called at the start of every attempt and returns
+        a callback that receives that attempt's response text as it streams in.
+        """
+        for attempt in range(self.max_retries):
+            try:
+                on_text = on_attempt() if on_attempt is not None else None
+                return await self._call_ai_once_async(client, prompt, on_text)
+            except self._retryable_errors as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = self._retry_delay(attempt, e)
+                logger.warning("AI request failed (%s), retrying in %.1fs", type(e).__name__, delay)
+                await asyncio.sleep(delay)
     
-    def _call_ai(self, prompt: str) -> str:
-        """Call AI API and return response."""
+    async def _call_ai_once_async(
+        self,
+        client,
+        prompt: Tuple[str, str],
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Make a single async AI API call using the given async client.
+        
+        Streaming lets many concurrent requests receive their output as it is
+        generated instead of each holding a fully buffered response. `on_text`,
+        if given, receives each piece of response text as it arrives. The client is
+        created with SDK retries disabled since _call_ai_async handles them.
+        """
+        parts = []
         if self.provider == "openai":
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a legal technology assistant specializing in contract review and redline analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"} if "gpt-4" in self.model.lower() else None
+            stream = await client.chat.completions.create(
+                stream=True,
+                stream_options={"include_usage": True},
+                **self._request_kwargs(prompt)
             )
-            return response.choices[0].message.content
+            async for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content or ''
+                    parts.append(delta)
+                    if on_text is not None and delta:
+                        on_text(delta)
+                if chunk.usage:
+                    self._log_prompt_cache_usage(chunk.usage)
         elif self.provider == "anthropic":
-            # Anthropic models support JSON mode in newer versions
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=4000,
-                system="You are a legal technology assistant specializing in contract review and redline analysis. Always respond with valid JSON.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.content[0].text
+            async with client.messages.stream(**self._request_kwargs(prompt)) as stream:
+                if on_text is not None:
+                    # The forced tool call streams its JSON input as partial_json deltas
+                    async for event in stream:
+                        if event.type == 'input_json':
+                            on_text(event.partial_json)
+                        elif event.type == 'text':
+                            on_text(event.text)
+                message = await stream.get_final_message()
+            self._log_prompt_cache_usage(message.usage)
+            parts.append(self._anthropic_message_text(message))
+        return ''.join(parts)
     
-    def _parse_ai_response(self, ai_response: str, redlines: List[Dict], redline_number: int = 1) -> List[Dict]:
+    def _parse_ai_response(
+        self,
+        ai_response: str,
+        redlines: List[Dict],
+        redline_number: int = 1,
+        decoded: Optional[Tuple[Optional[List[Dict]], Optional[str]]] = None
+    ) -> List[Dict]:
         """Parse AI response and match to redlines.
         
         Args:
             ai_response: The raw AI response text
             redlines: List of redlines being analyzed
             redline_number: The number of the redline being analyzed (for single redline analysis)
+            decoded: Result of _decode_ai_response_in_worker when the response was
+                already decoded in the parse pool
         """
-        import json
-        import re
-        
         try:
-            # Try to extract JSON from response
-            # Handle cases where AI wraps JSON in markdown code blocks
-            response_text = ai_response.strip()
-            
-            # Remove markdown code blocks if present
-            if response_text.startswith('```'):
-                # Extract JSON from code block
-                lines = response_text.split('\n')
-                json_start = None
-                json_end = None
-                for i, line in enumerate(lines):
-                    if line.strip().startswith('```'):
-                        if json_start is None:
-                            json_start = i + 1
-                        else:
-                            json_end = i
-                            break
-                if json_start and json_end:
-                    response_text = '\n'.join(lines[json_start:json_end])
-            
-            # Try to find JSON object in the response
-            # Look for { ... } pattern
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                response_text = json_match.group(0)
-            
-            data = json.loads(response_text)
-            
-            # Handle both array format and single object format
-            analyses = []
-            if 'analyses' in data:
-                analyses = data.get('analyses', [])
-            elif isinstance(data, list):
-                analyses = data
-            elif isinstance(data, dict) and 'redline_number' in data:
-                # Single analysis object
-                analyses = [data]
-            elif isinstance(data, dict):
-                # Try to treat the whole object as a single analysis
-                analyses = [data]
+            if decoded is None:
+                analyses = _decode_ai_response(ai_response)
+            else:
+                analyses, json_error = decoded
+                if analyses is None:
+                    return self._unparsed_response_analyses(ai_response, redlines, json_error)
             
-            # Match analyses to redlines
+            # Match analyses to redlines. Analyses with a usable redline_number go first,
+            # so one falling back to the first redline cannot take a numbered analysis's place
             results = []
+            unnumbered = []
             for analysis in analyses:
-                # For single redline analysis, use the provided redline_number
-                # Otherwise, use the redline_number from the analysis
-                if len(redlines) == 1:
-                    redline_idx = 0
+                result = self._match_analysis(analysis, redlines, redline_number, strict=True)
+                if result is not None:
+                    results.append(result)
                 else:
-                    redline_num = analysis.get('redline_number', redline_number) - 1
-                    redline_idx = redline_num if 0 <= redline_num < len(redlines) else 0
-                
-                if 0 <= redline_idx < len(redlines):
-                    results.append({
-                        'redline': redlines[redline_idx],
-                        'playbook_principle': analysis.get('playbook_principle', ''),
-                        'assessment': analysis.get('assessment', ''),
-                        'response': analysis.get('response', ''),
-                        'fallbacks': analysis.get('fallbacks', ''),
-                        'risk_level': analysis.get('risk_level', 'Medium'),
-                        'comment_text': analysis.get('comment_text', ''),
-                        'auto_redline_action': analysis.get('auto_redline_action', 'comment_only'),
-                        'auto_redline_text': analysis.get('auto_redline_text', '')
-                    })
+                    unnumbered.append(analysis)
+            for analysis in unnumbered:
+                result = self._match_analysis(analysis, redlines, redline_number)
+                if result is not None:
+                    results.append(result)
             
             return results if results else None
         
         except json.JSONDecodeError as e:
-            print(f"    JSON decode error: {e}")
-            print(f"    Response text (first 500 chars): {ai_response[:500]}")
-            # Fallback: create simple responses
-            results = []
-            for redline in redlines:
-                results.append({
-                    'redline': redline,
-                    'playbook_principle': 'General Legal Guidelines',
-                    'assessment': 'Requires review - JSON parsing failed',
-                    'response': ai_response[:200] if ai_response else 'Please review manually',
-                    'fallbacks': '',
-                    'risk_level': 'Medium',
-                    'comment_text': 'Please review this change against legal playbook.',
-                    'auto_redline_action': 'comment_only',
-                    'auto_redline_text': ''
-                })
-            return results
+            return self._unparsed_response_analyses(ai_response, redlines, e)
         except Exception as e:
-            print(f"    Unexpected error parsing response: {type(e).__name__}: {e}")
-            import traceback
-            print(f"    Traceback: {traceback.format_exc()}")
+            logger.error("    Unexpected error parsing response: %s: %s", type(e).__name__, e,
+                         exc_info=logger.isEnabledFor(self._detail_level))
             return None
-
+    
+    def _match_analysis(
+        self,
+        analysis: Dict,
+        redlines: List[Dict],
+        redline_number: int = 1,
+        strict: bool = False
+    ) -> Optional[Dict]:
+        """Build the analysis entry for one decoded analysis object and its redline.
+        
+        A missing, non-integer or out-of-range redline_number falls back to
+        `redline_number` and then to the first redline; with `strict` (used while
+        streaming, before the whole response can be checked) such an analysis is
+        not matched and None is returned instead.
+        """
+        # For single redline analysis, use the provided redline_number
+        # Otherwise, use the redline_number from the analysis
+        if len(redlines) == 1:
+            redline_idx = 0
+        else:
+            number = analysis.get('redline_number')
+            if isinstance(number, str) and number.strip().isdigit():
+                number = int(number)
+            if not isinstance(number, int) or isinstance(number, bool):
+                if strict:
+                    return None
+                number = redline_number
+            redline_idx = number - 1
+            if not 0 <= redline_idx < len(redlines):
+                if strict:
+                    return None
+                redline_idx = 0
+        return {
+            'redline': redlines[redline_idx],
+            'playbook_principle': analysis.get('playbook_principle', ''),
+            'assessment': analysis.get('assessment', ''),
+            'response': analysis.get('response', ''),
+            'fallbacks': analysis.get('fallbacks', ''),
+            'risk_level': analysis.get('risk_level', 'Medium'),
+            'comment_text': analysis.get('comment_text', ''),
+            'auto_redline_action': analysis.get('auto_redline_action', 'comment_only'),
+            'auto_redline_text': analysis.get('auto_redline_text', '')
+        }
+    
+    def _unparsed_response_analyses(self, ai_response: str, redlines: List[Dict], error) -> List[Dict]:
+        """Fallback analyses for a response that contained no usable JSON."""
+        logger.warning("    JSON decode error: %s", error)
+        self._log_detail("    Response text (first 500 chars): %s", ai_response[:500])
+        # Fallback: create simple responses
+        results = []
+        for redline in redlines:
+            results.append({
+                'redline': redline,
+                'playbook_principle': 'General Legal Guidelines',
+                'assessment': 'Requires review - JSON parsing failed',
+                'response': ai_response[:200] if ai_response else 'Please review manually',
+                'fallbacks': '',
+                'risk_level': 'Medium',
+                'comment_text': 'Please review this change against legal playbook.',
+                'auto_redline_action': 'comment_only',
+                'auto_redline_text': ''
+            })
+        return results
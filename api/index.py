@@ -1,3 +1,5 @@
+import html
+import importlib.util
 import sys
 import os
 import traceback
@@ -8,29 +10,33 @@ sys.path.insert(0, parent_dir)
 os.chdir(parent_dir)
 os.environ['VERCEL'] = '1'
 
-# Import Flask app with error handling
-# First, try to ensure lxml is available (python-docx requires it)
-try:
-    from lxml import etree
-    print("✓ lxml.etree imported successfully", flush=True)
-except ImportError as lxml_error:
-    print(f"⚠ WARNING: lxml.etree import failed: {lxml_error}", flush=True)
-    print("⚠ This may cause issues with python-docx. Attempting to continue...", flush=True)
+# Native dependencies that commonly break on Vercel builds
+# (python-docx needs lxml; the OpenAI/Anthropic SDKs need pydantic-core)
+_preflight_done = False
 
-# Check pydantic-core availability - critical for OpenAI/Anthropic SDKs
-# This is a known issue with pydantic-core binary wheels in Vercel Python 3.12
-try:
-    import pydantic_core._pydantic_core
-    print("✓ pydantic_core._pydantic_core imported successfully", flush=True)
-except (ImportError, AttributeError) as pydantic_error:
-    print(f"❌ CRITICAL: pydantic_core._pydantic_core import failed: {pydantic_error}", flush=True)
-    print("❌ This will cause failures when using OpenAI/Anthropic SDKs", flush=True)
-    # Try to diagnose the issue
+
+def _run_diagnostics():
+    """Import the compiled extensions and report details on any failure."""
+    try:
+        from lxml import etree
+        print("✓ lxml.etree imported successfully", flush=True)
+    except ImportError as lxml_error:
+        print(f"⚠ WARNING: lxml.etree import failed: {lxml_error}", flush=True)
+        print("⚠ This may cause issues with python-docx. Attempting to continue...", flush=True)
+    
+    # This is a known issue with pydantic-core binary wheels in Vercel Python 3.12
     try:
-        import pydantic_core
-        print(f"⚠ pydantic_core module found at: {pydantic_core.__file__}", flush=True)
-        import os
-        core_dir = os.path.dirname(pydantic_core.__file__)
+        import pydantic_core._pydantic_core
+        print("✓ pydantic_core._pydantic_core imported successfully", flush=True)
+    except (ImportError, AttributeError) as pydantic_error:
+        print(f"❌ CRITICAL: pydantic_core._pydantic_core import failed: {pydantic_error}", flush=True)
+        print("❌ This will cause failures when using OpenAI/Anthropic SDKs", flush=True)
+        # Try to diagnose the issue
+        spec = importlib.util.find_spec("pydantic_core")
+        if spec is None or not spec.submodule_search_locations:
+            print("❌ pydantic_core module not found", flush=True)
+            return
+        core_dir = spec.submodule_search_locations[0]
         print(f"⚠ pydantic_core directory: {core_dir}", flush=True)
         # Check for extension files
         try:
@@ -38,24 +44,31 @@ except (ImportError, AttributeError) as pydantic_error:
             print(f"⚠ Files with '_pydantic_core' in name: {files}", flush=True)
         except Exception as e:
             print(f"⚠ Could not list directory: {e}", flush=True)
-    except ImportError as e2:
-        print(f"❌ pydantic_core module not found: {e2}", flush=True)
 
-try:
-    from app import app
-except Exception as e:
-    # If import fails, create a minimal Flask app that shows the error
-    from flask import Flask, jsonify
-    error_app = Flask(__name__)
+
+def _preflight():
+    """Check once per process that the native dependencies are installed.
     
-    error_msg = str(e)
-    error_tb = traceback.format_exc()
+    Only module specs are looked up, so a healthy cold start loads nothing extra;
+    set KENDRES_DIAG=1 to import the extensions and print detailed diagnostics.
+    """
+    global _preflight_done
+    if _preflight_done:
+        return
+    _preflight_done = True
     
-    @error_app.route('/', defaults={'path': ''})
-    @error_app.route('/<path:path>')
-    def error_handler(path):
-        # Return HTML error page for better readability
-        html = f"""
+    if importlib.util.find_spec("lxml") is None:
+        print("⚠ WARNING: lxml is not installed", flush=True)
+        print("⚠ This may cause issues with python-docx. Attempting to continue...", flush=True)
+    if importlib.util.find_spec("pydantic_core") is None:
+        print("❌ CRITICAL: pydantic_core is not installed", flush=True)
+        print("❌ This will cause failures when using OpenAI/Anthropic SDKs", flush=True)
+    if os.getenv('KENDRES_DIAG'):
+        _run_diagnostics()
+
+
+# Page served for every path when the app fails to import
+_ERROR_HTML = """
         <!DOCTYPE html>
         <html>
         <head>
@@ -71,13 +84,35 @@ except Exception as e:
             <div class="error-box">
                 <h1>Application Failed to Load</h1>
                 <h2>Error Message:</h2>
-                <pre>{error_msg}</pre>
+                <pre>{msg}</pre>
                 <h2>Traceback:</h2>
-                <pre>{error_tb}</pre>
+                <pre>{tb}</pre>
             </div>
         </body>
         </html>
         """
-        return html, 500
+
+
+_preflight()
+
+# Import Flask app with error handling
+try:
+    from app import app
+except Exception as e:
+    # If import fails, create a minimal Flask app that shows the error
+    from flask import Flask, jsonify
+    error_app = Flask(__name__)
+    
+    error_msg = str(e)
+    error_tb = traceback.format_exc()
+    # The error never changes, so the page is rendered once; exception text is
+    # escaped since it can contain markup
+    error_page = _ERROR_HTML.format(msg=html.escape(error_msg), tb=html.escape(error_tb))
+    
+    @error_app.route('/', defaults={'path': ''})
+    @error_app.route('/<path:path>')
+    def error_handler(path):
+        # Return HTML error page for better readability
+        return error_page, 500
     
     app = error_app
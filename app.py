@@ -1,18 +1,44 @@
 """Flask web application for RedLine Agent."""
 
+import contextlib
+import hashlib
+import json
+import logging
 import os
 import re
-import uuid
-from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables from .env file FIRST, before any other imports
 load_dotenv()
 
-from flask import Flask, render_template, request, jsonify, send_file, session
+from flask import Flask, Request, Response, render_template, request, jsonify, send_file, send_from_directory, session
+from werkzeug.exceptions import NotFound
 from werkzeug.utils import secure_filename
 import tempfile
 import shutil
+import threading
+from urllib.parse import quote
+
+# Use RE2 (linear-time matching) for the party-name searches when it is installed
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+# Use orjson (escapes in C, emits UTF-8 as-is) to encode converted playbooks when it is installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Compress JSON/text responses (zstd, Brotli or gzip, per Accept-Encoding) when Flask-Compress is installed
+try:
+    from flask_compress import Compress
+    COMPRESS_AVAILABLE = True
+except ImportError:
+    COMPRESS_AVAILABLE = False
 
 # Lazy imports to avoid lxml import errors at startup
 # These will be imported when actually needed
@@ -32,10 +58,166 @@ def get_PlaybookConverter():
     from playbook_converter import PlaybookConverter
     return PlaybookConverter
 
+
+# Contract types manager shared by the read-only lookups; reloaded when
+# contract_types.json changes on disk and dropped after admin edits
+_contract_types_manager = None
+_contract_types_mtime = None
+
+
+def get_contract_types_manager():
+    """Return the shared ContractTypesManager, reloading it if its config file changed."""
+    global _contract_types_manager, _contract_types_mtime
+    if _contract_types_manager is None:
+        _contract_types_manager = get_ContractTypesManager()()
+        _contract_types_mtime = None
+    try:
+        mtime = os.stat(_contract_types_manager.config_path).st_mtime_ns
+    except OSError:
+        mtime = None
+    if _contract_types_mtime is None:
+        _contract_types_mtime = mtime
+    elif mtime != _contract_types_mtime:
+        _contract_types_manager.load_config()
+        _contract_types_mtime = mtime
+    return _contract_types_manager
+
+
+def invalidate_contract_types_manager():
+    """Drop the shared ContractTypesManager so the next lookup re-reads the config."""
+    global _contract_types_manager
+    _contract_types_manager = None
+
+
+# PlaybookConverter keeps no per-conversion state, so one instance serves
+# every request (and every thread) once it has been built
+_playbook_converter = None
+
+
+def get_playbook_converter():
+    """Return the shared PlaybookConverter, importing and building it on first use."""
+    global _playbook_converter
+    if _playbook_converter is None:
+        _playbook_converter = get_PlaybookConverter()()
+    return _playbook_converter
+
+
+class HashingSpoolFile:
+    """Temporary file that hashes uploaded bytes with BLAKE2b as they are spooled.
+    
+    The digest is ready as soon as the upload has been received, so the handler
+    never has to read the file a second time just to hash it.
+    """
+    
+    def __init__(self):
+        self._file = tempfile.TemporaryFile('wb+')
+        self.blake2b = hashlib.blake2b()
+    
+    def write(self, data):
+        self.blake2b.update(data)
+        return self._file.write(data)
+    
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+    
+    def __iter__(self):
+        return iter(self._file)
+
+
+class DiskSpooledRequest(Request):
+    """Request that spools every uploaded file straight to a temporary file.
+    
+    Werkzeug keeps uploads under 500KB in memory; spooling all of them to disk keeps
+    memory use flat however large or numerous the uploaded contracts are.
+    """
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Converted playbooks are cached by content hash; compute it while spooling
+        if self.endpoint == 'convert_playbook':
+            return HashingSpoolFile()
+        return tempfile.TemporaryFile('wb+')
+
+
+# Chunk size used when copying an uploaded file to its destination
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def copy_upload(stream, dest) -> None:
+    """Copy an uploaded file's stream into the open binary file `dest`.
+    
+    Uploads are spooled to temporary files, so the kernel can usually copy
+    file-to-file with sendfile(); otherwise fall back to large Python-level chunks.
+    """
+    try:
+        src_fd = stream.fileno()
+        dest_fd = dest.fileno()
+    except (AttributeError, OSError):
+        shutil.copyfileobj(stream, dest, UPLOAD_CHUNK_SIZE)
+        return
+    
+    dest.flush()
+    offset = stream.tell()
+    remaining = os.fstat(src_fd).st_size - offset
+    sent_any = False
+    while remaining > 0:
+        try:
+            sent = os.sendfile(dest_fd, src_fd, offset, min(remaining, 1 << 30))
+        except OSError:
+            if sent_any:
+                raise
+            # sendfile() can't target regular files on this platform
+            shutil.copyfileobj(stream, dest, UPLOAD_CHUNK_SIZE)
+            return
+        if sent == 0:
+            break
+        sent_any = True
+        offset += sent
+        remaining -= sent
+
+
+def save_upload(file_storage, path: str) -> None:
+    """Copy an uploaded file to `path`."""
+    with open(path, 'wb') as f:
+        copy_upload(file_storage.stream, f)
+
+
+@contextlib.contextmanager
+def atomic_write(path: str, mode: str = 'wb', **kwargs):
+    """Open a temporary file next to `path` and rename it over `path` once written.
+    
+    Readers see either the old file or the complete new one, never a partial write.
+    The temporary file is removed if writing fails.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.upload-', suffix='.tmp')
+    try:
+        with open(fd, mode, **kwargs) as f:
+            yield f
+        # mkstemp creates the file owner-only; keep the usual permissions
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(temp_path)
+        raise
+
+
+# Request logs (and the analyzer's progress logs) go to stderr at INFO
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+
 app = Flask(__name__, static_folder='static', static_url_path='/static')
+app.request_class = DiskSpooledRequest
 # Use environment variable for secret key if available, otherwise generate one
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', os.urandom(24).hex())
 # File size limit removed - no maximum file size restriction
+# Behind Apache/lighttpd, let the web server send downloads itself via X-Sendfile;
+# behind nginx, set X_ACCEL_REDIRECT_PREFIX to an internal location aliased to /
+X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX', '').rstrip('/')
+app.config['USE_X_SENDFILE'] = bool(os.environ.get('USE_X_SENDFILE') or X_ACCEL_REDIRECT_PREFIX)
+if COMPRESS_AVAILABLE:
+    # Only text mimetypes are compressed, so .docx downloads (already zipped) go out as-is
+    app.config['COMPRESS_ALGORITHM'] = ['zstd', 'br', 'gzip']
+    app.config['COMPRESS_MIN_SIZE'] = 4096
+    Compress(app)
 
 # For Vercel/serverless, use /tmp directory which is writable
 if os.environ.get('VERCEL'):
@@ -43,27 +225,41 @@ if os.environ.get('VERCEL'):
 else:
     app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp()
 
+if X_ACCEL_REDIRECT_PREFIX:
+    @app.after_request
+    def x_accel_redirect(response):
+        """Hand send_file() responses to nginx, which streams the file with sendfile()."""
+        path = response.headers.pop('X-Sendfile', None)
+        if path is not None:
+            response.headers['X-Accel-Redirect'] = X_ACCEL_REDIRECT_PREFIX + quote(path)
+        return response
+
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-ALLOWED_EXTENSIONS = {'docx', 'txt', 'doc'}
+ALLOWED_EXTENSIONS = frozenset({'.docx', '.txt', '.doc'})
 
 # Standard playbook location
-STANDARD_PLAYBOOK_PATH = os.path.join(os.path.dirname(__file__), 'playbooks', 'default_playbook.txt')
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+PLAYBOOKS_DIR = os.path.join(APP_DIR, 'playbooks')
+STANDARD_PLAYBOOK_PATH = os.path.join(PLAYBOOKS_DIR, 'default_playbook.txt')
+
+# Playbook chosen when the standard one is missing, keyed by the directory's mtime
+_fallback_playbook_cache = {'mtime': None, 'path': None}
+
+# Content and ETag of the playbook served to the admin page, keyed by (path, mtime_ns, size)
+_playbook_content_cache = {'key': None, 'content': None, 'etag': None}
 
 
 def allowed_file(filename):
     """Check if file extension is allowed."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return os.path.splitext(filename)[1].lower() in ALLOWED_EXTENSIONS
 
 
 def get_playbook_path(contract_type_id: str = None):
     """Get playbook path for a contract type, or default."""
     if contract_type_id:
-        ContractTypesManager = get_ContractTypesManager()
-        ContractTypesManager = get_ContractTypesManager()
-        manager = ContractTypesManager()
-        playbook_path = manager.get_playbook_path(contract_type_id)
+        playbook_path = get_contract_types_manager().get_playbook_path(contract_type_id)
         if playbook_path:
             return playbook_path
     
@@ -72,13 +268,100 @@ def get_playbook_path(contract_type_id: str = None):
         return STANDARD_PLAYBOOK_PATH
     
     # Fallback: try to find any playbook in playbooks directory
-    playbooks_dir = os.path.join(os.path.dirname(__file__), 'playbooks')
-    if os.path.exists(playbooks_dir):
-        for file in os.listdir(playbooks_dir):
-            if file.endswith('.txt'):
-                return os.path.join(playbooks_dir, file)
+    try:
+        mtime = os.stat(PLAYBOOKS_DIR).st_mtime_ns
+    except OSError:
+        return None
+    # The directory's mtime changes whenever a file is added, removed or renamed
+    if _fallback_playbook_cache['mtime'] != mtime:
+        with os.scandir(PLAYBOOKS_DIR) as entries:
+            path = next((entry.path for entry in entries if entry.name.endswith('.txt')), None)
+        _fallback_playbook_cache.update(mtime=mtime, path=path)
+    return _fallback_playbook_cache['path']
+
+
+# Patterns used by extract_parties, compiled once at import
+# Whitespace that needs normalizing to a single space: runs, and lone tabs or
+# newlines. Single spaces never match, so already-normal text is returned as is
+_WHITESPACE_RE = re.compile(r'\s{2,}|[^\S ]')
+_LEADING_AND_RE = re.compile(r'^and\s+', re.IGNORECASE)
+# Trailing descriptors cut from a party name: "a Delaware corporation ...",
+# "with offices at ...", "located at ..."
+_TRAILING_DESCRIPTOR_RE = re.compile(
+    r',?\s*(?:a\s+\w+\s+(?:corporation|company|LLC|limited|partnership)'
+    r'|with\s+(?:offices?|headquarters|principal\s+place)'
+    r'|located\s+at).*$',
+    re.IGNORECASE
+)
+
+# An entity name ending in a corporate suffix, e.g. "Acme Widgets, Inc."
+_ENTITY_NAME = r'([A-Z][A-Za-z0-9 .,&\'()\-]+?(?:Inc\.|LLC|Corp\.|Corporation|Ltd\.|L\.P\.|LLP|Company|Co\.))'
+
+
+
+def _compile_party_pattern(pattern: str):
+    """Compile a case-insensitive party-name search pattern.
     
-    return None
+    The lazy, bounded gaps in these patterns can backtrack heavily on long
+    contracts with Python's re; RE2 matches them in time linear in the text.
+    """
+    if RE2_AVAILABLE:
+        return re2.compile('(?i)' + pattern)
+    return re.compile(pattern, re.IGNORECASE)
+
+
+# Name followed by a quoted defined term: ... ("Company") or (the "Company")
+_COMPANY_PATTERNS = [
+    _compile_party_pattern(_ENTITY_NAME + r'[^(]*?\(\s*(?:the\s+)?["""]Company["""]\s*\)'),
+    _compile_party_pattern(r'([A-Z][A-Za-z0-9 .,&\'()\-]{5,150})[^(]{0,200}?\(\s*(?:the\s+)?["""]Company["""]\s*\)'),
+]
+_COUNTERPARTY_PATTERNS = [
+    _compile_party_pattern(_ENTITY_NAME + r'[^(]*?\(\s*(?:the\s+)?["""]Counterparty["""]\s*\)'),
+    _compile_party_pattern(r'([A-Z][A-Za-z0-9 .,&\'()\-]{5,150})[^(]{0,200}?\(\s*(?:the\s+)?["""]Counterparty["""]\s*\)'),
+]
+
+# Other common pairs of defined terms (Disclosing Party/Receiving Party, Client/Vendor, etc.)
+_OTHER_PARTY_TERMS = [
+    ('Disclosing Party', 'Receiving Party'),
+    ('Discloser', 'Receiver'),
+    ('Client', 'Vendor'),
+    ('Customer', 'Provider'),
+    ('Party A', 'Party B'),
+    ('First Party', 'Second Party'),
+]
+
+
+def _defined_term_pattern(term: str):
+    """Compile the pattern for an entity name followed by an optionally quoted defined term."""
+    return _compile_party_pattern(
+        _ENTITY_NAME + r'[^(]*?\(\s*(?:the\s+)?["""]?' + re.escape(term) + r'["""]?\s*\)'
+    )
+
+
+# (term key, pattern) for each side of each pair; keys are the lowercased terms
+# used to look up declarations found by _DEFINED_TERM_MARKER_RE
+_OTHER_PARTY_PATTERNS = [
+    (term1.lower(), _defined_term_pattern(term1), term2.lower(), _defined_term_pattern(term2))
+    for term1, term2 in _OTHER_PARTY_TERMS
+]
+
+# Any defined-term declaration such as ("Company") or (the Client), used to find
+# in one pass which terms a document declares and where
+_DEFINED_TERM_MARKER_RE = _compile_party_pattern(
+    r'\(\s*(?:the\s+)?["""]?('
+    + '|'.join(re.escape(term) for pair in [('Company', 'Counterparty')] + _OTHER_PARTY_TERMS for term in pair)
+    + r')["""]?\s*\)'
+)
+
+# Fallback: "by and between <name> and <name>"
+_BETWEEN_RE = _compile_party_pattern(
+    r'by\s+and\s+between[:\s]+' + _ENTITY_NAME + r'.*?(?:and|,)\s+' + _ENTITY_NAME
+)
+
+
+# Parties are defined in the preamble; only this many leading characters of a
+# document are searched unless the parties are not found there
+PARTY_PREAMBLE_CHARS = 16384
 
 
 def extract_parties(document_text: str) -> tuple[str, str]:
@@ -90,20 +373,45 @@ def extract_parties(document_text: str) -> tuple[str, str]:
     if not document_text:
         return "", ""
     
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', document_text)
+    # Search the preamble first: up to the end of the recitals ("NOW, THEREFORE")
+    # or the first PARTY_PREAMBLE_CHARS characters, whichever comes first
+    preamble = _WHITESPACE_RE.sub(' ', document_text[:PARTY_PREAMBLE_CHARS])
+    recitals_end = preamble.lower().find('now, therefore')
+    if recitals_end >= 0:
+        preamble = preamble[:recitals_end]
+    company_name, counterparty_name = _find_parties(preamble)
+    
+    # Fall back to the whole document when the preamble did not name both parties
+    if (not company_name or not counterparty_name) and (
+        recitals_end >= 0 or len(document_text) > PARTY_PREAMBLE_CHARS
+    ):
+        company_name, counterparty_name = _find_parties(_WHITESPACE_RE.sub(' ', document_text))
+    
+    return company_name, counterparty_name
+
+
+def _find_parties(text: str) -> tuple[str, str]:
+    """Find (company_name, counterparty_name) in whitespace-normalized text."""
+    # Every defined-term match ends at a declaration of its term, so a single scan
+    # for declarations lets each search skip absent terms and stop at the last one
+    term_ends = {}
+    for m in _DEFINED_TERM_MARKER_RE.finditer(text):
+        term_ends[m.group(1).lower()] = m.end()
+    
+    def search_term(pat, term_key: str):
+        """Search for a defined-term pattern, bounded by the term's last declaration."""
+        end = term_ends.get(term_key)
+        return pat.search(text, 0, end) if end is not None else None
     
     def clean_name(name: str) -> str:
         """Clean and extract the core company name."""
         name = name.strip(' .,"""\'')
-        name = re.sub(r'\s+', ' ', name)
+        name = _WHITESPACE_RE.sub(' ', name)
         # Remove leading "and" (common when extracting second party)
-        name = re.sub(r'^and\s+', '', name, flags=re.IGNORECASE)
-        # Remove trailing descriptors like "a Delaware corporation with offices at..."
-        name = re.sub(r',?\s*a\s+\w+\s+(?:corporation|company|LLC|limited|partnership).*$', '', name, flags=re.IGNORECASE)
-        # Remove trailing address patterns
-        name = re.sub(r',?\s*with\s+(?:offices?|headquarters|principal\s+place).*$', '', name, flags=re.IGNORECASE)
-        name = re.sub(r',?\s*located\s+at.*$', '', name, flags=re.IGNORECASE)
+        name = _LEADING_AND_RE.sub('', name)
+        # Remove trailing descriptors and address patterns like
+        # "a Delaware corporation with offices at..." in a single pass
+        name = _TRAILING_DESCRIPTOR_RE.sub('', name)
         return name.strip(' .,')[:150]
     
     company_name = ""
@@ -113,25 +421,15 @@ def extract_parties(document_text: str) -> tuple[str, str]:
     # Pattern: [Name, Corp type, address info] ("Company") or (the "Company") or ("Company")
     
     # Find Company - look for text before ("Company") or (the "Company") or ("Company")
-    company_patterns = [
-        r'([A-Z][A-Za-z0-9 .,&\'()\-]+?(?:Inc\.|LLC|Corp\.|Corporation|Ltd\.|L\.P\.|LLP|Company|Co\.))[^(]*?\(\s*(?:the\s+)?["""]Company["""]\s*\)',
-        r'([A-Z][A-Za-z0-9 .,&\'()\-]{5,150})[^(]{0,200}?\(\s*(?:the\s+)?["""]Company["""]\s*\)',
-    ]
-    
-    for pat in company_patterns:
-        m = re.search(pat, text, re.IGNORECASE)
+    for pat in _COMPANY_PATTERNS:
+        m = search_term(pat, 'company')
         if m:
             company_name = clean_name(m.group(1))
             break
     
     # Find Counterparty - look for text before ("Counterparty") or (the "Counterparty")
-    counterparty_patterns = [
-        r'([A-Z][A-Za-z0-9 .,&\'()\-]+?(?:Inc\.|LLC|Corp\.|Corporation|Ltd\.|L\.P\.|LLP|Company|Co\.))[^(]*?\(\s*(?:the\s+)?["""]Counterparty["""]\s*\)',
-        r'([A-Z][A-Za-z0-9 .,&\'()\-]{5,150})[^(]{0,200}?\(\s*(?:the\s+)?["""]Counterparty["""]\s*\)',
-    ]
-    
-    for pat in counterparty_patterns:
-        m = re.search(pat, text, re.IGNORECASE)
+    for pat in _COUNTERPARTY_PATTERNS:
+        m = search_term(pat, 'counterparty')
         if m:
             counterparty_name = clean_name(m.group(1))
             break
@@ -141,25 +439,14 @@ def extract_parties(document_text: str) -> tuple[str, str]:
         return company_name, counterparty_name
     
     # PRIORITY 2: Try other common defined terms (Disclosing Party, Receiving Party, Client, etc.)
-    other_party_terms = [
-        ('Disclosing Party', 'Receiving Party'),
-        ('Discloser', 'Receiver'),
-        ('Client', 'Vendor'),
-        ('Customer', 'Provider'),
-        ('Party A', 'Party B'),
-        ('First Party', 'Second Party'),
-    ]
-    
-    for term1, term2 in other_party_terms:
+    for key1, pat1, key2, pat2 in _OTHER_PARTY_PATTERNS:
         if not company_name:
-            pat1 = rf'([A-Z][A-Za-z0-9 .,&\'()\-]+?(?:Inc\.|LLC|Corp\.|Corporation|Ltd\.|L\.P\.|LLP|Company|Co\.))[^(]*?\(\s*(?:the\s+)?["""]?{term1}["""]?\s*\)'
-            m = re.search(pat1, text, re.IGNORECASE)
+            m = search_term(pat1, key1)
             if m:
                 company_name = clean_name(m.group(1))
         
         if not counterparty_name:
-            pat2 = rf'([A-Z][A-Za-z0-9 .,&\'()\-]+?(?:Inc\.|LLC|Corp\.|Corporation|Ltd\.|L\.P\.|LLP|Company|Co\.))[^(]*?\(\s*(?:the\s+)?["""]?{term2}["""]?\s*\)'
-            m = re.search(pat2, text, re.IGNORECASE)
+            m = search_term(pat2, key2)
             if m:
                 counterparty_name = clean_name(m.group(1))
         
@@ -168,8 +455,7 @@ def extract_parties(document_text: str) -> tuple[str, str]:
     
     # PRIORITY 3: Fallback - look for "by and between" pattern
     if not company_name or not counterparty_name:
-        between_pat = r'by\s+and\s+between[:\s]+([A-Z][A-Za-z0-9 .,&\'()\-]+?(?:Inc\.|LLC|Corp\.|Corporation|Ltd\.|L\.P\.|LLP|Company|Co\.)).*?(?:and|,)\s+([A-Z][A-Za-z0-9 .,&\'()\-]+?(?:Inc\.|LLC|Corp\.|Corporation|Ltd\.|L\.P\.|LLP|Company|Co\.))'
-        m = re.search(between_pat, text, re.IGNORECASE)
+        m = _BETWEEN_RE.search(text)
         if m:
             if not company_name:
                 company_name = clean_name(m.group(1))
@@ -184,9 +470,7 @@ def get_contract_type_name(contract_type_id: str = None) -> str:
     if not contract_type_id:
         return "Default"
     try:
-        ContractTypesManager = get_ContractTypesManager()
-        manager = ContractTypesManager()
-        meta = manager.get_type_by_id(contract_type_id)
+        meta = get_contract_types_manager().get_type_by_id(contract_type_id)
         if meta and isinstance(meta, dict):
             return meta.get('name') or contract_type_id
     except Exception:
@@ -194,6 +478,46 @@ def get_contract_type_name(contract_type_id: str = None) -> str:
     return contract_type_id
 
 
+def format_analysis(analysis: dict, max_text_length: int = 100, include_author: bool = False) -> dict:
+    """Shape one redline analysis for a JSON response.
+    
+    Replacements are shown as 'old' → 'new', and the assessment and comment text
+    are combined into a single assessment field. The text is truncated to
+    `max_text_length` characters unless it is None.
+    """
+    get = analysis.get
+    redline = get('redline') or {}
+    redline_type = redline.get('type', 'Unknown')
+    
+    # Handle text field - for replacements, show both old and new text
+    if redline_type == 'replacement':
+        display_text = f"'{redline.get('old_text', '')}' → '{redline.get('new_text', '')}'"
+    else:
+        display_text = redline.get('text', '')
+    if max_text_length is not None and len(display_text) > max_text_length:
+        display_text = display_text[:max_text_length] + '...'
+    
+    # Combine assessment and comment if both exist
+    assessment = get('assessment', '')
+    comment_text = get('comment_text', '')
+    if assessment and comment_text:
+        combined_assessment = f"{assessment}\n\n{comment_text}"
+    else:
+        combined_assessment = comment_text or assessment
+    
+    formatted = {
+        'type': redline_type,
+        'text': display_text,
+        'assessment': combined_assessment,
+        'risk_level': get('risk_level', 'Medium'),
+        'response': get('response', '')
+    }
+    if include_author:
+        formatted['author'] = redline.get('author', 'Unknown')
+        formatted['date'] = redline.get('date', 'Unknown')
+    return formatted
+
+
 @app.route('/')
 def index():
     """Main page."""
@@ -202,13 +526,8 @@ def index():
 @app.route('/static/<path:filename>')
 def serve_static(filename):
     """Serve static files explicitly for Vercel compatibility."""
-    static_dir = os.path.join(os.path.dirname(__file__), 'static')
-    file_path = os.path.join(static_dir, filename)
-    if os.path.exists(file_path):
-        return send_file(file_path)
-    else:
-        from flask import abort
-        abort(404)
+    # Opening the file doubles as the existence check and raises 404 when missing
+    return send_from_directory(app.static_folder, filename)
 
 @app.route('/api/upload', methods=['POST'])
 def upload_files():
@@ -223,7 +542,7 @@ def upload_files():
             return jsonify({'error': 'Document file must be selected'}), 400
         
         # Generate session ID for this processing session
-        session_id = str(uuid.uuid4())
+        session_id = os.urandom(16).hex()
         session_dir = os.path.join(app.config['UPLOAD_FOLDER'], session_id)
         os.makedirs(session_dir, exist_ok=True)
         
@@ -231,7 +550,7 @@ def upload_files():
         if document_file and allowed_file(document_file.filename):
             doc_filename = secure_filename(document_file.filename)
             doc_path = os.path.join(session_dir, doc_filename)
-            document_file.save(doc_path)
+            save_upload(document_file, doc_path)
         else:
             return jsonify({'error': 'Invalid document file type'}), 400
         
@@ -261,22 +580,14 @@ def upload_files():
 @app.route('/api/process', methods=['POST'])
 def process_document():
     """Process the document with redline analysis."""
-    import sys
-    print("\n" + "="*80, flush=True)
-    print("=== PROCESSING DOCUMENT REQUEST ===", flush=True)
-    print("="*80 + "\n", flush=True)
-    
     try:
         data = request.json
         session_id = session.get('session_id')
         doc_path = session.get('doc_path')
         playbook_path = session.get('playbook_path')
         
-        print(f"Session ID: {session_id}", flush=True)
-        print(f"Document path: {doc_path}", flush=True)
-        
         if not session_id or not doc_path:
-            print("ERROR: Session expired or document not found in session", flush=True)
+            app.logger.warning("Process request without a document in the session")
             return jsonify({'error': 'Session expired. Please upload document again.'}), 400
         
         # Get contract type if provided
@@ -284,15 +595,14 @@ def process_document():
         
         # Get playbook path based on contract type
         playbook_path = get_playbook_path(contract_type_id)
-        print(f"Contract Type ID: {contract_type_id}", flush=True)
-        print(f"Playbook path: {playbook_path}", flush=True)
         
         if not os.path.exists(doc_path):
-            print(f"ERROR: Document not found at {doc_path}", flush=True)
+            app.logger.warning("Document not found at %s", doc_path)
             return jsonify({'error': 'Document not found. Please upload again.'}), 404
         
-        if not playbook_path or not os.path.exists(playbook_path):
-            print(f"ERROR: Playbook not found at {playbook_path}", flush=True)
+        # get_playbook_path only returns paths it found on disk
+        if not playbook_path:
+            app.logger.warning("Playbook not found at %s", playbook_path)
             return jsonify({'error': 'Playbook not found. Please configure a playbook in the Admin section.'}), 404
         
         # Get AI configuration
@@ -301,14 +611,6 @@ def process_document():
         create_summary = data.get('create_summary', True)
         use_tracked_changes = data.get('use_tracked_changes', False)
         
-        print(f"AI Provider: {ai_provider}", flush=True)
-        print(f"AI Model: {model}", flush=True)
-        print(f"Create Summary: {create_summary}", flush=True)
-        print(f"Use Tracked Changes: {use_tracked_changes}", flush=True)
-        print("\n" + "-"*80, flush=True)
-        print("Starting document processing...", flush=True)
-        print("-"*80 + "\n", flush=True)
-        
         # Initialize agent
         RedlineAgent = get_RedlineAgent()
         agent = RedlineAgent(
@@ -322,7 +624,12 @@ def process_document():
         output_filename = f"output_{os.path.basename(doc_path)}"
         output_path = os.path.join(session_dir, output_filename)
         
-        print(f"Output path: {output_path}\n", flush=True)
+        app.logger.info(
+            "Processing document: session=%s doc=%s contract_type=%s playbook=%s provider=%s "
+            "model=%s summary=%s tracked_changes=%s output=%s",
+            session_id, doc_path, contract_type_id, playbook_path, ai_provider,
+            model, create_summary, use_tracked_changes, output_path
+        )
         
         result = agent.process_word_document(
             input_path=doc_path,
@@ -331,11 +638,8 @@ def process_document():
             use_tracked_changes=use_tracked_changes
         )
         
-        print("\n" + "-"*80, flush=True)
-        print("Document processing complete!", flush=True)
-        print(f"Redlines found: {result.get('redlines_count', 0)}", flush=True)
-        print(f"Analyses completed: {len(result.get('analyses', []))}", flush=True)
-        print("-"*80 + "\n", flush=True)
+        app.logger.info("Document processing complete: %d redline(s), %d analyses",
+                        result.get('redlines_count', 0), len(result.get('analyses', [])))
         
         # Store output paths in session
         session['output_path'] = output_path
@@ -343,42 +647,7 @@ def process_document():
             session['summary_path'] = result['summary_path']
         
         # Prepare response with analysis details
-        analyses_data = []
-        for analysis in result.get('analyses', []):
-            redline = analysis.get('redline', {})
-            redline_type = redline.get('type', 'Unknown')
-            
-            # Handle text field - for replacements, show both old and new text
-            if redline_type == 'replacement':
-                old_text = redline.get('old_text', '')
-                new_text = redline.get('new_text', '')
-                display_text = f"'{old_text}' → '{new_text}'"
-            else:
-                display_text = redline.get('text', '')
-            
-            # Truncate if too long
-            if len(display_text) > 100:
-                display_text = display_text[:100] + '...'
-            
-            # Combine assessment and comment_text into a single assessment field
-            assessment = analysis.get('assessment', '')
-            comment_text = analysis.get('comment_text', '')
-            
-            # Combine assessment and comment if both exist
-            if assessment and comment_text:
-                combined_assessment = f"{assessment}\n\n{comment_text}"
-            elif comment_text:
-                combined_assessment = comment_text
-            else:
-                combined_assessment = assessment
-            
-            analyses_data.append({
-                'type': redline_type,
-                'text': display_text,
-                'assessment': combined_assessment,
-                'risk_level': analysis.get('risk_level', 'Medium'),
-                'response': analysis.get('response', '')
-            })
+        analyses_data = [format_analysis(analysis) for analysis in result.get('analyses', [])]
         
         document_text = result.get('document_text', '')
         party_one, party_two = extract_parties(document_text)
@@ -404,12 +673,6 @@ def process_document():
             'metadata': metadata
         }
         
-        print("\n" + "="*80, flush=True)
-        print("=== PROCESSING COMPLETE - SENDING RESPONSE ===", flush=True)
-        print(f"Redlines analyzed: {result['redlines_count']}", flush=True)
-        print(f"Analyses in response: {len(analyses_data)}", flush=True)
-        print("="*80 + "\n", flush=True)
-        
         return jsonify(response)
     
     except Exception as e:
@@ -461,27 +724,7 @@ def process_google_doc():
         )
         
         # Prepare response
-        analyses_data = []
-        for analysis in result.get('analyses', []):
-            # Combine assessment and comment_text into a single assessment field
-            assessment = analysis.get('assessment', '')
-            comment_text = analysis.get('comment_text', '')
-            
-            # Combine assessment and comment if both exist
-            if assessment and comment_text:
-                combined_assessment = f"{assessment}\n\n{comment_text}"
-            elif comment_text:
-                combined_assessment = comment_text
-            else:
-                combined_assessment = assessment
-            
-            analyses_data.append({
-                'type': analysis['redline'].get('type', 'Unknown'),
-                'text': analysis['redline'].get('text', '')[:100] + '...' if len(analysis['redline'].get('text', '')) > 100 else analysis['redline'].get('text', ''),
-                'assessment': combined_assessment,
-                'risk_level': analysis.get('risk_level', 'Medium'),
-                'response': analysis.get('response', '')
-            })
+        analyses_data = [format_analysis(analysis) for analysis in result.get('analyses', [])]
         
         return jsonify({
             'success': True,
@@ -498,11 +741,10 @@ def process_google_doc():
 def download_file(session_id, filename):
     """Download processed files."""
     try:
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], session_id, filename)
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True)
-        else:
-            return jsonify({'error': 'File not found'}), 404
+        # Opening the file is the existence check; paths escaping the upload folder 404 too
+        return send_from_directory(app.config['UPLOAD_FOLDER'], f"{session_id}/{filename}", as_attachment=True)
+    except NotFound:
+        return jsonify({'error': 'File not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -527,7 +769,8 @@ def analyze_only():
         if not os.path.exists(doc_path):
             return jsonify({'error': 'Document not found. Please upload again.'}), 404
         
-        if not playbook_path or not os.path.exists(playbook_path):
+        # get_playbook_path only returns paths it found on disk
+        if not playbook_path:
             return jsonify({'error': 'Playbook not found. Please configure a playbook in the Admin section.'}), 404
         
         # Get AI configuration
@@ -546,40 +789,10 @@ def analyze_only():
         result = agent.analyze_only(input_path=doc_path)
         
         # Prepare response
-        analyses_data = []
-        for analysis in result.get('analyses', []):
-            redline = analysis.get('redline', {})
-            redline_type = redline.get('type', 'Unknown')
-            
-            # Handle text field - for replacements, show both old and new text
-            if redline_type == 'replacement':
-                old_text = redline.get('old_text', '')
-                new_text = redline.get('new_text', '')
-                display_text = f"'{old_text}' → '{new_text}'"
-            else:
-                display_text = redline.get('text', '')
-            
-            # Combine assessment and comment_text into a single assessment field
-            assessment = analysis.get('assessment', '')
-            comment_text = analysis.get('comment_text', '')
-            
-            # Combine assessment and comment if both exist
-            if assessment and comment_text:
-                combined_assessment = f"{assessment}\n\n{comment_text}"
-            elif comment_text:
-                combined_assessment = comment_text
-            else:
-                combined_assessment = assessment
-            
-            analyses_data.append({
-                'type': redline_type,
-                'text': display_text,
-                'author': analysis['redline'].get('author', 'Unknown'),
-                'date': analysis['redline'].get('date', 'Unknown'),
-                'assessment': combined_assessment,
-                'risk_level': analysis.get('risk_level', 'Medium'),
-                'response': analysis.get('response', '')
-            })
+        analyses_data = [
+            format_analysis(analysis, max_text_length=None, include_author=True)
+            for analysis in result.get('analyses', [])
+        ]
         
         return jsonify({
             'success': True,
@@ -596,17 +809,32 @@ def get_playbook():
     """Get current playbook content (admin)."""
     try:
         playbook_path = get_playbook_path()
-        if not playbook_path or not os.path.exists(playbook_path):
+        try:
+            stat = os.stat(playbook_path) if playbook_path else None
+        except FileNotFoundError:
+            stat = None
+        if stat is None:
             return jsonify({'error': 'Playbook not found'}), 404
         
-        with open(playbook_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        return jsonify({
+        # Re-read the file only when it changed; the ETag lets polling clients get a 304
+        cache_key = (playbook_path, stat.st_mtime_ns, stat.st_size)
+        if _playbook_content_cache['key'] != cache_key:
+            # One unbuffered read of the whole file; the ETag hashes those bytes directly
+            with open(playbook_path, 'rb', buffering=0) as f:
+                raw = f.read()
+            digest = hashlib.sha256(f"{playbook_path}\0".encode('utf-8'))
+            digest.update(raw)
+            etag = digest.hexdigest()
+            content = raw.decode('utf-8').replace('\r\n', '\n')
+            _playbook_content_cache.update(key=cache_key, content=content, etag=etag)
+        
+        response = jsonify({
             'success': True,
-            'content': content,
+            'content': _playbook_content_cache['content'],
             'path': playbook_path
         })
+        response.set_etag(_playbook_content_cache['etag'])
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -622,12 +850,12 @@ def update_playbook():
             return jsonify({'error': 'Content is required'}), 400
         
         # Ensure playbooks directory exists
-        playbooks_dir = os.path.join(os.path.dirname(__file__), 'playbooks')
-        os.makedirs(playbooks_dir, exist_ok=True)
+        os.makedirs(PLAYBOOKS_DIR, exist_ok=True)
         
         # Write to standard playbook location
-        with open(STANDARD_PLAYBOOK_PATH, 'w', encoding='utf-8') as f:
+        with atomic_write(STANDARD_PLAYBOOK_PATH, 'w', encoding='utf-8') as f:
             f.write(content)
+        _playbook_content_cache['key'] = None
         
         return jsonify({
             'success': True,
@@ -642,10 +870,12 @@ def download_playbook():
     """Download current playbook (admin)."""
     try:
         playbook_path = get_playbook_path()
-        if not playbook_path or not os.path.exists(playbook_path):
+        if not playbook_path:
             return jsonify({'error': 'Playbook not found'}), 404
         
         return send_file(playbook_path, as_attachment=True, download_name='default_playbook.txt')
+    except FileNotFoundError:
+        return jsonify({'error': 'Playbook not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -666,11 +896,12 @@ def upload_playbook():
             return jsonify({'error': 'Only .txt files are allowed'}), 400
         
         # Ensure playbooks directory exists
-        playbooks_dir = os.path.join(os.path.dirname(__file__), 'playbooks')
-        os.makedirs(playbooks_dir, exist_ok=True)
+        os.makedirs(PLAYBOOKS_DIR, exist_ok=True)
         
         # Save to standard playbook location
-        playbook_file.save(STANDARD_PLAYBOOK_PATH)
+        with atomic_write(STANDARD_PLAYBOOK_PATH) as f:
+            copy_upload(playbook_file.stream, f)
+        _playbook_content_cache['key'] = None
         
         return jsonify({
             'success': True,
@@ -685,9 +916,7 @@ def upload_playbook():
 def get_contract_types():
     """Get all contract types."""
     try:
-        ContractTypesManager = get_ContractTypesManager()
-        manager = ContractTypesManager()
-        types = manager.get_all_types()
+        types = get_contract_types_manager().get_all_types()
         return jsonify({
             'success': True,
             'contract_types': types
@@ -711,6 +940,7 @@ def add_contract_type():
         ContractTypesManager = get_ContractTypesManager()
         manager = ContractTypesManager()
         new_type = manager.add_type(name, description, playbook)
+        invalidate_contract_types_manager()
         
         return jsonify({
             'success': True,
@@ -737,6 +967,7 @@ def update_contract_type(type_id):
         )
         
         if success:
+            invalidate_contract_types_manager()
             updated_type = manager.get_type_by_id(type_id)
             return jsonify({
                 'success': True,
@@ -758,6 +989,7 @@ def delete_contract_type(type_id):
         success = manager.delete_type(type_id)
         
         if success:
+            invalidate_contract_types_manager()
             return jsonify({
                 'success': True,
                 'message': 'Contract type deleted successfully'
@@ -768,6 +1000,33 @@ def delete_contract_type(type_id):
         return jsonify({'error': str(e)}), 500
 
 
+# Markdown of recently converted playbooks, keyed by the BLAKE2b digest of the
+# uploaded .docx, so re-uploading the same file skips the conversion
+_converted_playbook_cache = {}
+_CONVERTED_PLAYBOOK_CACHE_SIZE = 32
+
+# Characters of converted Markdown JSON-encoded per chunk of the streamed response
+MARKDOWN_STREAM_CHUNK_CHARS = 64 * 1024
+
+
+def _stream_converted_playbook(markdown_content: str, filename: str):
+    """Yield the convert-playbook JSON response with the Markdown encoded chunk by chunk.
+    
+    Produces the same document as jsonify() would, without building the whole
+    escaped Markdown string in memory first.
+    """
+    if ORJSON_AVAILABLE:
+        encode = orjson.dumps
+    else:
+        def encode(text):
+            return json.encoder.encode_basestring_ascii(text).encode('ascii')
+    yield b'{"filename":' + encode(filename) + b',"success":true,"markdown":"'
+    for start in range(0, len(markdown_content), MARKDOWN_STREAM_CHUNK_CHARS):
+        chunk = markdown_content[start:start + MARKDOWN_STREAM_CHUNK_CHARS]
+        yield encode(chunk)[1:-1]
+    yield b'"}\n'
+
+
 # Playbook Converter Endpoint
 @app.route('/api/admin/convert-playbook', methods=['POST'])
 def convert_playbook():
@@ -784,52 +1043,48 @@ def convert_playbook():
         if not playbook_file.filename.endswith('.docx'):
             return jsonify({'error': 'Only .docx files are allowed'}), 400
         
-        # Save uploaded file temporarily
-        temp_dir = tempfile.mkdtemp()
-        temp_word_path = os.path.join(temp_dir, secure_filename(playbook_file.filename))
-        playbook_file.save(temp_word_path)
-        
-        # Convert to markdown
-        PlaybookConverter = get_PlaybookConverter()
-        converter = PlaybookConverter()
-        base_name = os.path.splitext(playbook_file.filename)[0]
-        output_path = os.path.join(temp_dir, f"{base_name}.md")
-        
-        markdown_path = converter.convert_word_to_markdown(temp_word_path, output_path)
-        
-        # Read markdown content
-        with open(markdown_path, 'r', encoding='utf-8') as f:
-            markdown_content = f.read()
-        
-        # Clean up temp files
-        try:
-            os.remove(temp_word_path)
-            os.remove(markdown_path)
-            os.rmdir(temp_dir)
-        except:
-            pass
-        
-        return jsonify({
-            'success': True,
-            'markdown': markdown_content,
-            'filename': f"{base_name}.md"
-        })
+        # The extension check above guarantees the name ends in '.docx'
+        output_filename = playbook_file.filename[:-len('.docx')] + '.md'
+        stream = playbook_file.stream
+        if isinstance(stream, HashingSpoolFile):
+            cache_key = stream.blake2b.digest()
+        else:
+            cache_key = hashlib.file_digest(stream, 'blake2b').digest()
+        markdown_content = _converted_playbook_cache.get(cache_key)
+        if markdown_content is None:
+            # Convert straight from the uploaded stream; nothing is written to disk
+            stream.seek(0)
+            markdown_content = get_playbook_converter().convert_word_stream_to_markdown(stream)
+            if len(_converted_playbook_cache) >= _CONVERTED_PLAYBOOK_CACHE_SIZE:
+                _converted_playbook_cache.clear()
+            _converted_playbook_cache[cache_key] = markdown_content
+        
+        return Response(
+            _stream_converted_playbook(markdown_content, output_filename),
+            mimetype='application/json'
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-if __name__ == '__main__':
-    # Clean up old temp files on startup
+def _cleanup_upload_folder(upload_folder: str) -> None:
+    """Remove session directories left over from previous runs."""
     try:
-        for item in os.listdir(app.config['UPLOAD_FOLDER']):
-            item_path = os.path.join(app.config['UPLOAD_FOLDER'], item)
-            if os.path.isdir(item_path):
-                try:
-                    shutil.rmtree(item_path)
-                except:
-                    pass
-    except:
+        with os.scandir(upload_folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+    except OSError:
         pass
+
+
+if __name__ == '__main__':
+    # Clean up old temp files in the background so the server starts listening at once
+    threading.Thread(
+        target=_cleanup_upload_folder,
+        args=(app.config['UPLOAD_FOLDER'],),
+        daemon=True
+    ).start()
     
     print("Starting RedLine Agent Web Interface...")
     print("Open your browser to: http://localhost:5001")
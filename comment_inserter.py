@@ -1,13 +1,19 @@
 """Insert comments and tracked changes into Word documents and Google Docs."""
 
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Optional, Tuple
 from googleapiclient.discovery import build
 from google.oauth2.credentials import Credentials
+import io
+import logging
 import os
+import shutil
 import pickle
 import zipfile
 import xml.etree.ElementTree as ET
-from datetime import datetime
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
 
 # Try to import docx, but handle lxml import errors gracefully
 try:
@@ -55,36 +61,127 @@ except ImportError as e:
     lxml_etree = DummyLxmlEtree()
 
 
+# WordprocessingML and OPC package namespaces, with the Clark-notation tags the
+# comment writer looks up or creates on every redline
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W = f'{{{W_NS}}}'
+W_P = W + 'p'
+W_R = W + 'r'
+W_T = W + 't'
+W_BR = W + 'br'
+W_PPR = W + 'pPr'
+W_INS = W + 'ins'
+W_ID = W + 'id'
+W_AUTHOR = W + 'author'
+W_DATE = W + 'date'
+W_COMMENTS = W + 'comments'
+W_COMMENT = W + 'comment'
+W_COMMENT_RANGE_START = W + 'commentRangeStart'
+W_COMMENT_RANGE_END = W + 'commentRangeEnd'
+W_COMMENT_REFERENCE = W + 'commentReference'
+REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+REL_RELATIONSHIP = f'{{{REL_NS}}}Relationship'
+CT_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+CT_OVERRIDE = f'{{{CT_NS}}}Override'
+
+# Rule under the risk level at the top of each comment
+GUIDANCE_SEPARATOR = '=' * 50
+
+# Refresh a Google OAuth token this long before it expires rather than on first failure
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+# Serialize the WordprocessingML namespace as 'w:' rather than 'ns0:', and content
+# types as the default namespace as Word writes them; lxml picks up 'w' for elements
+# created outside a document tree too
+ET.register_namespace('w', W_NS)
+ET.register_namespace('', CT_NS)
+if LXML_AVAILABLE:
+    lxml_etree.register_namespace('w', W_NS)
+
+logger = logging.getLogger(__name__)
+
+
 class CommentInserter:
     """Inserts comments into documents based on redline analysis."""
     
-    def __init__(self, doc_path: str = None, doc_id: str = None, credentials_path: str = None):
-        """Initialize with document path or Google Doc ID."""
+    # Authenticated Docs API client and its credentials per credentials path, shared by
+    # every instance so the token file is read and the client built once per process
+    _service_cache: Dict[str, Tuple[object, object]] = {}
+    
+    def __init__(self, doc_path: str = None, doc_id: str = None, credentials_path: str = None, verbose: bool = False):
+        """Initialize with document path or Google Doc ID.
+        
+        Per-redline placement progress is logged at DEBUG level, or at INFO with verbose.
+        """
         self.doc_path = doc_path
         self.doc_id = doc_id
         self.credentials_path = credentials_path or os.getenv('GOOGLE_CREDENTIALS_PATH', 'credentials.json')
         self.document = None
         self.service = None
+        # Per-instance, so one verbose inserter leaves the shared module logger untouched
+        self._detail_level = logging.INFO if verbose else logging.DEBUG
+        # Structure checks and a read-back of the saved .docx; off by default since
+        # each walks the whole document again (diagnose_comments.py covers ad hoc checks)
+        self.validate_output = bool(os.getenv('VALIDATE_DOCX_OUTPUT'))
+        # Parse and build document parts with lxml when it is available (C parser, keeps
+        # every namespace declaration); ElementTree otherwise
+        self._etree = lxml_etree if LXML_AVAILABLE else ET
+        
+        # Redline searches run once per analysis; compile them once up front
+        # (libxml2 XPath with lxml, ElementPath findall otherwise)
+        w_namespaces = {'w': W_NS}
+        if LXML_AVAILABLE:
+            self._xp_ins = lxml_etree.XPath('.//w:ins', namespaces=w_namespaces)
+            self._xp_del = lxml_etree.XPath('.//w:del', namespaces=w_namespaces)
+            self._xp_text = lxml_etree.XPath('.//w:t/text()', namespaces=w_namespaces)
+            self._xp_del_text = lxml_etree.XPath('.//w:delText/text()', namespaces=w_namespaces)
+        else:
+            self._xp_ins = lambda elem: elem.findall('.//w:ins', w_namespaces)
+            self._xp_del = lambda elem: elem.findall('.//w:del', w_namespaces)
+            self._xp_text = lambda elem: [t.text for t in elem.findall('.//w:t', w_namespaces) if t.text]
+            self._xp_del_text = lambda elem: [t.text for t in elem.findall('.//w:delText', w_namespaces) if t.text]
+        self._parent_map = {}
         
         if doc_path:
             self.document = Document(doc_path)
         elif doc_id:
             self.service = self._authenticate_google()
     
+    def _log_detail(self, msg: str, *args) -> None:
+        """Log per-redline progress at this inserter's detail level."""
+        logger.log(self._detail_level, msg, *args)
+    
     def _authenticate_google(self):
-        """Authenticate for Google Docs API."""
+        """Authenticate for Google Docs API.
+        
+        Reuses the client already built for this credentials path, refreshing its
+        token first if it is within TOKEN_REFRESH_MARGIN of expiring.
+        """
         from google_auth_oauthlib.flow import InstalledAppFlow
         from google.auth.transport.requests import Request
         
+        cached = CommentInserter._service_cache.get(self.credentials_path)
+        if cached:
+            service, creds = cached
+            if creds.refresh_token and self._token_expires_soon(creds):
+                # The client holds this credentials object, so refreshing it in place is enough
+                creds.refresh(Request())
+                self._save_google_token(creds)
+            return service
+        
         SCOPES = ['https://www.googleapis.com/auth/documents']
         creds = None
         
-        if os.path.exists('token.pickle'):
+        if os.path.exists('token.json'):
+            creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+        elif os.path.exists('token.pickle'):
+            # One-time migration from the pickled token earlier versions saved
             with open('token.pickle', 'rb') as token:
                 creds = pickle.load(token)
+            self._save_google_token(creds)
         
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
+        if not creds or not creds.valid or (creds.refresh_token and self._token_expires_soon(creds)):
+            if creds and creds.refresh_token:
                 creds.refresh(Request())
             else:
                 if not os.path.exists(self.credentials_path):
@@ -93,10 +190,65 @@ class CommentInserter:
                     self.credentials_path, SCOPES)
                 creds = flow.run_local_server(port=0)
             
-            with open('token.pickle', 'wb') as token:
-                pickle.dump(creds, token)
+            # Only write the token file when the token actually changed
+            self._save_google_token(creds)
+        
+        service = build('docs', 'v1', credentials=creds)
+        CommentInserter._service_cache[self.credentials_path] = (service, creds)
+        return service
+    
+    @staticmethod
+    def _token_expires_soon(creds) -> bool:
+        """Check whether a token expires within TOKEN_REFRESH_MARGIN (expiry is naive UTC)."""
+        if creds.expiry is None:
+            return False
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return creds.expiry - now < TOKEN_REFRESH_MARGIN
+    
+    @staticmethod
+    def _save_google_token(creds) -> None:
+        """Persist OAuth credentials for the next run."""
+        with open('token.json', 'w') as token:
+            token.write(creds.to_json())
+    
+    def _parse_xml(self, xml_bytes: bytes):
+        """Parse a document part with the selected XML backend."""
+        if LXML_AVAILABLE:
+            parser = lxml_etree.XMLParser(huge_tree=True, remove_blank_text=False)
+            return lxml_etree.fromstring(xml_bytes, parser)
+        return ET.fromstring(xml_bytes)
+    
+    def _serialize_xml(self, root) -> bytes:
+        """Serialize a document part, with the XML declaration Word writes."""
+        if LXML_AVAILABLE:
+            return lxml_etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+        return ET.tostring(root, encoding='utf-8', xml_declaration=True)
+    
+    def _append_to_xml_part(self, xml_bytes: bytes, root, child_xml: bytes, make_child: Callable[[], Any]) -> bytes:
+        """Return a part's bytes with one child appended to its root element.
+        
+        The child is spliced in ahead of the root's closing tag so the rest of the part
+        is copied through untouched; only when that tag can't be found (a prefixed or
+        empty root) is the child element built with `make_child` and the tree reserialized.
+        """
+        closing_tag = b'</' + root.tag.rsplit('}', 1)[-1].encode('utf-8') + b'>'
+        idx = xml_bytes.rfind(closing_tag)
+        if idx != -1:
+            return xml_bytes[:idx] + child_xml + xml_bytes[idx:]
+        root.append(make_child())
+        return self._serialize_xml(root)
+    
+    def _copy_zip_parts(self, original: zipfile.ZipFile, new_docx: zipfile.ZipFile, skip) -> None:
+        """Copy every part of the original package except those in `skip`.
         
-        return build('docs', 'v1', credentials=creds)
+        Each part is streamed across rather than read into memory, and opened by name
+        so it is written with the output archive's compression settings instead of
+        keeping the source entry's.
+        """
+        for item in original.infolist():
+            if item.filename not in skip:
+                with original.open(item) as src, new_docx.open(item.filename, 'w') as dst:
+                    shutil.copyfileobj(src, dst)
     
     def insert_comments_word(self, analyses: List[Dict], output_path: str, use_tracked_changes: bool = False, extractor=None) -> None:
         """Insert comments into Word document and optionally add counter redlines.
@@ -136,6 +288,13 @@ class CommentInserter:
             # Fallback to simple paragraph-based method
             commented_paragraphs = set()
             
+            # Search one buffer of every paragraph's text rather than rescanning all the
+            # paragraphs per analysis; NUL separators keep a match inside one paragraph
+            paragraphs = self.document.paragraphs
+            para_texts = [paragraph.text for paragraph in paragraphs]
+            para_starts = list(accumulate((len(text) + 1 for text in para_texts), initial=0))
+            all_text = '\0'.join(para_texts)
+            
             for analysis in analyses:
                 redline = analysis['redline']
                 comment_text = analysis.get('comment_text', analysis.get('response', ''))
@@ -148,31 +307,34 @@ class CommentInserter:
                 if not target_text:
                     continue
                 
-                # Search for text in document
-                for para_idx, paragraph in enumerate(self.document.paragraphs):
-                    if para_idx in commented_paragraphs:
-                        continue
-                        
-                    if target_text[:50] in paragraph.text:
-                        self._add_comment_annotation(paragraph, comment_text, risk_level)
+                # Search for text in document, skipping paragraphs already commented
+                pos = all_text.find(target_text[:50])
+                while pos != -1:
+                    para_idx = bisect_right(para_starts, pos) - 1
+                    if para_idx not in commented_paragraphs:
+                        self._add_comment_annotation(paragraphs[para_idx], comment_text, risk_level)
                         commented_paragraphs.add(para_idx)
                         break
+                    pos = all_text.find(target_text[:50], para_starts[para_idx + 1])
             
             self.document.save(output_path)
     
     def _insert_comments_via_xml(self, analyses: List[Dict], output_path: str, extractor) -> None:
         """Insert comments via XML manipulation for precise positioning."""
-        temp_path = output_path.replace('.docx', '_temp.docx')
-        self.document.save(temp_path)
+        saved_docx = io.BytesIO()
+        self.document.save(saved_docx)
         
-        with zipfile.ZipFile(temp_path, 'r') as docx:
+        with zipfile.ZipFile(saved_docx, 'r') as docx:
             document_xml = docx.read('word/document.xml')
-            root = ET.fromstring(document_xml)
+            root = self._parse_xml(document_xml)
             
             namespaces = {
                 'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
             }
             
+            # Index the redlines once; the extractor's recorded positions point into it
+            redline_index = self._build_redline_index(root, namespaces)
+            
             # Process each analysis and insert comment right after the redline
             for analysis in analyses:
                 redline = analysis['redline']
@@ -187,8 +349,11 @@ class CommentInserter:
                 redline_text = redline.get('text', '')
                 
                 if redline_type and redline_text:
-                    # Find matching element in current XML
-                    redline_elem = self._find_redline_element_in_xml(root, redline_type, redline_text, namespaces)
+                    # Find the element the extractor recorded, or else a matching one in current XML
+                    index_key = 'ins_index' if redline_type == 'insertion' else 'del_index'
+                    redline_elem = self._recorded_redline_element(redline_index, redline_type, redline.get(index_key), redline_text)
+                    if redline_elem is None:
+                        redline_elem = self._find_redline_element_in_xml(root, redline_type, redline_text, namespaces, redline_index)
                     
                     if redline_elem is not None:
                         # Find the parent paragraph by traversing up the tree
@@ -199,18 +364,13 @@ class CommentInserter:
                             self._insert_comment_after_element(parent, redline_elem, comment_text, risk_level, namespaces)
         
         # Write updated document
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as new_docx:
-            with zipfile.ZipFile(temp_path, 'r') as original:
-                for item in original.infolist():
-                    if item.filename != 'word/document.xml':
-                        new_docx.writestr(item, original.read(item.filename))
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as new_docx:
+            with zipfile.ZipFile(saved_docx, 'r') as original:
+                self._copy_zip_parts(original, new_docx, {'word/document.xml'})
             
-            new_docx.writestr('word/document.xml', ET.tostring(root, encoding='utf-8', xml_declaration=True))
-        
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+            new_docx.writestr('word/document.xml', self._serialize_xml(root))
     
-    def _insert_comments_via_xml_direct(self, analyses: List[Dict], output_path: str, extractor, root: ET.Element, namespaces: Dict, temp_path: str, use_tracked_changes: bool = False) -> None:
+    def _insert_comments_via_xml_direct(self, analyses: List[Dict], output_path: str, extractor, root: ET.Element, namespaces: Dict, saved_docx: io.BytesIO, use_tracked_changes: bool = False) -> None:
         """Insert native Word comments via direct XML manipulation.
         
         This creates proper Word comment bubbles by:
@@ -218,29 +378,60 @@ class CommentInserter:
         2. Adding comment range markers in document.xml
         3. Linking them together with comment IDs
         """
-        print(f"\n=== Starting XML-based native comment insertion for {len(analyses)} redlines ===")
+        self._log_detail("Starting XML-based native comment insertion for %d redline(s)", len(analyses))
         
         # Read comments.xml if it exists, or create it
-        # CRITICAL: Register namespace BEFORE creating elements to get 'w:' prefix
-        ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-        
-        with zipfile.ZipFile(temp_path, 'r') as docx:
+        comments_part_is_new = False
+        with zipfile.ZipFile(saved_docx, 'r') as docx:
             try:
                 comments_xml = docx.read('word/comments.xml')
-                comments_root = ET.fromstring(comments_xml)
+                comments_root = self._parse_xml(comments_xml)
             except KeyError:
-                # Create new comments.xml with proper namespace
-                comments_root = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}comments')
+                # Create new comments.xml with proper namespace ('w:' declared on the root
+                # so lxml gives every comment that prefix too)
+                comments_part_is_new = True
+                if LXML_AVAILABLE:
+                    comments_root = lxml_etree.Element(W_COMMENTS, nsmap={'w': W_NS})
+                else:
+                    comments_root = ET.Element(W_COMMENTS)
         
         # Track comment IDs
         comment_id = 0
         comments_added = 0
+        skipped = 0
+        unmatched = 0
+        # Element identity is enough to tell redlines apart while this tree is alive
         processed_redline_ids = set()
+        # New comment entries, added to comments_root in one go after the loop
+        pending_comments = []
+        
+        # Index the counterparty's redlines once, before auto-redlining adds our own
+        redline_index = self._build_redline_index(root, namespaces)
+        if not redline_index['insertion'] and not redline_index['deletion']:
+            logger.warning("  No tracked changes in document - no redlines to attach %d comment(s) to", len(analyses))
+            analyses = []
         
         # Process EACH analysis individually - one comment per redline
         for analysis_idx, analysis in enumerate(analyses):
             redline = analysis['redline']
-            print(f"Processing redline {analysis_idx + 1} of {len(analyses)}: {redline.get('type', 'unknown')} - {redline.get('text', '')[:50]}...")
+            self._log_detail("Processing redline %d of %d: %s - %s...", analysis_idx + 1, len(analyses),
+                             redline.get('type', 'unknown'), redline.get('text', '')[:50])
+            
+            # Find the redline element in XML
+            redline_type = redline.get('type', '')
+            redline_text = redline.get('text', '').strip()
+            
+            if redline_type not in ['insertion', 'deletion', 'replacement']:
+                self._log_detail("  ⚠ REJECTED: Redline type '%s' is not a tracked change.", redline_type)
+                skipped += 1
+                continue
+            
+            # Don't build guidance for a redline the document has no candidates for
+            candidate_types = ('deletion', 'insertion') if redline_type == 'replacement' else (redline_type,)
+            if not any(redline_index[t] for t in candidate_types):
+                self._log_detail("  ⚠ Skipping - document has no tracked %s elements", ' or '.join(candidate_types))
+                unmatched += 1
+                continue
             
             # Get all available guidance text
             playbook_principle = analysis.get('playbook_principle', '')
@@ -253,16 +444,6 @@ class CommentInserter:
             # Combine guidance to match summary output format exactly
             # This ensures Word comments match what's shown in the summary
             # CRITICAL: Always reference the playbook principle FIRST
-            guidance_parts = []
-            
-            # Risk Level (shown in summary as badge)
-            guidance_parts.append(f"RISK LEVEL: {risk_level}")
-            guidance_parts.append("=" * 50)
-            
-            # PLAYBOOK REFERENCE FIRST - Always cite the playbook principle before any analysis
-            if playbook_principle:
-                guidance_parts.append(f"\nPLAYBOOK REFERENCE:\n{playbook_principle}")
-            
             # Combine assessment and comment_text into a single Assessment field
             combined_assessment = ""
             if assessment and comment_text:
@@ -272,30 +453,22 @@ class CommentInserter:
             else:
                 combined_assessment = assessment
             
-            # Assessment (combined with comment_text)
-            if combined_assessment:
-                guidance_parts.append(f"\nASSESSMENT:\n{combined_assessment}")
-            
-            # Recommended Action (matches summary output - shown as "Recommended Action")
-            if response:
-                guidance_parts.append(f"\nRECOMMENDED ACTION:\n{response}")
-            
-            # If no guidance was found, provide default message
-            if len(guidance_parts) <= 3:  # Only risk level, separator, and maybe playbook
-                guidance_parts.append("\nPlease review this change against the legal playbook.")
-            
-            full_guidance = "\n".join(guidance_parts)
+            # Risk Level (shown in summary as badge), then PLAYBOOK REFERENCE FIRST - always
+            # cite the playbook principle before any analysis - then the assessment and the
+            # recommended action as the summary shows them. If neither of those was found,
+            # provide a default message instead
+            has_guidance = bool(combined_assessment or response)
+            full_guidance = (
+                f"RISK LEVEL: {risk_level}\n{GUIDANCE_SEPARATOR}"
+                + (f"\n\nPLAYBOOK REFERENCE:\n{playbook_principle}" if playbook_principle else "")
+                + (f"\n\nASSESSMENT:\n{combined_assessment}" if combined_assessment else "")
+                + (f"\n\nRECOMMENDED ACTION:\n{response}" if response else "")
+                + ("" if has_guidance else "\n\nPlease review this change against the legal playbook.")
+            )
             
             if not full_guidance.strip():
-                print(f"  Skipping - no guidance text")
-                continue
-            
-            # Find the redline element in XML
-            redline_type = redline.get('type', '')
-            redline_text = redline.get('text', '').strip()
-            
-            if redline_type not in ['insertion', 'deletion', 'replacement']:
-                print(f"  ⚠ REJECTED: Redline type '{redline_type}' is not a tracked change.")
+                self._log_detail("  Skipping - no guidance text")
+                skipped += 1
                 continue
             
             redline_elem = None
@@ -307,53 +480,65 @@ class CommentInserter:
                 
                 # Try to find deletion element first (preferred for comment placement)
                 if old_text:
-                    all_matching_redlines = self._find_all_redline_elements_in_xml(root, 'deletion', old_text, namespaces)
-                    print(f"  Found {len(all_matching_redlines)} matching deletion element(s) for replacement")
+                    redline_elem = self._select_recorded_redline(redline_index, 'deletion', redline.get('del_index'), old_text, processed_redline_ids)
+                if redline_elem is None and old_text:
+                    all_matching_redlines = self._find_all_redline_elements_in_xml(root, 'deletion', old_text, namespaces, redline_index)
+                    self._log_detail("  Found %d matching deletion element(s) for replacement", len(all_matching_redlines))
                     for candidate in all_matching_redlines:
-                        elem_id = self._get_element_identifier(candidate, root, namespaces)
-                        if elem_id and elem_id not in processed_redline_ids:
+                        elem_id = id(candidate)
+                        if elem_id not in processed_redline_ids:
                             redline_elem = candidate
                             processed_redline_ids.add(elem_id)
-                            print(f"  Selected deletion element for replacement")
+                            self._log_detail("  Selected deletion element for replacement")
                             break
                 
                 # Fallback: if deletion not found, try insertion element
                 if redline_elem is None and new_text:
-                    all_matching_redlines = self._find_all_redline_elements_in_xml(root, 'insertion', new_text, namespaces)
-                    print(f"  Found {len(all_matching_redlines)} matching insertion element(s) for replacement")
+                    redline_elem = self._select_recorded_redline(redline_index, 'insertion', redline.get('ins_index'), new_text, processed_redline_ids)
+                if redline_elem is None and new_text:
+                    all_matching_redlines = self._find_all_redline_elements_in_xml(root, 'insertion', new_text, namespaces, redline_index)
+                    self._log_detail("  Found %d matching insertion element(s) for replacement", len(all_matching_redlines))
                     for candidate in all_matching_redlines:
-                        elem_id = self._get_element_identifier(candidate, root, namespaces)
-                        if elem_id and elem_id not in processed_redline_ids:
+                        elem_id = id(candidate)
+                        if elem_id not in processed_redline_ids:
                             redline_elem = candidate
                             processed_redline_ids.add(elem_id)
-                            print(f"  Selected insertion element for replacement")
+                            self._log_detail("  Selected insertion element for replacement")
                             break
             else:
                 # For insertion/deletion, use existing search logic
                 if not redline_text:
-                    print(f"  ⚠ REJECTED: Missing text for {redline_type}")
+                    self._log_detail("  ⚠ REJECTED: Missing text for %s", redline_type)
+                    skipped += 1
                     continue
                 
-                # Find ALL matching redline elements, then pick one we haven't processed
-                all_matching_redlines = self._find_all_redline_elements_in_xml(root, redline_type, redline_text, namespaces)
-                print(f"  Found {len(all_matching_redlines)} matching redline element(s) in XML")
+                # Use the element the extractor recorded when it is still there
+                index_key = 'ins_index' if redline_type == 'insertion' else 'del_index'
+                redline_elem = self._select_recorded_redline(redline_index, redline_type, redline.get(index_key), redline_text, processed_redline_ids)
                 
-                for candidate in all_matching_redlines:
-                    elem_id = self._get_element_identifier(candidate, root, namespaces)
-                    if elem_id and elem_id not in processed_redline_ids:
-                        redline_elem = candidate
-                        processed_redline_ids.add(elem_id)
-                        print(f"  Selected redline element: {elem_id}")
-                        break
+                # Otherwise find ALL matching redline elements, then pick one we haven't processed
+                if redline_elem is None:
+                    all_matching_redlines = self._find_all_redline_elements_in_xml(root, redline_type, redline_text, namespaces, redline_index)
+                    self._log_detail("  Found %d matching redline element(s) in XML", len(all_matching_redlines))
+                    
+                    for candidate in all_matching_redlines:
+                        elem_id = id(candidate)
+                        if elem_id not in processed_redline_ids:
+                            redline_elem = candidate
+                            processed_redline_ids.add(elem_id)
+                            self._log_detail("  Selected redline element: %s", hex(elem_id))
+                            break
             
             if redline_elem is None:
-                print(f"  ⚠ Skipping - could not find unprocessed redline element")
+                self._log_detail("  ⚠ Skipping - could not find unprocessed redline element")
+                unmatched += 1
                 continue
             
             # Find parent paragraph
             parent_para = self._find_parent_paragraph(root, redline_elem, namespaces)
-            if not parent_para:
-                print(f"  ⚠ Could not find parent paragraph - skipping")
+            if parent_para is None:
+                self._log_detail("  ⚠ Could not find parent paragraph - skipping")
+                skipped += 1
                 continue
             
             # Create comment ID
@@ -374,34 +559,33 @@ class CommentInserter:
                     if redline_type == 'insertion':
                         # Transform their w:ins into a w:del (strike through their insertion)
                         self._reject_counterparty_insertion(parent_para, redline_elem, namespaces)
-                        print(f"  ✓ Auto-redline: Struck through counterparty's insertion")
+                        self._log_detail("  ✓ Auto-redline: Struck through counterparty's insertion")
                     elif redline_type == 'replacement':
                         # For replacements, find the w:ins sibling element (contains their new text)
                         # The redline_elem is typically the w:del, so look for nearby w:ins
-                        w_ns = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
                         ins_elem = None
                         
                         # Check if redline_elem itself is the w:ins
-                        if redline_elem.tag == f'{w_ns}ins':
+                        if redline_elem.tag == W_INS:
                             ins_elem = redline_elem
                         else:
                             # Search for w:ins sibling in the paragraph
                             new_text = redline.get('new_text', '')
                             if new_text and parent_para is not None:
                                 for elem in parent_para.iter():
-                                    if elem.tag == f'{w_ns}ins':
+                                    if elem.tag == W_INS:
                                         # Check if this ins contains the replacement text
-                                        ins_text = ''.join(t.text or '' for t in elem.findall(f'.//{w_ns}t'))
+                                        ins_text = ''.join(t.text or '' for t in elem.findall(f'.//{W_T}'))
                                         if new_text in ins_text or ins_text in new_text:
                                             ins_elem = elem
-                                            print(f"    Found w:ins sibling with text: '{ins_text[:30]}...'")
+                                            self._log_detail("    Found w:ins sibling with text: '%s...'", ins_text[:30])
                                             break
                         
                         if ins_elem is not None:
                             self._reject_counterparty_insertion(parent_para, ins_elem, namespaces)
-                            print(f"  ✓ Auto-redline: Struck through counterparty's replacement text")
+                            self._log_detail("  ✓ Auto-redline: Struck through counterparty's replacement text")
                         else:
-                            print(f"  ⚠ Could not find w:ins element for replacement")
+                            logger.warning("  ⚠ Could not find w:ins element for replacement")
                     # For deletions, they've already struck through text - nothing to strike
                     
                     # STEP 2: Insert our counter-proposal
@@ -411,123 +595,102 @@ class CommentInserter:
                             restore_text = redline.get('text', '')
                             if restore_text:
                                 self._insert_auto_redline(parent_para, redline_elem, restore_text, namespaces, is_restore=True)
-                                print(f"  ✓ Auto-redline: Inserted restoration of deleted text")
+                                self._log_detail("  ✓ Auto-redline: Inserted restoration of deleted text")
                         elif redline_type == 'replacement':
                             # Restore the old text that was replaced
                             restore_text = redline.get('old_text', '')
                             if restore_text:
                                 self._insert_auto_redline(parent_para, redline_elem, restore_text, namespaces, is_restore=True)
-                                print(f"  ✓ Auto-redline: Inserted original text '{restore_text[:50]}...'")
+                                self._log_detail("  ✓ Auto-redline: Inserted original text '%s...'", restore_text[:50])
                         # For insertions, we already struck it - no text to add back
                     elif auto_action == 'reject_replace':
                         if auto_text:
                             # Insert our alternative language from the playbook
                             self._insert_auto_redline(parent_para, redline_elem, auto_text, namespaces, is_restore=False)
-                            print(f"  ✓ Auto-redline: Inserted playbook text '{auto_text[:50]}...'")
+                            self._log_detail("  ✓ Auto-redline: Inserted playbook text '%s...'", auto_text[:50])
                 except Exception as e:
-                    print(f"  ⚠ Could not add auto-redline: {e}")
+                    logger.warning("  ⚠ Could not add auto-redline: %s", e)
             elif auto_action == 'accept':
-                print(f"  ℹ Auto-redline: Change accepted per playbook (no counter-redline needed)")
+                self._log_detail("  ℹ Auto-redline: Change accepted per playbook (no counter-redline needed)")
             
             # Create the comment in comments.xml
-            self._create_word_comment(parent_para, redline_elem, comments_root, comment_id, full_guidance, risk_level, namespaces)
+            self._create_word_comment(parent_para, redline_elem, pending_comments, comment_id, full_guidance, risk_level, namespaces)
             
             comments_added += 1
-            print(f"  ✓ Added comment #{comments_added} to redline")
+            self._log_detail("  ✓ Added comment #%d to redline", comments_added)
         
-        # Validate before saving
-        print(f"\n=== Validating document structure before saving ===")
-        validation_errors = self._validate_word_document_structure(root, comments_root, namespaces)
+        comments_root.extend(pending_comments)
         
-        if validation_errors:
-            print(f"⚠ WARNING: Found {len(validation_errors)} validation issue(s):", flush=True)
-            for error in validation_errors:
-                print(f"  - {error}", flush=True)
-        else:
-            print("✓ Document structure validation passed", flush=True)
+        # Validate before saving (opt-in: it re-walks the whole document)
+        if self.validate_output:
+            self._log_detail("Validating document structure before saving")
+            validation_errors = self._validate_word_document_structure(root, comments_root, namespaces)
+            
+            if validation_errors:
+                logger.warning("Found %d validation issue(s):", len(validation_errors))
+                for error in validation_errors:
+                    logger.warning("  - %s", error)
+            else:
+                self._log_detail("✓ Document structure validation passed")
         
         # Write updated document
-        print(f"\n=== Saving document with {comments_added} comments added ===")
+        self._log_detail("Saving document with %d comment(s) added", comments_added)
         
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as new_docx:
+        # Deflate at level 1: several times faster than the default on a large document.xml,
+        # for an output only slightly bigger
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as new_docx, zipfile.ZipFile(saved_docx, 'r') as original:
             # Copy all files from original (we'll handle specific files separately)
-            with zipfile.ZipFile(temp_path, 'r') as original:
-                for item in original.infolist():
-                    if item.filename not in ['word/document.xml', 'word/comments.xml', 'word/_rels/document.xml.rels', '[Content_Types].xml']:
-                        new_docx.writestr(item, original.read(item.filename))
+            self._copy_zip_parts(original, new_docx, {
+                'word/document.xml', 'word/comments.xml', 'word/_rels/document.xml.rels', '[Content_Types].xml'
+            })
             
             # CRITICAL: Ensure document.xml.rels exists and links to comments.xml
             # This relationship file is REQUIRED for Word to recognize comments
             try:
-                with zipfile.ZipFile(temp_path, 'r') as original:
-                    try:
-                        rels_xml = original.read('word/_rels/document.xml.rels')
-                        # Parse and check if comments relationship exists
-                        rels_root = ET.fromstring(rels_xml)
-                        namespaces_rels = {'r': 'http://schemas.openxmlformats.org/package/2006/relationships'}
-                        
-                        # Check if comments relationship already exists
-                        has_comments_rel = False
-                        for rel in rels_root.findall('.//{http://schemas.openxmlformats.org/package/2006/relationships}Relationship', namespaces_rels):
-                            rel_type = rel.get('Type', '')
-                            if 'comments' in rel_type.lower():
-                                has_comments_rel = True
-                                break
+                try:
+                    rels_xml = original.read('word/_rels/document.xml.rels')
+                    # Parse and check if comments relationship exists
+                    rels_root = self._parse_xml(rels_xml)
+                    # Relationships are direct children of the root; collect them once for both checks
+                    rels = rels_root.findall(REL_RELATIONSHIP)
+                    
+                    # Check if comments relationship already exists
+                    has_comments_rel = any('comments' in rel.get('Type', '').lower() for rel in rels)
+                    
+                    if not has_comments_rel and comments_added > 0:
+                        # Add comments relationship
+                        self._log_detail("    Adding comments relationship to document.xml.rels")
+                        # Find the highest relationship ID
+                        rel_ids = (rel.get('Id', '') for rel in rels)
+                        max_id = max((int(rel_id[3:]) for rel_id in rel_ids
+                                      if rel_id.startswith('rId') and rel_id[3:].isdigit()), default=0)
                         
-                        if not has_comments_rel and comments_added > 0:
-                            # Add comments relationship
-                            print(f"    Adding comments relationship to document.xml.rels", flush=True)
-                            # Find the highest relationship ID
-                            max_id = 0
-                            for rel in rels_root.findall('.//{http://schemas.openxmlformats.org/package/2006/relationships}Relationship', namespaces_rels):
-                                rel_id = rel.get('Id', '')
-                                if rel_id.startswith('rId'):
-                                    try:
-                                        id_num = int(rel_id[3:])
-                                        max_id = max(max_id, id_num)
-                                    except ValueError:
-                                        pass
-                            
-                            # Create new relationship
-                            new_rel = ET.Element('{http://schemas.openxmlformats.org/package/2006/relationships}Relationship')
-                            new_rel.set('Id', f'rId{max_id + 1}')
-                            new_rel.set('Type', 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments')
-                            new_rel.set('Target', 'comments.xml')
-                            rels_root.append(new_rel)
-                            
-                            # Write updated rels file using lxml for proper formatting
-                            try:
-                                rels_xml_bytes = ET.tostring(rels_root, encoding='utf-8', xml_declaration=True, method='xml')
-                                rels_lxml_root = lxml_etree.fromstring(rels_xml_bytes)
-                                rels_xml_str = lxml_etree.tostring(
-                                    rels_lxml_root,
-                                    encoding='utf-8',
-                                    xml_declaration=True,
-                                    pretty_print=False,
-                                    method='xml'
-                                ).decode('utf-8')
-                                new_docx.writestr('word/_rels/document.xml.rels', rels_xml_str.encode('utf-8'))
-                            except Exception as e:
-                                # Fallback to ElementTree
-                                ET.register_namespace('r', 'http://schemas.openxmlformats.org/package/2006/relationships')
-                                rels_xml_str = ET.tostring(rels_root, encoding='utf-8', xml_declaration=True, method='xml')
-                                new_docx.writestr('word/_rels/document.xml.rels', rels_xml_str)
-                            print(f"    ✓ Added comments relationship", flush=True)
-                        else:
-                            # Use existing rels file
-                            new_docx.writestr('word/_rels/document.xml.rels', rels_xml)
-                    except KeyError:
-                        # Create new rels file if it doesn't exist
-                        if comments_added > 0:
-                            print(f"    Creating word/_rels/document.xml.rels with comments relationship", flush=True)
-                            rels_xml = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+                        # Create new relationship
+                        rel_attrib = {
+                            'Id': f'rId{max_id + 1}',
+                            'Type': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments',
+                            'Target': 'comments.xml',
+                        }
+                        rel_xml = (f'<Relationship Id="{rel_attrib["Id"]}" Type="{rel_attrib["Type"]}" '
+                                   f'Target="{rel_attrib["Target"]}"/>').encode('utf-8')
+                        new_docx.writestr('word/_rels/document.xml.rels', self._append_to_xml_part(
+                            rels_xml, rels_root, rel_xml, lambda: self._etree.Element(REL_RELATIONSHIP, rel_attrib)))
+                        self._log_detail("    ✓ Added comments relationship")
+                    else:
+                        # Use existing rels file
+                        new_docx.writestr('word/_rels/document.xml.rels', rels_xml)
+                except KeyError:
+                    # Create new rels file if it doesn't exist
+                    if comments_added > 0:
+                        self._log_detail("    Creating word/_rels/document.xml.rels with comments relationship")
+                        rels_xml = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
 <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments" Target="comments.xml"/>
 </Relationships>'''
-                            new_docx.writestr('word/_rels/document.xml.rels', rels_xml)
-                            print(f"    ✓ Created comments relationship file", flush=True)
+                        new_docx.writestr('word/_rels/document.xml.rels', rels_xml)
+                        self._log_detail("    ✓ Created comments relationship file")
             except Exception as e:
-                print(f"    ⚠ Error handling relationship file: {e}", flush=True)
+                logger.warning("    ⚠ Error handling relationship file: %s", e)
                 # Try to create it anyway if comments were added
                 if comments_added > 0:
                     try:
@@ -536,7 +699,7 @@ class CommentInserter:
 <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments" Target="comments.xml"/>
 </Relationships>'''
                         new_docx.writestr('word/_rels/document.xml.rels', rels_xml)
-                        print(f"    ✓ Created comments relationship file (fallback)", flush=True)
+                        self._log_detail("    ✓ Created comments relationship file (fallback)")
                     except:
                         pass
             
@@ -544,251 +707,109 @@ class CommentInserter:
             # This tells Word that comments.xml is a valid document part
             # Word REQUIRES this to recognize and display comments
             try:
-                with zipfile.ZipFile(temp_path, 'r') as original:
-                    try:
-                        content_types_xml = original.read('[Content_Types].xml')
-                        content_types_root = ET.fromstring(content_types_xml)
-                        namespaces_ct = {'ct': 'http://schemas.openxmlformats.org/package/2006/content-types'}
-                        
-                        # Check if comments.xml override already exists
-                        has_comments_override = False
-                        for override in content_types_root.findall('.//{http://schemas.openxmlformats.org/package/2006/content-types}Override'):
-                            part_name = override.get('PartName', '')
-                            if part_name == '/word/comments.xml':
-                                has_comments_override = True
-                                break
-                        
-                        if not has_comments_override and comments_added > 0:
-                            print(f"    Adding comments.xml override to [Content_Types].xml", flush=True)
-                            # Create new override element
-                            new_override = ET.Element('{http://schemas.openxmlformats.org/package/2006/content-types}Override')
-                            new_override.set('PartName', '/word/comments.xml')
-                            new_override.set('ContentType', 'application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml')
-                            content_types_root.append(new_override)
-                            
-                            # Write updated Content_Types.xml using lxml for proper formatting
-                            try:
-                                ct_xml_bytes = ET.tostring(content_types_root, encoding='utf-8', xml_declaration=True, method='xml')
-                                ct_lxml_root = lxml_etree.fromstring(ct_xml_bytes)
-                                ct_xml_str = lxml_etree.tostring(
-                                    ct_lxml_root,
-                                    encoding='utf-8',
-                                    xml_declaration=True,
-                                    pretty_print=False,
-                                    method='xml'
-                                ).decode('utf-8')
-                                new_docx.writestr('[Content_Types].xml', ct_xml_str.encode('utf-8'))
-                                print(f"    ✓ Added comments.xml override to [Content_Types].xml", flush=True)
-                            except Exception as e:
-                                # Fallback to ElementTree
-                                ET.register_namespace('ct', 'http://schemas.openxmlformats.org/package/2006/content-types')
-                                ct_xml_str = ET.tostring(content_types_root, encoding='utf-8', xml_declaration=True, method='xml')
-                                new_docx.writestr('[Content_Types].xml', ct_xml_str)
-                                print(f"    ✓ Added comments.xml override (using ElementTree fallback)", flush=True)
-                        else:
-                            # Use existing Content_Types.xml
-                            new_docx.writestr('[Content_Types].xml', content_types_xml)
-                            if has_comments_override:
-                                print(f"    ✓ [Content_Types].xml already has comments.xml override", flush=True)
-                    except KeyError:
-                        # Create new Content_Types.xml if it doesn't exist (shouldn't happen, but handle it)
-                        if comments_added > 0:
-                            print(f"    Creating [Content_Types].xml with comments.xml override", flush=True)
-                            content_types_xml = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+                try:
+                    content_types_xml = original.read('[Content_Types].xml')
+                    content_types_root = self._parse_xml(content_types_xml)
+                    
+                    # Check if comments.xml override already exists (Overrides are direct children)
+                    has_comments_override = any(override.get('PartName') == '/word/comments.xml'
+                                                for override in content_types_root.iterfind(CT_OVERRIDE))
+                    
+                    if not has_comments_override and comments_added > 0:
+                        self._log_detail("    Adding comments.xml override to [Content_Types].xml")
+                        # Create new override element
+                        override_attrib = {
+                            'PartName': '/word/comments.xml',
+                            'ContentType': 'application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml',
+                        }
+                        override_xml = (f'<Override PartName="{override_attrib["PartName"]}" '
+                                        f'ContentType="{override_attrib["ContentType"]}"/>').encode('utf-8')
+                        new_docx.writestr('[Content_Types].xml', self._append_to_xml_part(
+                            content_types_xml, content_types_root, override_xml,
+                            lambda: self._etree.Element(CT_OVERRIDE, override_attrib)))
+                        self._log_detail("    ✓ Added comments.xml override to [Content_Types].xml")
+                    else:
+                        # Use existing Content_Types.xml
+                        new_docx.writestr('[Content_Types].xml', content_types_xml)
+                        if has_comments_override:
+                            self._log_detail("    ✓ [Content_Types].xml already has comments.xml override")
+                except KeyError:
+                    # Create new Content_Types.xml if it doesn't exist (shouldn't happen, but handle it)
+                    if comments_added > 0:
+                        self._log_detail("    Creating [Content_Types].xml with comments.xml override")
+                        content_types_xml = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
 <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
 <Default Extension="xml" ContentType="application/xml"/>
 <Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
 <Override PartName="/word/comments.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml"/>
 </Types>'''
-                            new_docx.writestr('[Content_Types].xml', content_types_xml.encode('utf-8'))
-                            print(f"    ✓ Created [Content_Types].xml with comments override", flush=True)
+                        new_docx.writestr('[Content_Types].xml', content_types_xml.encode('utf-8'))
+                        self._log_detail("    ✓ Created [Content_Types].xml with comments override")
             except Exception as e:
-                print(f"    ⚠ Error handling [Content_Types].xml: {e}", flush=True)
-                import traceback
-                print(f"    Traceback: {traceback.format_exc()}", flush=True)
+                logger.warning("    ⚠ Error handling [Content_Types].xml: %s", e, exc_info=True)
                 # Fallback: try to create it if comments were added
                 if comments_added > 0:
                     try:
-                        with zipfile.ZipFile(temp_path, 'r') as original:
-                            # Try to read existing one first
-                            try:
-                                content_types_xml = original.read('[Content_Types].xml')
-                                # Parse and add override
-                                content_types_root = ET.fromstring(content_types_xml)
-                                new_override = ET.Element('{http://schemas.openxmlformats.org/package/2006/content-types}Override')
-                                new_override.set('PartName', '/word/comments.xml')
-                                new_override.set('ContentType', 'application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml')
-                                content_types_root.append(new_override)
-                                ct_xml_str = ET.tostring(content_types_root, encoding='utf-8', xml_declaration=True, method='xml')
-                                new_docx.writestr('[Content_Types].xml', ct_xml_str)
-                                print(f"    ✓ Added comments.xml override (fallback method)", flush=True)
-                            except KeyError:
-                                # Create from scratch
-                                content_types_xml = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+                        # Try to read existing one first
+                        try:
+                            content_types_xml = original.read('[Content_Types].xml')
+                            # Parse and add override
+                            content_types_root = self._parse_xml(content_types_xml)
+                            new_override = self._etree.Element(CT_OVERRIDE)
+                            new_override.set('PartName', '/word/comments.xml')
+                            new_override.set('ContentType', 'application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml')
+                            content_types_root.append(new_override)
+                            ct_xml_str = self._serialize_xml(content_types_root)
+                            new_docx.writestr('[Content_Types].xml', ct_xml_str)
+                            self._log_detail("    ✓ Added comments.xml override (fallback method)")
+                        except KeyError:
+                            # Create from scratch
+                            content_types_xml = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
 <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
 <Default Extension="xml" ContentType="application/xml"/>
 <Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
 <Override PartName="/word/comments.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml"/>
 </Types>'''
-                                new_docx.writestr('[Content_Types].xml', content_types_xml.encode('utf-8'))
-                                print(f"    ✓ Created [Content_Types].xml with comments override (fallback)", flush=True)
+                            new_docx.writestr('[Content_Types].xml', content_types_xml.encode('utf-8'))
+                            self._log_detail("    ✓ Created [Content_Types].xml with comments override (fallback)")
                     except Exception as e2:
-                        print(f"    ✗ ERROR: Could not create [Content_Types].xml: {e2}", flush=True)
+                        logger.error("    ✗ Could not create [Content_Types].xml: %s", e2)
             
-            # Write updated document.xml with proper formatting using lxml for better XML handling
-            # CRITICAL: Use lxml consistently for all XML operations to ensure Word compatibility
-            try:
-                # Convert ElementTree to lxml for proper namespace handling
-                doc_xml_bytes = ET.tostring(root, encoding='utf-8', xml_declaration=True, method='xml')
-                # Parse with lxml to ensure valid XML and proper structure
-                doc_lxml_root = lxml_etree.fromstring(doc_xml_bytes)
-                
-                # CRITICAL: Ensure all text content is properly escaped
-                # lxml handles this automatically, but we'll validate
-                for elem in doc_lxml_root.iter():
-                    if elem.text:
-                        # lxml will automatically escape special characters
-                        pass
-                
-                # Write with lxml to ensure proper formatting and namespace prefixes
-                # CRITICAL: Use method='xml' and ensure proper encoding
-                doc_xml_str = lxml_etree.tostring(
-                    doc_lxml_root, 
-                    encoding='utf-8', 
-                    xml_declaration=True, 
-                    pretty_print=False,
-                    method='xml'
-                ).decode('utf-8')
-                
-                # Ensure 'w:' prefix is used (lxml should handle this, but double-check)
-                if 'ns0:' in doc_xml_str:
-                    print(f"    ⚠ Fixing namespace prefix in document.xml: replacing ns0: with w:", flush=True)
-                    doc_xml_str = doc_xml_str.replace('ns0:', 'w:').replace('xmlns:ns0=', 'xmlns:w=')
-                
-                # CRITICAL: Validate XML structure before writing
-                try:
-                    lxml_etree.fromstring(doc_xml_str.encode('utf-8'))
-                    print(f"    ✓ document.xml structure validated", flush=True)
-                except lxml_etree.XMLSyntaxError as e:
-                    print(f"    ⚠ WARNING: document.xml validation error: {e}", flush=True)
-                    print(f"    Line {e.lineno}, column {e.offset}", flush=True)
-                
-                # Write with explicit UTF-8 encoding
-                new_docx.writestr('word/document.xml', doc_xml_str.encode('utf-8'))
-                print(f"    ✓ Wrote document.xml", flush=True)
-            except Exception as e:
-                print(f"    ⚠ Error processing document.xml with lxml: {e}", flush=True)
-                import traceback
-                print(f"    Traceback: {traceback.format_exc()}", flush=True)
-                # Fallback: try ElementTree but still validate
-                ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-                doc_xml_str = ET.tostring(root, encoding='utf-8', xml_declaration=True, method='xml')
-                # Validate even the fallback
-                try:
-                    lxml_etree.fromstring(doc_xml_str)
-                    print(f"    ✓ Fallback document.xml validated", flush=True)
-                except lxml_etree.XMLSyntaxError as e:
-                    print(f"    ✗ ERROR: Fallback document.xml has XML errors: {e}", flush=True)
-                new_docx.writestr('word/document.xml', doc_xml_str)
-            
-            # Write updated comments.xml with proper formatting using lxml
-            # Ensure comments root has proper structure
-            if len(list(comments_root)) == 0:
-                print("⚠ WARNING: No comments to write to comments.xml", flush=True)
+            # Write updated document.xml. The tree was parsed with lxml when it is available,
+            # so it serializes straight back out with its original namespace prefixes; the
+            # serializer only emits well-formed XML, so it is not re-parsed to check
+            new_docx.writestr('word/document.xml', self._serialize_xml(root))
+            self._log_detail("    ✓ Wrote document.xml")
+            
+            # Write updated comments.xml
+            if len(comments_root) == 0:
+                logger.warning("No comments to write to comments.xml")
             else:
-                # CRITICAL: Verify each comment has text before writing
-                for comment in comments_root.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}comment', namespaces):
-                    comment_id = comment.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id')
-                    text_elems = comment.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t', namespaces)
-                    has_text = any(te.text and te.text.strip() for te in text_elems)
-                    if not has_text:
-                        print(f"    ⚠ WARNING: Comment {comment_id} has no text before writing!", flush=True)
+                if not comments_part_is_new:
+                    # CRITICAL: Verify each comment has text before writing (the ones we
+                    # generated were already checked by _create_word_comment)
+                    for comment in comments_root.findall(f'.//{W_COMMENT}', namespaces):
+                        comment_id = comment.get(W_ID)
+                        text_elems = comment.findall(f'.//{W_T}', namespaces)
+                        has_text = any(te.text and te.text.strip() for te in text_elems)
+                        if not has_text:
+                            logger.warning("    Comment %s has no text before writing", comment_id)
                 
-                # Use lxml for proper XML generation with correct namespace prefixes
-                try:
-                    comments_xml_bytes = ET.tostring(comments_root, encoding='utf-8', xml_declaration=True, method='xml')
-                    # Parse with lxml to ensure valid XML structure
-                    comments_lxml_root = lxml_etree.fromstring(comments_xml_bytes)
-                    
-                    # CRITICAL: Ensure all text content is properly escaped
-                    # lxml handles this automatically, but we'll validate
-                    for elem in comments_lxml_root.iter():
-                        if elem.text:
-                            # lxml will automatically escape special characters like &, <, >
-                            # But we need to ensure text is not None
-                            if elem.text is None:
-                                elem.text = ''
-                    
-                    # Write with lxml - this ensures proper namespace handling and 'w:' prefix
-                    # CRITICAL: Use method='xml' and ensure proper encoding
-                    comments_xml_str = lxml_etree.tostring(
-                        comments_lxml_root, 
-                        encoding='utf-8', 
-                        xml_declaration=True, 
-                        pretty_print=False,
-                        method='xml'
-                    ).decode('utf-8')
-                    
-                    # Ensure 'w:' prefix is used (lxml should handle this, but double-check)
-                    if 'ns0:' in comments_xml_str:
-                        print(f"    ⚠ Fixing namespace prefix in comments.xml: replacing ns0: with w:", flush=True)
-                        comments_xml_str = comments_xml_str.replace('ns0:', 'w:').replace('xmlns:ns0=', 'xmlns:w=')
-                    
-                    # CRITICAL: Ensure XML declaration is correct format for Word
-                    # Word is very picky about the XML declaration format
-                    if not comments_xml_str.startswith('<?xml version="1.0" encoding="UTF-8"?>'):
-                        # Fix the declaration if needed
-                        if comments_xml_str.startswith('<?xml'):
-                            # Replace with standard format
-                            lines = comments_xml_str.split('\n', 1)
-                            if len(lines) > 1:
-                                comments_xml_str = '<?xml version="1.0" encoding="UTF-8"?>\n' + lines[1]
-                            else:
-                                comments_xml_str = '<?xml version="1.0" encoding="UTF-8"?>\n' + comments_xml_str
-                    
-                    # CRITICAL: Validate XML structure before writing
-                    try:
-                        lxml_etree.fromstring(comments_xml_str.encode('utf-8'))
-                        print(f"    ✓ comments.xml structure validated", flush=True)
-                    except lxml_etree.XMLSyntaxError as e:
-                        print(f"    ⚠ WARNING: comments.xml validation error: {e}", flush=True)
-                        print(f"    Line {e.lineno}, column {e.offset}", flush=True)
-                    
-                    # Write with explicit UTF-8 encoding
-                    new_docx.writestr('word/comments.xml', comments_xml_str.encode('utf-8'))
-                    print(f"✓ Wrote {len(list(comments_root))} comment(s) to comments.xml", flush=True)
-                except Exception as e:
-                    print(f"    ⚠ Error processing comments.xml with lxml: {e}", flush=True)
-                    import traceback
-                    print(f"    Traceback: {traceback.format_exc()}", flush=True)
-                    # Fallback to ElementTree but still validate
-                    ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-                    comments_xml_str = ET.tostring(comments_root, encoding='utf-8', xml_declaration=True, method='xml')
-                    # Validate even the fallback
-                    try:
-                        lxml_etree.fromstring(comments_xml_str)
-                        print(f"    ✓ Fallback comments.xml validated", flush=True)
-                    except lxml_etree.XMLSyntaxError as e:
-                        print(f"    ✗ ERROR: Fallback comments.xml has XML errors: {e}", flush=True)
-                    if b'ns0:' in comments_xml_str:
-                        comments_xml_str = comments_xml_str.replace(b'ns0:', b'w:').replace(b'xmlns:ns0=', b'xmlns:w=')
-                    new_docx.writestr('word/comments.xml', comments_xml_str)
-                    print(f"✓ Wrote {len(list(comments_root))} comment(s) to comments.xml (using ElementTree fallback)", flush=True)
+                new_docx.writestr('word/comments.xml', self._serialize_xml(comments_root))
+                self._log_detail("✓ Wrote %d comment(s) to comments.xml", len(comments_root))
         
-        print(f"✓ Document saved to: {output_path}")
+        print(f"Processed {len(analyses)}: {comments_added} added, {skipped} skipped, {unmatched} unmatched; "
+              f"saved to {output_path}", flush=True)
         
         # Final validation - try to read the document back
-        try:
-            test_doc = Document(output_path)
-            print("✓ Document validation: Successfully opened saved document", flush=True)
-        except Exception as e:
-            print(f"⚠ WARNING: Could not validate saved document: {e}", flush=True)
-        
-        # Clean up
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        if self.validate_output:
+            try:
+                test_doc = Document(output_path)
+                self._log_detail("✓ Document validation: Successfully opened saved document")
+            except Exception as e:
+                logger.warning("Could not validate saved document: %s", e)
     
     def _validate_word_document_structure(self, root: ET.Element, comments_root: ET.Element, namespaces: Dict) -> List[str]:
         """Validate Word document structure before saving.
@@ -845,16 +866,21 @@ class CommentInserter:
                 if not has_text:
                     errors.append(f"Comment {comment_id} has no text content")
         
-        # Validate comment range markers are properly paired
+        # Validate comment range markers are properly paired, counting them in one pass
+        marker_counts = {W_COMMENT_RANGE_START: Counter(), W_COMMENT_RANGE_END: Counter(), W_COMMENT_REFERENCE: Counter()}
+        for elem in root.iter():
+            counts = marker_counts.get(elem.tag)
+            if counts is not None:
+                counts[elem.get(W_ID)] += 1
+        starts = marker_counts[W_COMMENT_RANGE_START]
+        ends = marker_counts[W_COMMENT_RANGE_END]
+        refs = marker_counts[W_COMMENT_REFERENCE]
+        
         for comment_id in comment_ids_in_doc:
-            starts = root.findall(f'.//{{http://schemas.openxmlformats.org/wordprocessingml/2006/main}}commentRangeStart[@{{http://schemas.openxmlformats.org/wordprocessingml/2006/main}}id="{comment_id}"]', namespaces)
-            ends = root.findall(f'.//{{http://schemas.openxmlformats.org/wordprocessingml/2006/main}}commentRangeEnd[@{{http://schemas.openxmlformats.org/wordprocessingml/2006/main}}id="{comment_id}"]', namespaces)
-            refs = root.findall(f'.//{{http://schemas.openxmlformats.org/wordprocessingml/2006/main}}commentReference[@{{http://schemas.openxmlformats.org/wordprocessingml/2006/main}}id="{comment_id}"]', namespaces)
-            
-            if len(starts) != len(ends):
-                errors.append(f"Comment {comment_id}: Mismatched commentRangeStart ({len(starts)}) and commentRangeEnd ({len(ends)})")
+            if starts[comment_id] != ends[comment_id]:
+                errors.append(f"Comment {comment_id}: Mismatched commentRangeStart ({starts[comment_id]}) and commentRangeEnd ({ends[comment_id]})")
             
-            if len(refs) == 0:
+            if refs[comment_id] == 0:
                 errors.append(f"Comment {comment_id}: No commentReference found")
         
         return errors
@@ -891,10 +917,10 @@ class CommentInserter:
     def _insert_comment_after_element(self, paragraph_elem: ET.Element, target_elem: ET.Element, comment_text: str, risk_level: str, namespaces: Dict) -> None:
         """Insert a comment annotation right after a specific element in a paragraph."""
         # Create a run for the comment
-        run_elem = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
+        run_elem = self._etree.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
         
         # Add formatting
-        rpr = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}rPr')
+        rpr = self._etree.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}rPr')
         
         # Risk-based color - Professional color scheme
         color_vals = {
@@ -904,13 +930,13 @@ class CommentInserter:
         }
         color_val = color_vals.get(risk_level, '003366')  # Default Navy Blue
         
-        color = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}color')
+        color = self._etree.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}color')
         color.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}val', color_val)
-        italic = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}i')
+        italic = self._etree.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}i')
         
         # Get font size from surrounding content
         font_size = self._get_font_size_from_element(target_elem, paragraph_elem, namespaces)
-        size = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}sz')
+        size = self._etree.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}sz')
         size.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}val', font_size)
         
         rpr.append(italic)
@@ -919,7 +945,7 @@ class CommentInserter:
         run_elem.append(rpr)
         
         # Add text
-        text_elem = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
+        text_elem = self._etree.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
         text_elem.text = f" [AI Analysis - Risk: {risk_level}] {comment_text}"
         run_elem.append(text_elem)
         
@@ -957,28 +983,28 @@ class CommentInserter:
         print(f"\n=== Starting comment insertion for {len(analyses)} redlines ===")
         
         # We need to work with XML to find the actual redline elements, then find corresponding runs
-        # Save and reload to work with XML structure
-        temp_path = output_path.replace('.docx', '_temp.docx')
-        self.document.save(temp_path)
+        # Save (in memory) and reload to work with XML structure
+        saved_docx = io.BytesIO()
+        self.document.save(saved_docx)
         
         # Reload to ensure we have fresh document structure
         # Try bayoo-docx first (better comment support), fallback to python-docx
         try:
             import docx as bayoo_docx
             if hasattr(bayoo_docx, 'Document'):
-                doc = bayoo_docx.Document(temp_path)
+                doc = bayoo_docx.Document(saved_docx)
                 print("✓ Using bayoo-docx (enhanced comment support)")
             else:
                 raise ImportError("bayoo-docx Document not found")
         except (ImportError, AttributeError) as e:
             print(f"⚠ bayoo-docx not available ({e}), using python-docx")
             from docx import Document
-            doc = Document(temp_path)
+            doc = Document(saved_docx)
         
         # Read XML to find redline positions
-        with zipfile.ZipFile(temp_path, 'r') as docx:
+        with zipfile.ZipFile(saved_docx, 'r') as docx:
             document_xml = docx.read('word/document.xml')
-            root = ET.fromstring(document_xml)
+            root = self._parse_xml(document_xml)
         
         namespaces = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
         
@@ -991,7 +1017,7 @@ class CommentInserter:
             extractor,
             root,
             namespaces,
-            temp_path,
+            saved_docx,
             use_tracked_changes=use_tracked_changes
         )
         return
@@ -1158,27 +1184,26 @@ class CommentInserter:
         print(f"\n=== Saving document with {comments_added} comments added ===")
         doc.save(output_path)
         print(f"✓ Document saved to: {output_path}")
-        
-        # Clean up
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
     
     def _insert_formatted_annotations_fallback(self, analyses: List[Dict], output_path: str, extractor=None) -> None:
         """Fallback: Insert formatted text annotations when comment API not available."""
-        # Save document first to ensure we have a file to work with
-        temp_path = output_path.replace('.docx', '_temp.docx')
-        self.document.save(temp_path)
+        # Save document first (in memory) to ensure we have an archive to work with
+        saved_docx = io.BytesIO()
+        self.document.save(saved_docx)
         
         # Open the docx file (it's a zip archive)
-        with zipfile.ZipFile(temp_path, 'r') as docx:
+        with zipfile.ZipFile(saved_docx, 'r') as docx:
             # Read document.xml
             document_xml = docx.read('word/document.xml')
-            root = ET.fromstring(document_xml)
+            root = self._parse_xml(document_xml)
             
             namespaces = {
                 'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
             }
             
+            # Index the redlines once; the extractor's recorded positions point into it
+            redline_index = self._build_redline_index(root, namespaces)
+            
             # Process each analysis and insert formatted text annotations
             for analysis in analyses:
                 redline = analysis['redline']
@@ -1226,8 +1251,11 @@ class CommentInserter:
                 redline_text = redline.get('text', '')
                 
                 if redline_type and redline_text:
-                    # Find matching element in current XML
-                    redline_elem = self._find_redline_element_in_xml(root, redline_type, redline_text, namespaces)
+                    # Find the element the extractor recorded, or else a matching one in current XML
+                    index_key = 'ins_index' if redline_type == 'insertion' else 'del_index'
+                    redline_elem = self._recorded_redline_element(redline_index, redline_type, redline.get(index_key), redline_text)
+                    if redline_elem is None:
+                        redline_elem = self._find_redline_element_in_xml(root, redline_type, redline_text, namespaces, redline_index)
                     
                     if redline_elem is not None:
                         # Find the parent paragraph
@@ -1244,20 +1272,14 @@ class CommentInserter:
                             )
         
         # Write updated document
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as new_docx:
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as new_docx:
             # Copy all files from original
-            with zipfile.ZipFile(temp_path, 'r') as original:
-                for item in original.infolist():
-                    if item.filename != 'word/document.xml':
-                        new_docx.writestr(item, original.read(item.filename))
+            with zipfile.ZipFile(saved_docx, 'r') as original:
+                self._copy_zip_parts(original, new_docx, {'word/document.xml'})
             
             # Write updated document.xml
-            doc_xml_str = ET.tostring(root, encoding='utf-8', xml_declaration=True)
+            doc_xml_str = self._serialize_xml(root)
             new_docx.writestr('word/document.xml', doc_xml_str)
-        
-        # Clean up temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
     
     def _find_paragraph_with_text(self, root: ET.Element, search_text: str, namespaces: Dict) -> Optional[ET.Element]:
         """Find a paragraph element containing the search text."""
@@ -1268,12 +1290,29 @@ class CommentInserter:
                 return para
         return None
     
-    def _find_redline_element_in_xml(self, root: ET.Element, redline_type: str, redline_text: str, namespaces: Dict) -> Optional[ET.Element]:
+    def _find_redline_element_in_xml(self, root: ET.Element, redline_type: str, redline_text: str, namespaces: Dict,
+                                     redline_index: Optional[Dict[str, List[Tuple[ET.Element, str]]]] = None) -> Optional[ET.Element]:
         """Find a redline element in the XML tree by matching type and text."""
-        all_matches = self._find_all_redline_elements_in_xml(root, redline_type, redline_text, namespaces)
+        all_matches = self._find_all_redline_elements_in_xml(root, redline_type, redline_text, namespaces, redline_index)
         return all_matches[0] if all_matches else None
     
-    def _find_all_redline_elements_in_xml(self, root: ET.Element, redline_type: str, redline_text: str, namespaces: Dict) -> List[ET.Element]:
+    def _build_redline_index(self, root: ET.Element, namespaces: Dict) -> Dict[str, List[Tuple[ET.Element, str]]]:
+        """Collect every w:ins/w:del once, with its normalized text.
+        
+        Entries are kept in document order so matching picks the same element a
+        fresh scan of the tree would.
+        """
+        index = {'insertion': [], 'deletion': []}
+        for redline_type, elements, texts in (
+            ('insertion', self._xp_ins(root), self._xp_text),
+            ('deletion', self._xp_del(root), self._xp_del_text),
+        ):
+            for elem in elements:
+                index[redline_type].append((elem, ' '.join(''.join(texts(elem)).split())))
+        return index
+    
+    def _find_all_redline_elements_in_xml(self, root: ET.Element, redline_type: str, redline_text: str, namespaces: Dict,
+                                          redline_index: Optional[Dict[str, List[Tuple[ET.Element, str]]]] = None) -> List[ET.Element]:
         """Find ALL actual redline XML elements matching the type and text.
         
         CRITICAL: This method ONLY searches for actual tracked change elements:
@@ -1281,6 +1320,7 @@ class CommentInserter:
         - <w:del> for deletions
         
         It does NOT match regular document text or any non-redline elements.
+        Pass a prebuilt redline_index to avoid rescanning the tree per lookup.
         """
         matches = []
         
@@ -1288,90 +1328,77 @@ class CommentInserter:
         # Reject any type that is not a tracked change
         if redline_type not in ['insertion', 'deletion']:
             # Note: 'replacement' is handled separately in the calling code
-            print(f"  ⚠ Invalid redline type '{redline_type}' - only 'insertion' and 'deletion' are valid for search")
+            logger.warning("  ⚠ Invalid redline type '%s' - only 'insertion' and 'deletion' are valid for search", redline_type)
             return matches
         
         # Normalize the search text for better matching
         search_text_normalized = ' '.join(redline_text.split()).strip() if redline_text else ''
         search_text_short = search_text_normalized[:100] if len(search_text_normalized) > 100 else search_text_normalized
         
-        # Search for insertion elements - ONLY <w:ins> elements
-        if redline_type == 'insertion':
-            all_ins = root.findall('.//w:ins', namespaces)
-            print(f"    Searching through {len(all_ins)} insertion element(s) in XML")
-            for ins_elem in all_ins:
-                # Get text ONLY from within the <w:ins> element
-                text_elements = ins_elem.findall('.//w:t', namespaces)
-                text_parts = []
-                for elem in text_elements:
-                    if elem.text:
-                        text_parts.append(elem.text)
-                elem_text = ''.join(text_parts)
-                elem_text_normalized = ' '.join(elem_text.split()).strip() if elem_text else ''
-                
-                # More flexible matching - try multiple strategies
-                matched = False
-                if search_text_normalized and elem_text_normalized:
-                    # Exact match
-                    if search_text_normalized == elem_text_normalized:
-                        matched = True
-                    # Substring match (either direction)
-                    elif search_text_normalized in elem_text_normalized or elem_text_normalized in search_text_normalized:
-                        matched = True
-                    # First 50 chars match
-                    elif (len(search_text_normalized) >= 10 and len(elem_text_normalized) >= 10 and
-                          (search_text_normalized[:50] in elem_text_normalized or elem_text_normalized[:50] in search_text_normalized)):
-                        matched = True
-                    # First word match (for very short redlines)
-                    elif len(search_text_normalized) < 10:
-                        first_word = search_text_normalized.split()[0] if search_text_normalized.split() else ''
-                        if first_word and first_word in elem_text_normalized:
-                            matched = True
-                
-                if matched:
-                    matches.append(ins_elem)
-                    print(f"      ✓ Matched insertion: '{elem_text_normalized[:50]}...'")
-        
-        # Search for deletion elements - ONLY <w:del> elements
-        elif redline_type == 'deletion':
-            all_del = root.findall('.//w:del', namespaces)
-            print(f"    Searching through {len(all_del)} deletion element(s) in XML")
-            for del_elem in all_del:
-                # Get text ONLY from within the <w:del> element
-                text_elements = del_elem.findall('.//w:delText', namespaces)
-                text_parts = []
-                for elem in text_elements:
-                    if elem.text:
-                        text_parts.append(elem.text)
-                elem_text = ''.join(text_parts)
-                elem_text_normalized = ' '.join(elem_text.split()).strip() if elem_text else ''
-                
-                # More flexible matching - try multiple strategies
-                matched = False
-                if search_text_normalized and elem_text_normalized:
-                    # Exact match
-                    if search_text_normalized == elem_text_normalized:
-                        matched = True
-                    # Substring match (either direction)
-                    elif search_text_normalized in elem_text_normalized or elem_text_normalized in search_text_normalized:
-                        matched = True
-                    # First 50 chars match
-                    elif (len(search_text_normalized) >= 10 and len(elem_text_normalized) >= 10 and
-                          (search_text_normalized[:50] in elem_text_normalized or elem_text_normalized[:50] in search_text_normalized)):
-                        matched = True
-                    # First word match (for very short redlines)
-                    elif len(search_text_normalized) < 10:
-                        first_word = search_text_normalized.split()[0] if search_text_normalized.split() else ''
-                        if first_word and first_word in elem_text_normalized:
-                            matched = True
-                
-                if matched:
-                    matches.append(del_elem)
-                    print(f"      ✓ Matched deletion: '{elem_text_normalized[:50]}...'")
-        
-        print(f"    Found {len(matches)} matching element(s) for redline: '{search_text_short}...'")
+        if redline_index is None:
+            redline_index = self._build_redline_index(root, namespaces)
+        
+        # Search ONLY <w:ins> elements for insertions and <w:del> elements for deletions
+        candidates = redline_index[redline_type]
+        debug = logger.isEnabledFor(self._detail_level)
+        if debug:
+            self._log_detail("    Searching through %d %s element(s) in XML", len(candidates), redline_type)
+        for elem, elem_text_normalized in candidates:
+            if self._redline_text_matches(search_text_normalized, elem_text_normalized):
+                matches.append(elem)
+                if debug:
+                    self._log_detail("      ✓ Matched %s: '%s...'", redline_type, elem_text_normalized[:50])
+        
+        self._log_detail("    Found %d matching element(s) for redline: '%s...'", len(matches), search_text_short)
         return matches
     
+    def _redline_text_matches(self, search_text_normalized: str, elem_text_normalized: str) -> bool:
+        """Check a redline's text against a w:ins/w:del element's text (both whitespace-normalized)."""
+        # More flexible matching - try multiple strategies
+        if not search_text_normalized or not elem_text_normalized:
+            return False
+        # Exact match
+        if search_text_normalized == elem_text_normalized:
+            return True
+        # Substring match (either direction)
+        if search_text_normalized in elem_text_normalized or elem_text_normalized in search_text_normalized:
+            return True
+        # First 50 chars match
+        if (len(search_text_normalized) >= 10 and len(elem_text_normalized) >= 10 and
+                (search_text_normalized[:50] in elem_text_normalized or elem_text_normalized[:50] in search_text_normalized)):
+            return True
+        # First word match (for very short redlines)
+        if len(search_text_normalized) < 10:
+            first_word = search_text_normalized.split()[0] if search_text_normalized.split() else ''
+            if first_word and first_word in elem_text_normalized:
+                return True
+        return False
+    
+    def _recorded_redline_element(self, redline_index: Dict[str, List[Tuple[ET.Element, str]]], redline_type: str,
+                                  position: Optional[int], redline_text: str) -> Optional[ET.Element]:
+        """Look up the w:ins/w:del the extractor recorded at this position.
+        
+        Returns None when no position was recorded or the element there no longer
+        matches the redline's text, so callers fall back to matching by text.
+        """
+        candidates = redline_index.get(redline_type, [])
+        if position is None or not 0 <= position < len(candidates):
+            return None
+        elem, elem_text_normalized = candidates[position]
+        if not self._redline_text_matches(' '.join(redline_text.split()), elem_text_normalized):
+            return None
+        return elem
+    
+    def _select_recorded_redline(self, redline_index: Dict[str, List[Tuple[ET.Element, str]]], redline_type: str,
+                                 position: Optional[int], redline_text: str, processed_redline_ids: set) -> Optional[ET.Element]:
+        """Claim the recorded redline element for this analysis unless another analysis already has."""
+        elem = self._recorded_redline_element(redline_index, redline_type, position, redline_text)
+        if elem is None or id(elem) in processed_redline_ids:
+            return None
+        processed_redline_ids.add(id(elem))
+        self._log_detail("  Selected recorded %s element #%d", redline_type, position)
+        return elem
+    
     def _get_element_identifier(self, element: ET.Element, root: ET.Element, namespaces: Dict) -> Optional[str]:
         """Create a unique identifier for an element based on its position and content."""
         # Get the element's tag and text to create a unique identifier
@@ -1380,50 +1407,41 @@ class CommentInserter:
         
         # Find the element's position by counting similar elements before it
         if tag == 'ins':
-            all_ins = root.findall('.//w:ins', namespaces)
-            position = list(all_ins).index(element) if element in all_ins else -1
+            all_ins = self._xp_ins(root)
+            position = all_ins.index(element) if element in all_ins else -1
             return f"ins_{position}_{text[:30]}"
         elif tag == 'del':
-            all_del = root.findall('.//w:del', namespaces)
-            position = list(all_del).index(element) if element in all_del else -1
+            all_del = self._xp_del(root)
+            position = all_del.index(element) if element in all_del else -1
             return f"del_{position}_{text[:30]}"
         
         return None
     
     def _get_text_from_element(self, element: ET.Element, namespaces: Dict) -> str:
         """Get all text content from an XML element, normalizing whitespace."""
-        text_parts = []
-        
-        # For insertions, get text from w:t elements
-        for text_elem in element.findall('.//w:t', namespaces):
-            if text_elem.text:
-                text_parts.append(text_elem.text)
-        
-        # For deletions, get text from w:delText elements
-        for del_text_elem in element.findall('.//w:delText', namespaces):
-            if del_text_elem.text:
-                text_parts.append(del_text_elem.text)
-        
-        text = ''.join(text_parts)
+        # Insertions hold their text in w:t elements, deletions in w:delText
+        text = ''.join(self._xp_text(element)) + ''.join(self._xp_del_text(element))
         # Normalize whitespace to match extraction logic
         text = ' '.join(text.split()) if text.strip() else text
         return text.strip()
     
     def _find_parent_paragraph(self, root: ET.Element, element: ET.Element, namespaces: Dict) -> Optional[ET.Element]:
         """Find the parent paragraph element for a given element."""
-        # Search all paragraphs and check if element is a descendant
-        for para in root.findall('.//w:p', namespaces):
-            # Check if the element is within this paragraph
-            if self._is_descendant(para, element):
-                return para
-        return None
-    
-    def _is_descendant(self, ancestor: ET.Element, descendant: ET.Element) -> bool:
-        """Check if descendant is a descendant of ancestor."""
-        for elem in ancestor.iter():
-            if elem == descendant:
-                return True
-        return False
+        if LXML_AVAILABLE:
+            # Walk up the parent pointers to the nearest enclosing paragraph
+            node = element.getparent()
+            while node is not None and node.tag != W_P:
+                node = node.getparent()
+            return node
+        
+        # ElementTree has no parent pointers - map child to parent once per tree and
+        # only rebuild when asked about an element added since
+        if element not in self._parent_map:
+            self._parent_map = {child: parent for parent in root.iter() for child in parent}
+        node = self._parent_map.get(element)
+        while node is not None and node.tag != W_P:
+            node = self._parent_map.get(node)
+        return node
     
     def _find_run_after_deletion(self, paragraph_elem: ET.Element, deletion_elem: ET.Element, doc: Document, namespaces: Dict):
         """Find a specific run that comes after a deletion element to attach comment to."""
@@ -1483,7 +1501,7 @@ class CommentInserter:
         # We need to find this paragraph in python-docx to get the actual run objects
         parent_para_xml = self._find_parent_paragraph(root, ins_elem, namespaces)
         
-        if not parent_para_xml:
+        if parent_para_xml is None:
             print(f"    ⚠ Could not find parent paragraph in XML")
             return target_runs
         
@@ -1610,17 +1628,17 @@ class CommentInserter:
                 rpr = copy.deepcopy(orig_rpr)
         
         # Create our deletion element
-        del_elem = ET.Element(f'{w_ns}del')
+        del_elem = self._etree.Element(f'{w_ns}del')
         del_elem.set(f'{w_ns}id', '0')
         del_elem.set(f'{w_ns}author', author)
         del_elem.set(f'{w_ns}date', datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ'))
         
         # Create run with the text (as delText for struck-through display)
-        run_elem = ET.Element(f'{w_ns}r')
+        run_elem = self._etree.Element(f'{w_ns}r')
         if rpr is not None:
             run_elem.append(rpr)
         
-        del_text_elem = ET.Element(f'{w_ns}delText')
+        del_text_elem = self._etree.Element(f'{w_ns}delText')
         del_text_elem.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
         del_text_elem.text = full_text
         
@@ -1633,11 +1651,11 @@ class CommentInserter:
             idx = children.index(ins_elem)
             paragraph_elem.remove(ins_elem)
             paragraph_elem.insert(idx, del_elem)
-            print(f"    Transformed counterparty insertion to deletion: '{full_text[:50]}...'")
+            self._log_detail("    Transformed counterparty insertion to deletion: '%s...'", full_text[:50])
         except (ValueError, AttributeError) as e:
             # If we can't find it directly, insert after
             paragraph_elem.append(del_elem)
-            print(f"    Added deletion element (could not replace in place): {e}")
+            self._log_detail("    Added deletion element (could not replace in place): %s", e)
     
     def _insert_tracked_deletion(self, paragraph_elem: ET.Element, target_elem: ET.Element, text_to_delete: str, namespaces: Dict, author: str = 'RedLine Agent') -> None:
         """Insert a tracked deletion to strike out the counterparty's unacceptable text.
@@ -1652,13 +1670,13 @@ class CommentInserter:
         w_ns = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
         
         # Create deletion element (tracked change)
-        del_elem = ET.Element(f'{w_ns}del')
+        del_elem = self._etree.Element(f'{w_ns}del')
         del_elem.set(f'{w_ns}id', '0')
         del_elem.set(f'{w_ns}author', author)
         del_elem.set(f'{w_ns}date', datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ'))
         
         # Create run element for the deleted text
-        run_elem = ET.Element(f'{w_ns}r')
+        run_elem = self._etree.Element(f'{w_ns}r')
         
         # Copy run properties from document to match font/style
         rpr = self._get_run_properties_from_element(target_elem, paragraph_elem, namespaces)
@@ -1666,7 +1684,7 @@ class CommentInserter:
             run_elem.append(rpr)
         
         # Create delText element (Word uses w:delText for deleted text content)
-        del_text_elem = ET.Element(f'{w_ns}delText')
+        del_text_elem = self._etree.Element(f'{w_ns}delText')
         del_text_elem.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
         del_text_elem.text = text_to_delete
         
@@ -1698,13 +1716,13 @@ class CommentInserter:
         w_ns = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
         
         # Create insertion element (tracked change)
-        ins_elem = ET.Element(f'{w_ns}ins')
+        ins_elem = self._etree.Element(f'{w_ns}ins')
         ins_elem.set(f'{w_ns}id', '0')
         ins_elem.set(f'{w_ns}author', author)
         ins_elem.set(f'{w_ns}date', datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ'))
         
         # Create run element for the inserted text
-        run_elem = ET.Element(f'{w_ns}r')
+        run_elem = self._etree.Element(f'{w_ns}r')
         
         # Copy run properties from document to match font/style
         rpr = self._get_run_properties_from_element(target_elem, paragraph_elem, namespaces)
@@ -1712,7 +1730,7 @@ class CommentInserter:
             run_elem.append(rpr)
         
         # Create text element with the actual text (no wrapper)
-        text_elem = ET.Element(f'{w_ns}t')
+        text_elem = self._etree.Element(f'{w_ns}t')
         # Preserve spaces at boundaries
         text_elem.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
         text_elem.text = text
@@ -1736,13 +1754,13 @@ class CommentInserter:
     def _insert_formatted_annotation(self, paragraph_elem: ET.Element, target_elem: ET.Element, annotation_text: str, risk_level: str, namespaces: Dict) -> None:
         """Insert formatted text annotation right after a redline element."""
         # Create a run for the annotation
-        annotation_run = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
+        annotation_run = self._etree.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
         
         # Add run properties with formatting
-        rpr = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}rPr')
+        rpr = self._etree.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}rPr')
         
         # Italic
-        italic = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}i')
+        italic = self._etree.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}i')
         rpr.append(italic)
         
         # Risk-based color - Professional color scheme
@@ -1753,20 +1771,20 @@ class CommentInserter:
         }
         color_val = color_vals.get(risk_level, '003366')  # Default Navy Blue
         
-        color = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}color')
+        color = self._etree.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}color')
         color.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}val', color_val)
         rpr.append(color)
         
         # Get font size from surrounding content to match document font size
         font_size = self._get_font_size_from_element(target_elem, paragraph_elem, namespaces)
-        sz = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}sz')
+        sz = self._etree.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}sz')
         sz.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}val', font_size)
         rpr.append(sz)
         
         annotation_run.append(rpr)
         
         # Add text with prefix
-        text_elem = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
+        text_elem = self._etree.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
         text_elem.text = f" [AI Guidance - Risk: {risk_level}] {annotation_text}"
         annotation_run.append(text_elem)
         
@@ -1780,21 +1798,18 @@ class CommentInserter:
             # Fallback: append to paragraph
             paragraph_elem.append(annotation_run)
     
-    def _create_word_comment(self, paragraph_elem: ET.Element, target_elem: ET.Element, comments_root: ET.Element, comment_id: int, comment_text: str, risk_level: str, namespaces: Dict) -> None:
+    def _create_word_comment(self, paragraph_elem: ET.Element, target_elem: ET.Element, pending_comments: List[ET.Element], comment_id: int, comment_text: str, risk_level: str, namespaces: Dict) -> None:
         """Create a native Word comment associated with a redline element.
         
         This creates:
-        1. A comment entry in comments.xml
+        1. A comment entry for comments.xml, queued on pending_comments
         2. Comment range markers in document.xml around the redline element
         """
-        # CRITICAL: Ensure namespace is registered for 'w:' prefix
-        ET.register_namespace('w', 'http://schemas.openxmlformats.org/wordprocessingml/2006/main')
-        
         # Create comment element in comments.xml
-        comment_elem = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}comment')
-        comment_elem.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
-        comment_elem.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}author', 'RedLine Agent')
-        comment_elem.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}date', datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ'))
+        comment_elem = self._etree.Element(W_COMMENT)
+        comment_elem.set(W_ID, str(comment_id))
+        comment_elem.set(W_AUTHOR, 'RedLine Agent')
+        comment_elem.set(W_DATE, datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ'))
         
         # CRITICAL: Create comment structure exactly as Word expects
         # Word requires: <w:comment><w:p><w:r><w:t>text</w:t></w:r></w:p></w:comment>
@@ -1808,14 +1823,13 @@ class CommentInserter:
         if not clean_text:
             clean_text = "Please review this change."
         
-        print(f"    Creating comment with text length: {len(clean_text)}", flush=True)
-        print(f"    First 100 chars: {clean_text[:100]}", flush=True)
+        logger.debug("    Creating comment with text length %d: %s", len(clean_text), clean_text[:100])
         
         # Create paragraph - REQUIRED
-        comment_para = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}p')
+        comment_para = self._etree.Element(W_P)
         
         # Add paragraph properties - REQUIRED by Word
-        ppr = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}pPr')
+        ppr = self._etree.Element(W_PPR)
         comment_para.append(ppr)
         
         # Split text into lines for multi-line comments
@@ -1823,10 +1837,10 @@ class CommentInserter:
         
         for line_idx, line in enumerate(text_lines):
             # Create a run for each line
-            text_run = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
+            text_run = self._etree.Element(W_R)
             
             # Create text element - CRITICAL: This must have actual text content
-            text_elem = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
+            text_elem = self._etree.Element(W_T)
             
             # Set the text - CRITICAL: text must be a string, not None
             # Also ensure special characters are properly handled (lxml will escape them)
@@ -1845,14 +1859,14 @@ class CommentInserter:
             
             # Add line break between lines (except after last line)
             if line_idx < len(text_lines) - 1:
-                br = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}br')
+                br = self._etree.Element(W_BR)
                 comment_para.append(br)
         
         # CRITICAL: Verify we have at least one run with text before adding to comment
-        runs = comment_para.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r', namespaces)
+        runs = comment_para.findall(f'.//{W_R}', namespaces)
         has_text = False
         for run in runs:
-            text_elems = run.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t', namespaces)
+            text_elems = run.findall(f'.//{W_T}', namespaces)
             for text_elem in text_elems:
                 if text_elem.text and text_elem.text.strip():
                     has_text = True
@@ -1861,10 +1875,10 @@ class CommentInserter:
                 break
         
         if not has_text:
-            print(f"    ⚠ WARNING: No text found in comment paragraph! Creating fallback...", flush=True)
+            logger.warning("    No text found in comment paragraph, creating fallback")
             # Fallback: create a simple run with text
-            text_run = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
-            text_elem = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
+            text_run = self._etree.Element(W_R)
+            text_elem = self._etree.Element(W_T)
             text_elem.text = clean_text[:500] if clean_text else "Please review this change."
             text_run.append(text_elem)
             comment_para.append(text_run)
@@ -1873,21 +1887,21 @@ class CommentInserter:
         comment_elem.append(comment_para)
         
         # CRITICAL: Final verification - check that text is actually in the XML
-        all_text_elems = comment_elem.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t', namespaces)
+        all_text_elems = comment_elem.findall(f'.//{W_T}', namespaces)
         total_text = ''
         for text_elem in all_text_elems:
             if text_elem.text:
                 total_text += text_elem.text
         
         if total_text.strip():
-            print(f"    ✓ Comment text verified in XML: '{total_text[:80]}...' (total length: {len(total_text)})", flush=True)
+            self._log_detail("    ✓ Comment text verified in XML: '%s...' (total length: %d)", total_text[:80], len(total_text))
         else:
-            print(f"    ✗ ERROR: Comment text is EMPTY in XML after creation!", flush=True)
-            print(f"    Debug: Found {len(all_text_elems)} text elements", flush=True)
+            logger.error("    ✗ ERROR: Comment text is EMPTY in XML after creation!")
+            self._log_detail("    Debug: Found %d text elements", len(all_text_elems))
             for idx, te in enumerate(all_text_elems):
-                print(f"      Text element {idx}: text={repr(te.text)}, tail={repr(te.tail)}", flush=True)
+                self._log_detail("      Text element %d: text=%r, tail=%r", idx, te.text, te.tail)
         
-        comments_root.append(comment_elem)
+        pending_comments.append(comment_elem)
         
         # Insert comment range markers in the document
         # Word comments need: commentRangeStart, commentReference (in a run), commentRangeEnd
@@ -1905,8 +1919,8 @@ class CommentInserter:
             # Word requires: commentRangeStart, [content], commentReference (in run), commentRangeEnd
             if target_elem.tag.endswith('}ins'):
                 # Insertion: commentRangeStart before the <w:ins> element
-                comment_range_start = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentRangeStart')
-                comment_range_start.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
+                comment_range_start = self._etree.Element(W_COMMENT_RANGE_START)
+                comment_range_start.set(W_ID, str(comment_id))
                 paragraph_elem.insert(target_idx, comment_range_start)
                 
                 # After inserting commentRangeStart, target_elem is now at target_idx + 1
@@ -1916,12 +1930,12 @@ class CommentInserter:
                 
                 # Create commentReference in a run - this must come AFTER the insertion content
                 # CRITICAL: The run containing commentReference MUST have text or a space, otherwise Word won't display it
-                comment_run = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
-                comment_ref = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentReference')
-                comment_ref.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
+                comment_run = self._etree.Element(W_R)
+                comment_ref = self._etree.Element(W_COMMENT_REFERENCE)
+                comment_ref.set(W_ID, str(comment_id))
                 comment_run.append(comment_ref)
                 # Add a space text element so Word recognizes the run
-                space_text = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
+                space_text = self._etree.Element(W_T)
                 space_text.text = ' '
                 comment_run.append(space_text)
                 
@@ -1940,60 +1954,60 @@ class CommentInserter:
                     # Insert commentReference run after the ins element
                     paragraph_elem.insert(ins_elem_idx + 1, comment_run)
                     # Insert commentRangeEnd after the commentReference
-                    comment_range_end = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentRangeEnd')
-                    comment_range_end.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
+                    comment_range_end = self._etree.Element(W_COMMENT_RANGE_END)
+                    comment_range_end.set(W_ID, str(comment_id))
                     paragraph_elem.insert(ins_elem_idx + 2, comment_range_end)
                 else:
                     # Fallback: append at end
                     paragraph_elem.append(comment_run)
-                    comment_range_end = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentRangeEnd')
-                    comment_range_end.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
+                    comment_range_end = self._etree.Element(W_COMMENT_RANGE_END)
+                    comment_range_end.set(W_ID, str(comment_id))
                     paragraph_elem.append(comment_range_end)
                 
             elif target_elem.tag.endswith('}del'):
                 # Deletion: place markers around the deletion element
-                comment_range_start = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentRangeStart')
-                comment_range_start.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
+                comment_range_start = self._etree.Element(W_COMMENT_RANGE_START)
+                comment_range_start.set(W_ID, str(comment_id))
                 paragraph_elem.insert(target_idx, comment_range_start)
                 
                 # Find the next run after deletion to attach comment to
-                comment_run = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
-                comment_ref = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentReference')
-                comment_ref.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
+                comment_run = self._etree.Element(W_R)
+                comment_ref = self._etree.Element(W_COMMENT_REFERENCE)
+                comment_ref.set(W_ID, str(comment_id))
                 comment_run.append(comment_ref)
                 # Add a space text element so Word recognizes the run
-                space_text = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
+                space_text = self._etree.Element(W_T)
                 space_text.text = ' '
                 comment_run.append(space_text)
                 # Insert after the <w:del> element
                 paragraph_elem.insert(target_idx + 2, comment_run)
                 
-                comment_range_end = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentRangeEnd')
-                comment_range_end.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
+                comment_range_end = self._etree.Element(W_COMMENT_RANGE_END)
+                comment_range_end.set(W_ID, str(comment_id))
                 paragraph_elem.insert(target_idx + 3, comment_range_end)
             else:
                 # Unknown element type - use fallback
                 raise ValueError(f"Unknown element type: {target_elem.tag}")
             
         except (ValueError, AttributeError, IndexError) as e:
-            print(f"    ⚠ Could not find exact position for comment markers: {e}")
+            logger.warning("    ⚠ Could not find exact position for comment markers: %s", e)
             # Fallback: append at end of paragraph
-            comment_range_start = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentRangeStart')
-            comment_range_start.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
+            comment_range_start = self._etree.Element(W_COMMENT_RANGE_START)
+            comment_range_start.set(W_ID, str(comment_id))
             paragraph_elem.append(comment_range_start)
             
-            comment_run = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r')
-            comment_ref = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentReference')
-            comment_ref.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
+            comment_run = self._etree.Element(W_R)
+            comment_ref = self._etree.Element(W_COMMENT_REFERENCE)
+            comment_ref.set(W_ID, str(comment_id))
             comment_run.append(comment_ref)
             # Add a space text element so Word recognizes the run
-            space_text = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t')
+            space_text = self._etree.Element(W_T)
             space_text.text = ' '
             comment_run.append(space_text)
             paragraph_elem.append(comment_run)
             
-            comment_range_end = ET.Element('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}commentRangeEnd')
-            comment_range_end.set('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}id', str(comment_id))
+            comment_range_end = self._etree.Element(W_COMMENT_RANGE_END)
+            comment_range_end.set(W_ID, str(comment_id))
             paragraph_elem.append(comment_range_end)
     
     def _add_comment_annotation(self, paragraph, comment_text: str, risk_level: str) -> None:
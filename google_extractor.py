@@ -32,9 +32,14 @@ class GoogleDocsRedlineExtractor:
         creds = None
         
         # Check for existing token
-        if os.path.exists('token.pickle'):
+        if os.path.exists('token.json'):
+            creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+        elif os.path.exists('token.pickle'):
+            # One-time migration from the pickled token earlier versions saved
             with open('token.pickle', 'rb') as token:
                 creds = pickle.load(token)
+            with open('token.json', 'w') as token:
+                token.write(creds.to_json())
         
         # If no valid credentials, get new ones
         if not creds or not creds.valid:
@@ -51,8 +56,8 @@ class GoogleDocsRedlineExtractor:
                 creds = flow.run_local_server(port=0)
             
             # Save credentials for next run
-            with open('token.pickle', 'wb') as token:
-                pickle.dump(creds, token)
+            with open('token.json', 'w') as token:
+                token.write(creds.to_json())
         
         return build('docs', 'v1', credentials=creds)
     
@@ -2,11 +2,16 @@
 
 import os
 import re
-from typing import Optional
+from typing import BinaryIO, Optional, Union
 from pathlib import Path
 import xml.etree.ElementTree as ET
 from zipfile import ZipFile
 
+# Largest uncompressed word/document.xml the converter will parse. Conversion is
+# linear in this size, so the cap bounds how long one upload can hold a worker
+# (and stops a small zip from expanding into gigabytes of XML)
+MAX_DOCUMENT_XML_BYTES = 64 * 1024 * 1024
+
 
 class PlaybookConverter:
     """Converts Word documents to Markdown format."""
@@ -35,11 +40,7 @@ class PlaybookConverter:
         if not word_path.endswith('.docx'):
             raise ValueError("Only .docx files are supported")
         
-        # Extract text from Word document
-        markdown_content = self._extract_text_from_word(word_path)
-        
-        # Format as markdown
-        formatted_markdown = self._format_as_markdown(markdown_content)
+        formatted_markdown = self.convert_word_stream_to_markdown(word_path)
         
         # Determine output path
         if output_path is None:
@@ -52,49 +53,64 @@ class PlaybookConverter:
         
         return output_path
     
-    def _extract_text_from_word(self, word_path: str) -> str:
+    def convert_word_stream_to_markdown(self, word_file: Union[str, BinaryIO]) -> str:
+        """
+        Convert a Word document to Markdown text without writing any files.
+        
+        Args:
+            word_file: Path to the .docx file or a seekable binary file object
+                (e.g. an uploaded file's stream)
+        
+        Returns:
+            The Markdown text
+        """
+        # Extract text from Word document
+        markdown_content = self._extract_text_from_word(word_file)
+        
+        # Format as markdown
+        return self._format_as_markdown(markdown_content)
+    
+    def _extract_text_from_word(self, word_file: Union[str, BinaryIO]) -> str:
         """Extract text content from Word document XML."""
-        with ZipFile(word_path, 'r') as docx:
-            # Read document.xml
+        with ZipFile(word_file, 'r') as docx:
+            # Parse document.xml as it decompresses rather than reading it into memory first
             try:
-                xml_content = docx.read('word/document.xml')
+                if docx.getinfo('word/document.xml').file_size > MAX_DOCUMENT_XML_BYTES:
+                    raise ValueError("Word document is too large to convert")
+                with docx.open('word/document.xml') as xml_file:
+                    root = ET.parse(xml_file).getroot()
             except KeyError:
                 raise ValueError("Invalid Word document: document.xml not found")
             
-            root = ET.fromstring(xml_content)
-            
-            # Extract all text nodes
-            text_parts = []
-            self._extract_text_recursive(root, text_parts)
-            
-            return '\n'.join(text_parts)
+            return self._extract_paragraph_text(root)
     
-    def _extract_text_recursive(self, element, text_parts: list, in_paragraph: bool = False):
-        """Recursively extract text from XML elements."""
-        w_ns = self.namespaces['w']
+    def _extract_paragraph_text(self, root) -> str:
+        """Return the document's text with one line per paragraph.
         
-        # Check if this is a paragraph
-        if element.tag == f'{w_ns}p':
-            if text_parts and text_parts[-1] and not text_parts[-1].endswith('\n'):
-                text_parts.append('\n')
-            in_paragraph = True
-        
-        # Extract text from w:t elements
-        if element.tag == f'{w_ns}t':
-            if element.text:
-                text_parts.append(element.text)
-        
-        # Extract tail text
-        if element.tail and element.tail.strip():
-            text_parts.append(element.tail)
+        A single pass over the element tree: run texts are joined within their
+        paragraph and each w:p starts a new line.
+        """
+        w_ns = self.namespaces['w']
+        paragraph_tag = f'{{{w_ns}}}p'
+        text_tag = f'{{{w_ns}}}t'
+        tab_tag = f'{{{w_ns}}}tab'
         
-        # Process children
-        for child in element:
-            self._extract_text_recursive(child, text_parts, in_paragraph)
+        paragraphs = []
+        current = None
+        for element in root.iter():
+            tag = element.tag
+            if tag == paragraph_tag:
+                current = []
+                paragraphs.append(current)
+            elif current is None:
+                continue
+            elif tag == text_tag:
+                if element.text:
+                    current.append(element.text)
+            elif tag == tab_tag:
+                current.append('\t')
         
-        # Add newline after paragraph
-        if element.tag == f'{w_ns}p' and text_parts and not text_parts[-1].endswith('\n'):
-            text_parts.append('\n')
+        return '\n'.join(''.join(parts) for parts in paragraphs)
     
     def _format_as_markdown(self, content: str) -> str:
         """Format extracted text as markdown."""
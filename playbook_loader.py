@@ -1,10 +1,25 @@
 """Legal playbook loader and parser."""
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Callable
 from pathlib import Path
 import re
 
 
+# Parsed playbooks shared across loader instances (e.g. one per web request),
+# keyed by (resolved path, mtime_ns, size) so an edited file is re-parsed
+_PLAYBOOK_CACHE: Dict[Tuple[str, int, int], Tuple[List[Dict[str, str]], str]] = {}
+_PLAYBOOK_CACHE_SIZE = 32
+
+# Redline actions a playbook rule may prescribe without asking the AI
+# (reject_replace needs replacement text, which only the AI writes)
+RULE_ACTIONS = ('accept', 'reject_restore', 'comment_only')
+RULE_RISK_LEVELS = ('Low', 'Medium', 'High')
+
+# Optional rule lines that follow a principle's RESPONSE. The RULE prefix keeps
+# ordinary prose such as "Risk: high if uncapped" in the principle text
+_RULE_KEYS = {'RULE MATCH:': 'match', 'RULE ACTION:': 'action', 'RULE RISK:': 'risk'}
+
+
 class PlaybookLoader:
     """Loads and parses legal playbooks from text files."""
     
@@ -12,6 +27,7 @@ class PlaybookLoader:
         """Initialize with playbook file path."""
         self.playbook_path = Path(playbook_path)
         self.principles: List[Dict[str, str]] = []
+        self._playbook_text: Optional[str] = None
         self.load_playbook()
     
     def load_playbook(self) -> None:
@@ -19,10 +35,24 @@ class PlaybookLoader:
         if not self.playbook_path.exists():
             raise FileNotFoundError(f"Playbook not found: {self.playbook_path}")
         
+        stat = self.playbook_path.stat()
+        cache_key = (str(self.playbook_path.resolve()), stat.st_mtime_ns, stat.st_size)
+        cached = _PLAYBOOK_CACHE.get(cache_key)
+        if cached is not None:
+            principles, self._playbook_text = cached
+            self.principles = [dict(item) for item in principles]
+            return
+        
         with open(self.playbook_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
+        self.principles = []
+        self._playbook_text = None
         self._parse_playbook(content)
+        
+        if len(_PLAYBOOK_CACHE) >= _PLAYBOOK_CACHE_SIZE:
+            _PLAYBOOK_CACHE.clear()
+        _PLAYBOOK_CACHE[cache_key] = ([dict(item) for item in self.principles], self.get_playbook_text())
     
     def _parse_playbook(self, content: str) -> None:
         """Parse playbook content into structured principles."""
@@ -34,30 +64,32 @@ class PlaybookLoader:
         lines = content.split('\n')
         current_principle = None
         current_response = None
+        current_rule = {}
         
         for line in lines:
             line = line.strip()
             if not line:
                 if current_principle:
-                    self.principles.append({
-                        'principle': current_principle,
-                        'response': current_response or ''
-                    })
+                    self._add_principle(current_principle, current_response, current_rule)
                     current_principle = None
                     current_response = None
+                    current_rule = {}
                 continue
             
+            upper = line.upper()
+            rule_key = next((key for key in _RULE_KEYS if upper.startswith(key)), None)
+            
             # Check for PRINCIPLE: pattern
-            if line.upper().startswith('PRINCIPLE:'):
+            if upper.startswith('PRINCIPLE:'):
                 if current_principle:
-                    self.principles.append({
-                        'principle': current_principle,
-                        'response': current_response or ''
-                    })
+                    self._add_principle(current_principle, current_response, current_rule)
                 current_principle = line[10:].strip()
                 current_response = None
-            elif line.upper().startswith('RESPONSE:'):
+                current_rule = {}
+            elif upper.startswith('RESPONSE:'):
                 current_response = line[9:].strip()
+            elif current_principle and rule_key:
+                current_rule[_RULE_KEYS[rule_key]] = line[len(rule_key):].strip()
             elif current_principle and not current_response:
                 # Continuation of principle
                 current_principle += ' ' + line
@@ -67,10 +99,7 @@ class PlaybookLoader:
         
         # Add last principle if exists
         if current_principle:
-            self.principles.append({
-                'principle': current_principle,
-                'response': current_response or ''
-            })
+            self._add_principle(current_principle, current_response, current_rule)
         
         # If no structured principles found, treat entire content as playbook
         if not self.principles:
@@ -79,23 +108,75 @@ class PlaybookLoader:
                 'response': content
             })
     
+    def _add_principle(self, principle: str, response: Optional[str], rule: Dict[str, str]) -> None:
+        """Record a parsed principle along with any RULE MATCH/ACTION/RISK lines."""
+        item = {'principle': principle, 'response': response or ''}
+        item.update(rule)
+        self.principles.append(item)
+    
     def get_playbook_text(self) -> str:
-        """Get full playbook text for AI context."""
-        text_parts = []
-        for item in self.principles:
-            text_parts.append(f"PRINCIPLE: {item['principle']}")
-            if item['response']:
-                text_parts.append(f"RESPONSE: {item['response']}")
-        return '\n\n'.join(text_parts)
+        """Get full playbook text for AI context.
+        
+        The text is built once and reused until the playbook is reloaded.
+        """
+        if self._playbook_text is None:
+            text_parts = []
+            for item in self.principles:
+                text_parts.append(f"PRINCIPLE: {item['principle']}")
+                if item['response']:
+                    text_parts.append(f"RESPONSE: {item['response']}")
+            self._playbook_text = '\n\n'.join(text_parts)
+        return self._playbook_text
     
     def get_principles(self) -> List[Dict[str, str]]:
         """Get list of principles."""
         return self.principles
-
-
-
-
-
-
-
-
+    
+    def compile_rules(self) -> List[Tuple[Callable[[Dict], Optional[str]], Dict[str, str]]]:
+        """Compile the principles that carry a RULE MATCH line into deterministic rules.
+        
+        A rule fires when any of its ';'-separated RULE MATCH terms appears as a whole
+        phrase (case-insensitive) in the text a redline inserts. Each rule is a
+        (matcher, action) pair: the matcher takes a redline and returns the matched
+        term or None; the action holds the canned analysis fields. Rules with an
+        unknown RULE ACTION or RULE RISK are skipped so the AI handles those redlines.
+        """
+        rules = []
+        for item in self.principles:
+            terms = [term.strip() for term in item.get('match', '').split(';') if term.strip()]
+            action = item.get('action', 'comment_only').lower()
+            risk = item.get('risk', 'Medium').capitalize()
+            if not terms:
+                continue
+            if action not in RULE_ACTIONS or risk not in RULE_RISK_LEVELS:
+                print(f"Warning: Skipping playbook rule with ACTION '{action}' / RISK '{risk}' "
+                      f"for principle: {item['principle'][:60]}")
+                continue
+            
+            pattern = re.compile(
+                r'(?<!\w)(?:' + '|'.join(re.escape(term) for term in terms) + r')(?!\w)',
+                re.IGNORECASE
+            )
+            rules.append((self._rule_matcher(pattern), {
+                'playbook_principle': item['principle'],
+                'response': item['response'],
+                'risk_level': risk,
+                'auto_redline_action': action
+            }))
+        return rules
+    
+    @staticmethod
+    def _rule_matcher(pattern: re.Pattern) -> Callable[[Dict], Optional[str]]:
+        """Build a matcher that searches the text a redline inserts for `pattern`."""
+        def matcher(redline: Dict) -> Optional[str]:
+            redline_type = redline.get('type', '')
+            if redline_type == 'replacement':
+                text = redline.get('new_text', '')
+            elif 'deletion' in redline_type:
+                # Deletions insert nothing; they are left to the AI
+                return None
+            else:
+                text = redline.get('text', '')
+            match = pattern.search(text)
+            return match.group() if match else None
+        return matcher
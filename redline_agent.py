@@ -1,6 +1,7 @@
 """Main Redline Analysis Agent - Orchestrates the entire workflow."""
 
 import argparse
+import logging
 import os
 from pathlib import Path
 from typing import Optional
@@ -24,13 +25,26 @@ class RedlineAgent:
         self,
         playbook_path: str,
         ai_provider: str = None,
-        model: str = None
+        model: str = None,
+        max_concurrency: int = None,
+        cache_dir: str = None,
+        verbose: bool = False
     ):
         """Initialize the agent with playbook and AI configuration."""
         self.playbook = PlaybookLoader(playbook_path)
         self.ai_provider = ai_provider or os.getenv('DEFAULT_AI_PROVIDER', 'openai')
         self.model = model or os.getenv('DEFAULT_MODEL', 'gpt-4')
-        self.analyzer = AIAnalyzer(self.playbook, self.ai_provider, self.model)
+        # Size to the provider account's rate limits
+        max_concurrency = max_concurrency or int(os.getenv('AI_MAX_CONCURRENCY', '20'))
+        self.analyzer = AIAnalyzer(
+            self.playbook,
+            self.ai_provider,
+            self.model,
+            max_concurrency=max_concurrency,
+            cache_dir=cache_dir,
+            verbose=verbose
+        )
+        self.verbose = verbose
     
     def process_word_document(
         self,
@@ -91,7 +105,7 @@ class RedlineAgent:
         print(f"Analysis complete. Inserting native Word comments (comment bubbles) for each redline...")
         
         # Insert comments or tracked changes - pass extractor for element references
-        inserter = CommentInserter(doc_path=input_path)
+        inserter = CommentInserter(doc_path=input_path, verbose=self.verbose)
         inserter.insert_comments_word(
             analyses, 
             output_path, 
@@ -144,7 +158,7 @@ class RedlineAgent:
         print(f"Analysis complete. Inserting comments...")
         
         # Insert comments into Google Doc
-        inserter = CommentInserter(doc_id=doc_id)
+        inserter = CommentInserter(doc_id=doc_id, verbose=self.verbose)
         inserter.insert_comments_google(analyses)
         
         # Create summary document if requested
@@ -249,8 +263,29 @@ def main():
         action='store_true',
         help='Only analyze, do not insert comments'
     )
+    parser.add_argument(
+        '--max-concurrency',
+        type=int,
+        help='Maximum AI requests in flight at once (default: from .env AI_MAX_CONCURRENCY or 20)'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=os.getenv('AI_CACHE_DIR'),
+        help='Cache AI responses in this directory (default: from .env AI_CACHE_DIR, off if unset)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always query the AI, ignoring --cache-dir'
+    )
+    parser.add_argument(
+        '--verbose', '-v',
+        action='store_true',
+        help='Show per-redline AI analysis and comment placement progress'
+    )
     
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     
     # Determine output path
     if not args.output:
@@ -264,7 +299,10 @@ def main():
     agent = RedlineAgent(
         playbook_path=args.playbook,
         ai_provider=args.provider,
-        model=args.model
+        model=args.model,
+        max_concurrency=args.max_concurrency,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        verbose=args.verbose
     )
     
     # Process document
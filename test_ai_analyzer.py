@@ -0,0 +1,181 @@
+"""Unit tests for the AI analyzer's prompt building and response handling (no API calls)."""
+
+import asyncio
+import contextlib
+import math
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import ai_analyzer
+from ai_analyzer import AIAnalyzer
+from playbook_loader import PlaybookLoader
+
+SAMPLE_PLAYBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample_playbook.txt')
+
+# Tokens the fixed instructions (everything but playbook, document and redlines) may use
+PROMPT_TOKEN_BUDGET = 900
+
+
+@pytest.fixture
+def make_analyzer(monkeypatch):
+    """Build an OpenAI analyzer against the sample playbook without a real API key."""
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+
+    def make(model='gpt-4', **kwargs):
+        return AIAnalyzer(PlaybookLoader(SAMPLE_PLAYBOOK), 'openai', model, **kwargs)
+    return make
+
+
+def _count_tokens(text):
+    """Count tokens with tiktoken when its encoding can be loaded, else estimate 4 chars per token."""
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding('cl100k_base').encode(text))
+    except Exception:
+        return math.ceil(len(text) / 4)
+
+
+@pytest.mark.parametrize('model', ['gpt-4', 'gpt-4o'])
+@pytest.mark.parametrize('include_examples', [True, False])
+def test_prompt_instructions_stay_within_token_budget(make_analyzer, model, include_examples):
+    analyzer = make_analyzer(model, include_examples=include_examples)
+    prompt = analyzer._build_prompt_prefix('', '', None) + analyzer._build_prompt_suffix('')
+    assert _count_tokens(prompt) <= PROMPT_TOKEN_BUDGET
+
+
+def test_document_head_falls_back_to_characters_when_encoding_unavailable(make_analyzer, monkeypatch):
+    class OfflineTiktoken:
+        @staticmethod
+        def encoding_for_model(model):
+            raise KeyError(model)
+
+        @staticmethod
+        def get_encoding(name):
+            raise OSError('BPE download failed')
+
+    monkeypatch.setattr(ai_analyzer, 'TIKTOKEN_AVAILABLE', True)
+    monkeypatch.setattr(ai_analyzer, 'tiktoken', OfflineTiktoken, raising=False)
+    document_text = 'x' * (ai_analyzer.DOC_HEAD_CHARS * 2)
+    assert make_analyzer()._document_head(document_text) == document_text[:ai_analyzer.DOC_HEAD_CHARS]
+
+
+def test_pool_decoding_keeps_other_results_when_one_response_is_not_an_object(make_analyzer):
+    analyzer = make_analyzer()
+    good = '{"analyses": [{"redline_number": 1, "assessment": "ok"}]}'
+    responses = [good] * ai_analyzer.PARSE_POOL_MIN_RESPONSES + ['5', RuntimeError('request failed')]
+    decoded = analyzer._decode_responses_in_pool(responses)
+    assert decoded[0] == ([{'redline_number': 1, 'assessment': 'ok'}], None)
+    # The non-object payload is left to the inline parse; the failed request has no text
+    assert decoded[-2] is None
+    assert decoded[-1] is None
+
+
+@pytest.mark.parametrize('model, role, temperature, response_type', [
+    ('gpt-4', 'system', 0.3, None),
+    ('gpt-4o', 'system', 0.3, 'json_schema'),
+    ('gpt-4o-2024-05-13', 'system', 0.3, 'json_object'),
+    ('gpt-4o-2024-08-06', 'system', 0.3, 'json_schema'),
+    ('o3-mini', 'developer', None, 'json_schema'),
+    ('gpt-5', 'developer', None, 'json_schema'),
+    ('o1-mini', None, None, None),
+])
+def test_openai_request_kwargs_fit_the_model(make_analyzer, model, role, temperature, response_type):
+    kwargs = make_analyzer(model)._request_kwargs(('PREFIX', 'SUFFIX'))
+    assert kwargs.get('temperature') == temperature
+    assert [m['role'] for m in kwargs['messages']] == ([role, 'user'] if role else ['user'])
+    assert kwargs['messages'][-1]['content'].endswith('PREFIXSUFFIX')
+    response_format = kwargs['response_format']
+    assert (response_format and response_format['type']) == response_type
+
+
+def test_streamed_analyses_follow_the_latest_attempt(make_analyzer, monkeypatch):
+    analyzer = make_analyzer(redlines_per_request=2)
+    redlines = [{'type': 'insertion', 'text': 'first change'}, {'type': 'deletion', 'text': 'second change'}]
+
+    @contextlib.asynccontextmanager
+    async def fake_client():
+        yield None
+
+    async def fake_call(client, prompt, on_attempt=None):
+        # First attempt streams one analysis and then drops; the retry answers differently
+        # and also returns an analysis numbered past the end of the group
+        on_attempt()('{"analyses": [{"redline_number": 1, "assessment": "dropped attempt"},')
+        await asyncio.sleep(0.01)
+        on_text = on_attempt()
+        response = ('{"analyses": [{"redline_number": 7, "assessment": "bogus"},'
+                    ' {"redline_number": "2", "assessment": "second"},'
+                    ' {"redline_number": 1, "assessment": "retry"}]}')
+        on_text(response)
+        return response
+
+    monkeypatch.setattr(analyzer, '_create_async_client', fake_client)
+    monkeypatch.setattr(analyzer, '_call_ai_async', fake_call)
+
+    async def collect():
+        return [(a['redline']['text'], a['assessment'])
+                async for a in analyzer.analyze_redlines_aiter(redlines, 'document', None)]
+
+    assert asyncio.run(collect()) == [
+        ('first change', 'dropped attempt'),
+        ('second change', 'second'),
+        ('first change', 'retry'),
+    ]
+
+
+def test_single_redline_prompts_do_not_depend_on_position(make_analyzer):
+    analyzer = make_analyzer(redlines_per_request=1)
+    redline = {'type': 'insertion', 'text': 'same change'}
+    groups = [[{'type': 'deletion', 'text': 'other change'}], [redline], [dict(redline)]]
+    prompts = analyzer._build_redline_prompts(groups, 'document', None)
+    assert prompts[1] == prompts[2]
+    assert 'Redline #1:' in prompts[2][1]
+
+
+@pytest.mark.parametrize('response', [
+    '```json\n{"analyses": [{"redline_number": 1}]}\n```',
+    '```JSON\n{"analyses": [{"redline_number": 1}]}\n```',
+    '```Json {"analyses": [{"redline_number": 1}]}```',
+    '```\n{"analyses": [{"redline_number": 1}]}```',
+    'Here is the analysis:\n```json\n{"analyses": [{"redline_number": 1}]}\n```\nLet me know.',
+])
+def test_decode_ai_response_strips_code_fences(response):
+    assert ai_analyzer._decode_ai_response(response) == [{'redline_number': 1}]
+
+
+def test_extract_json_object_ignores_braces_in_strings_and_trailing_prose():
+    text = 'Result: {"a": "brace } inside", "b": {"c": "\\" {"}} and then {not json}'
+    assert ai_analyzer._extract_json_object(text) == '{"a": "brace } inside", "b": {"c": "\\" {"}}'
+    assert ai_analyzer._extract_json_object('no object here') is None
+
+
+def test_insertion_context_is_centred_on_the_insertion(make_analyzer):
+    from word_extractor import _paragraph_original_text
+    w = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+    opening = ' '.join(f'word{i}' for i in range(300))
+    para = ET.fromstring(
+        f'<w:p xmlns:w="{w}"><w:r><w:t>{opening} just before the change</w:t></w:r>'
+        '<w:ins w:id="1"><w:r><w:t> inserted words</w:t></w:r></w:ins>'
+        '<w:r><w:t> and the clause ends here.</w:t></w:r></w:p>'
+    )
+    context, offsets = _paragraph_original_text(para)
+    insertion = para.find(f'{{{w}}}ins')
+    assert context[offsets[insertion]:].startswith(' and the clause ends here.')
+
+    redline = {'type': 'insertion', 'text': 'inserted words', 'new_text': 'inserted words',
+               'context': context, 'context_offset': offsets[insertion]}
+    block = make_analyzer()._redline_block(redline, 1)
+    assert 'Context (original paragraph): ...' in block
+    assert 'just before the change and the clause ends here.' in block
+    assert 'word0 ' not in block
+
+
+def test_dedupe_only_merges_changes_in_identical_context(make_analyzer):
+    def change(context):
+        return {'type': 'deletion', 'text': 'net 30', 'old_text': 'net 30', 'context': context}
+    redlines = [change('Payment is due net 30.'), change('Refunds are paid net 30.'),
+                change('Payment is due net 30.')]
+    unique, rep_of = make_analyzer()._dedupe_redlines(redlines)
+    assert len(unique) == 2
+    assert rep_of == [0, 1, 0]
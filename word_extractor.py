@@ -1,6 +1,6 @@
 """Extract redlines (tracked changes) from Microsoft Word documents."""
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 import zipfile
 import xml.etree.ElementTree as ET
@@ -26,6 +26,48 @@ except ImportError as e:
         raise ImportError("python-docx is not available. lxml installation failed.")
 
 
+# Runs of whitespace collapsed when normalizing tracked-change text
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+def _paragraph_original_text(para) -> Tuple[str, Dict]:
+    """Text of a paragraph as it read before its tracked changes.
+    
+    Deleted text (w:delText) is kept and inserted runs (inside w:ins) are
+    skipped, so the text still contains what deletions and replacements removed.
+    Also returns the character offset in that text at which each w:ins / w:del
+    element of the paragraph sits, so an insertion can be located even though
+    its own text is not part of the paragraph's original text.
+    """
+    parts = []
+    raw_positions = {}
+    length = 0
+    
+    def collect(elem, inserted):
+        nonlocal length
+        if elem.tag in (f'{_W_NS}ins', f'{_W_NS}del'):
+            raw_positions[elem] = length
+        if elem.tag == f'{_W_NS}ins':
+            inserted = True
+        elif elem.tag == f'{_W_NS}delText' or (elem.tag == f'{_W_NS}t' and not inserted):
+            if elem.text:
+                parts.append(elem.text)
+                length += len(elem.text)
+        for child in elem:
+            collect(child, inserted)
+    
+    collect(para, False)
+    raw = ''.join(parts)
+    text = _WHITESPACE_RE.sub(' ', raw).strip()
+    offsets = {
+        elem: min(len(text), len(_WHITESPACE_RE.sub(' ', raw[:pos]).lstrip()))
+        for elem, pos in raw_positions.items()
+    }
+    return text, offsets
+
+
 class WordRedlineExtractor:
     """Extracts tracked changes from Word documents."""
     
@@ -122,6 +164,7 @@ class WordRedlineExtractor:
             if not tracked_changes:
                 continue
             
+            first_new_redline = len(self.redlines)
             i = 0
             while i < len(tracked_changes):
                 change_elem = tracked_changes[i]
@@ -148,8 +191,7 @@ class WordRedlineExtractor:
                     # Preserve original text - only normalize excessive whitespace, don't lose content
                     if old_text.strip():
                         # Replace multiple spaces/tabs/newlines with single space, but preserve structure
-                        import re
-                        old_text = re.sub(r'\s+', ' ', old_text).strip()
+                        old_text = _WHITESPACE_RE.sub(' ', old_text).strip()
                     else:
                         old_text = old_text
                     
@@ -178,8 +220,7 @@ class WordRedlineExtractor:
                             # Preserve original text - only normalize excessive whitespace, don't lose content
                             if new_text.strip():
                                 # Replace multiple spaces/tabs/newlines with single space, but preserve structure
-                                import re
-                                new_text = re.sub(r'\s+', ' ', new_text).strip()
+                                new_text = _WHITESPACE_RE.sub(' ', new_text).strip()
                             else:
                                 new_text = new_text
                             
@@ -261,6 +302,15 @@ class WordRedlineExtractor:
                 
                 # Move to next child
                 i += 1
+            
+            # Give the AI the surrounding clause text for this paragraph's redlines
+            if len(self.redlines) > first_new_redline:
+                context, offsets = _paragraph_original_text(para)
+                for redline in self.redlines[first_new_redline:]:
+                    redline['context'] = context
+                    # Where the change sits in the context (for a replacement, the deleted part)
+                    change_elem = redline.get('del_element', redline.get('element'))
+                    redline['context_offset'] = offsets.get(change_elem)
         
         print(f"Paragraph-based approach found {total_tracked_changes_found} tracked change element(s) across all paragraphs")
         
@@ -311,6 +361,19 @@ class WordRedlineExtractor:
                         'element': del_elem
                     })
         
+        # Record where each redline sits among the document's w:ins / w:del elements, so the
+        # comment inserter can go straight to it instead of re-matching by text
+        ins_positions = {elem: idx for idx, elem in enumerate(root.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}ins'))}
+        del_positions = {elem: idx for idx, elem in enumerate(root.iter('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}del'))}
+        for redline in self.redlines:
+            if redline['type'] == 'replacement':
+                redline['del_index'] = del_positions.get(redline['del_element'])
+                redline['ins_index'] = ins_positions.get(redline['ins_element'])
+            elif redline['type'] == 'deletion':
+                redline['del_index'] = del_positions.get(redline['element'])
+            else:
+                redline['ins_index'] = ins_positions.get(redline['element'])
+        
         # CRITICAL: Only extract actual tracked changes (w:ins and w:del)
         # Do NOT use alternative methods that might identify regular text as redlines
         # If no XML-based redlines found, that means there are no tracked changes